@@ -1,4 +1,4 @@
-from easy_notifyer.clients.mailer import Mailer
+from easy_notifyer.clients.mailer import Mailer, MailerAsync
 from easy_notifyer.clients.telegram import Telegram, TelegramAsync
 from easy_notifyer.handlers.mailer import mailer_reporter
 from easy_notifyer.handlers.telegram import telegram_reporter
@@ -9,6 +9,7 @@ __version__ = "0.2.1"
 
 __all__ = [
     "Mailer",
+    "MailerAsync",
     "Telegram",
     "TelegramAsync",
     "mailer_reporter",
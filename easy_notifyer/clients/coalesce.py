@@ -0,0 +1,316 @@
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+COALESCE_WINDOW = 0.5
+COALESCE_MAX_LATENCY = 2.0
+SEPARATOR = "\n\n"
+
+
+class _Batch:
+    """Texts merged into one message"""
+
+    __slots__ = ("texts", "size", "started", "updated", "waiters", "handle")
+
+    def __init__(self, now: float):
+        self.texts: List[str] = []
+        self.size = 0
+        self.started = now
+        self.updated = now
+        self.waiters: List[Any] = []
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def text(self) -> str:
+        return SEPARATOR.join(self.texts)
+
+
+class CoalescerBase:
+    """Base class of coalescing buffer. Texts with the same key are merged into batch, batch
+    is sent when no text was added for window, when max latency from the first text is over
+    or when the next text doesn't fit into max size."""
+
+    def __init__(
+        self,
+        *,
+        window: float = COALESCE_WINDOW,
+        max_latency: float = COALESCE_MAX_LATENCY,
+        max_size: int,
+        measure: Callable[[str], int] = len,
+    ):
+        """
+        Args:
+            window (float, optional): seconds of waiting for the next text.
+            max_latency (float, optional): max seconds from the first text of batch to send.
+            max_size (int): max size of merged text.
+            measure (callable, optional): function measuring size of text.
+        """
+        self.window = window
+        self.max_latency = max(window, max_latency)
+        self.max_size = max_size
+        self._measure = measure
+        self._separator_size = measure(SEPARATOR)
+        self._batches: "OrderedDict[Hashable, _Batch]" = OrderedDict()
+
+    def _deadline(self, batch: _Batch) -> float:
+        return min(batch.updated + self.window, batch.started + self.max_latency)
+
+    def _append(self, key: Hashable, text: str, waiter: Any) -> List[_Batch]:
+        """Add text to batch of key.
+
+        Returns:
+            list: full batches removed from buffer to send right away, in order of sending.
+        """
+        now = time.monotonic()
+        size = self._measure(text)
+        full = []
+        batch = self._batches.get(key)
+        if batch is not None and batch.size + self._separator_size + size > self.max_size:
+            full.append(self._batches.pop(key))
+            batch = None
+        if batch is None:
+            batch = self._batches[key] = _Batch(now)
+        else:
+            batch.size += self._separator_size
+        batch.texts.append(text)
+        batch.size += size
+        batch.updated = now
+        batch.waiters.append(waiter)
+        if batch.size >= self.max_size:
+            full.append(self._batches.pop(key))
+        return full
+
+
+class Coalescer(CoalescerBase):
+    """Coalescing buffer of sync client, batches are sent by worker thread in order."""
+
+    def __init__(
+        self,
+        *,
+        window: float = COALESCE_WINDOW,
+        max_latency: float = COALESCE_MAX_LATENCY,
+        max_size: int,
+        measure: Callable[[str], int] = len,
+        on_flush: Callable[[str, Hashable], Any],
+        shutdown_timeout: Optional[float] = 5.0,
+    ):
+        """
+        Args:
+            window (float, optional): seconds of waiting for the next text.
+            max_latency (float, optional): max seconds from the first text of batch to send.
+            max_size (int): max size of merged text.
+            measure (callable, optional): function measuring size of text.
+            on_flush (callable): function sending merged text, called with text and key.
+            shutdown_timeout (float, optional): seconds to send batches at interpreter shutdown.
+        """
+        super().__init__(window=window, max_latency=max_latency, max_size=max_size, measure=measure)
+        self._on_flush = on_flush
+        self._shutdown_timeout = shutdown_timeout
+        self._ready: List[Tuple[Hashable, _Batch]] = []
+        self._cond = threading.Condition()
+        self._force = False
+        self._sending = 0
+        self._worker: Optional[threading.Thread] = None
+
+    def add(self, text: str, key: Hashable = None) -> Future:
+        """Add text to buffer, caller never waits for sending.
+
+        Args:
+            text (str): text of message.
+            key (hashable, optional): texts are merged only with texts of the same key.
+
+        Returns:
+            Future: result of on_flush for merged text.
+        """
+        future = Future()
+        with self._cond:
+            full = self._append(key, text, future)
+            self._ready.extend((key, batch) for batch in full)
+            self._start_worker()
+            self._cond.notify_all()
+        return future
+
+    def _start_worker(self) -> None:
+        """Start thread sending batches, under lock"""
+        if self._worker is None:
+            self._worker = threading.Thread(
+                target=self._run, name="easy_notifyer-coalesce", daemon=True
+            )
+            self._worker.start()
+            atexit.register(self.flush, timeout=self._shutdown_timeout)
+
+    def _take(self) -> List[Tuple[Hashable, _Batch]]:
+        """Take batches ready to send, all batches if buffer is flushed, under lock"""
+        now = time.monotonic()
+        ready, self._ready = self._ready, []
+        due = [
+            key
+            for key, batch in self._batches.items()
+            if self._force is True or self._deadline(batch) <= now
+        ]
+        ready.extend((key, self._batches.pop(key)) for key in due)
+        return ready
+
+    def _timeout(self) -> Optional[float]:
+        """Seconds to the nearest deadline of batch, under lock"""
+        if not self._batches:
+            return None
+        deadline = min(self._deadline(batch) for batch in self._batches.values())
+        return max(deadline - time.monotonic(), 0.0)
+
+    def _send(self, key: Hashable, batch: _Batch) -> None:
+        try:
+            result = self._on_flush(batch.text, key)
+        except Exception as error:  # noqa
+            logger.exception("Send of coalesced messages failed.")
+            for waiter in batch.waiters:
+                waiter.set_exception(error)
+        else:
+            for waiter in batch.waiters:
+                waiter.set_result(result)
+
+    def _run(self) -> None:
+        """Send batches when they are ready"""
+        while True:
+            with self._cond:
+                ready = self._take()
+                while not ready:
+                    self._cond.wait(self._timeout())
+                    ready = self._take()
+                self._sending += 1
+            try:
+                for key, batch in ready:
+                    self._send(key, batch)
+            finally:
+                with self._cond:
+                    self._sending -= 1
+                    self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Send all batches now and wait until they are sent.
+
+        Args:
+            timeout (float, optional): max seconds to wait. None - wait without timeout.
+
+        Returns:
+            bool: False if batches were not sent in timeout.
+        """
+        with self._cond:
+            self._force = True
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(
+                    lambda: not self._batches and not self._ready and self._sending == 0,
+                    timeout,
+                )
+            finally:
+                self._force = False
+
+
+class AsyncCoalescer(CoalescerBase):
+    """Coalescing buffer of async client. Batches are kept per event loop and sent by tasks,
+    batches of the same key are sent in order."""
+
+    def __init__(
+        self,
+        *,
+        window: float = COALESCE_WINDOW,
+        max_latency: float = COALESCE_MAX_LATENCY,
+        max_size: int,
+        measure: Callable[[str], int] = len,
+        on_flush: Callable[[str, Hashable], Awaitable],
+    ):
+        """
+        Args:
+            window (float, optional): seconds of waiting for the next text.
+            max_latency (float, optional): max seconds from the first text of batch to send.
+            max_size (int): max size of merged text.
+            measure (callable, optional): function measuring size of text.
+            on_flush (callable): coroutine function sending merged text, called with text
+                and key.
+        """
+        super().__init__(window=window, max_latency=max_latency, max_size=max_size, measure=measure)
+        self._on_flush = on_flush
+        self._tasks: Set[asyncio.Future] = set()
+        self._last: Dict[Hashable, asyncio.Future] = {}
+
+    async def add(self, text: str, key: Hashable = None) -> Any:
+        """Add text to buffer and wait until merged text is sent.
+
+        Args:
+            text (str): text of message.
+            key (hashable, optional): texts are merged only with texts of the same key.
+
+        Returns:
+            result of on_flush for merged text.
+        """
+        loop = asyncio.get_event_loop()
+        loop_key = (loop, key)
+        waiter = loop.create_future()
+        for batch in self._append(loop_key, text, waiter):
+            self._start(loop_key, batch)
+        batch = self._batches.get(loop_key)
+        if batch is not None:
+            if batch.handle is not None:
+                batch.handle.cancel()
+            delay = max(self._deadline(batch) - time.monotonic(), 0.0)
+            batch.handle = loop.call_later(delay, self._flush, loop_key, batch)
+        return await waiter
+
+    def _flush(self, loop_key: Tuple[asyncio.AbstractEventLoop, Hashable], batch: _Batch) -> None:
+        """Send batch by timer, if it's still in buffer"""
+        if self._batches.get(loop_key) is batch:
+            del self._batches[loop_key]
+            self._start(loop_key, batch)
+
+    def _start(self, loop_key: Tuple[asyncio.AbstractEventLoop, Hashable], batch: _Batch) -> None:
+        """Start task sending batch after the previous batch of the same key"""
+        if batch.handle is not None:
+            batch.handle.cancel()
+        task = asyncio.ensure_future(self._send(loop_key, batch, self._last.get(loop_key)))
+        self._last[loop_key] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Future) -> None:
+        self._tasks.discard(task)
+        for loop_key, last in list(self._last.items()):
+            if last is task:
+                del self._last[loop_key]
+
+    async def _send(
+        self,
+        loop_key: Tuple[asyncio.AbstractEventLoop, Hashable],
+        batch: _Batch,
+        previous: Optional[asyncio.Future],
+    ) -> None:
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            result = await self._on_flush(batch.text, loop_key[1])
+        except Exception as error:  # noqa
+            logger.exception("Send of coalesced messages failed.")
+            for waiter in batch.waiters:
+                if waiter.done() is False:
+                    waiter.set_exception(error)
+        else:
+            for waiter in batch.waiters:
+                if waiter.done() is False:
+                    waiter.set_result(result)
+
+    async def flush(self) -> None:
+        """Send all batches of the running event loop now and wait until they are sent"""
+        loop = asyncio.get_event_loop()
+        for loop_key in [key for key in self._batches if key[0] is loop]:
+            self._start(loop_key, self._batches.pop(loop_key))
+        tasks = [task for task in self._tasks if task.get_loop() is loop]
+        if tasks:
+            await asyncio.wait(tasks)
@@ -0,0 +1,131 @@
+import asyncio
+import socket
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+from easy_notifyer.utils import LRUCache, run_in_threadpool
+
+
+DNS_TTL = 300.0
+DNS_CACHE_SIZE = 256
+
+AddrInfo = Tuple[int, int, int, str, tuple]
+
+
+class DNSCache:
+    """Thread-safe cache of resolved addresses of hosts. Addresses are kept for ttl, host is
+    resolved again if connection to all of its cached addresses failed."""
+
+    def __init__(self, *, ttl: float = DNS_TTL, maxsize: int = DNS_CACHE_SIZE):
+        """
+        Args:
+            ttl (float, optional): seconds to keep resolved addresses.
+            maxsize (int, optional): max count of cached hosts.
+        """
+        self.ttl = ttl
+        self._cache = LRUCache(maxsize)
+
+    def _get(self, host: str, port: int) -> Optional[List[AddrInfo]]:
+        cached = self._cache.get((host, port))
+        if cached is None or cached[0] < time.monotonic():
+            return None
+        return cached[1]
+
+    def _set(self, host: str, port: int, infos: List[AddrInfo]) -> List[AddrInfo]:
+        if infos:
+            self._cache.set((host, port), (time.monotonic() + self.ttl, infos))
+        return infos
+
+    def evict(self, host: str, port: int) -> None:
+        """Remove addresses of host from cache"""
+        self._cache.pop((host, port))
+
+    def resolve(self, host: str, port: int) -> List[AddrInfo]:
+        """Get addresses of host from cache, or resolve them.
+
+        Returns:
+            list: result of socket.getaddrinfo for stream sockets.
+        """
+        infos = self._get(host, port)
+        if infos is None:
+            infos = self._set(host, port, socket.getaddrinfo(host, port, type=socket.SOCK_STREAM))
+        return infos
+
+    async def aresolve(self, host: str, port: int) -> List[AddrInfo]:
+        """Get addresses of host from cache, or resolve them in thread pool of library.
+
+        Returns:
+            list: result of socket.getaddrinfo for stream sockets.
+        """
+        infos = self._get(host, port)
+        if infos is None:
+            infos = self._set(
+                host,
+                port,
+                await run_in_threadpool(socket.getaddrinfo, host, port, type=socket.SOCK_STREAM),
+            )
+        return infos
+
+    def create_connection(
+        self,
+        address: Tuple[str, int],
+        timeout: Any,
+        source_address: Optional[Tuple[str, int]] = None,
+    ) -> socket.socket:
+        """The same as socket.create_connection, with cached addresses of host. Socket is
+        connected by full address info, so flowinfo and scope id of IPv6 are kept."""
+        host, port = address
+        error: Optional[OSError] = None
+        for family, sock_type, proto, _, sockaddr in self.resolve(host, port):
+            sock = socket.socket(family, sock_type, proto)
+            try:
+                # pylint: disable=protected-access
+                if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(timeout)
+                if source_address is not None:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as exc:
+                sock.close()
+                error = exc
+        self.evict(host, port)
+        raise error or OSError(f"No addresses of {host}")
+
+    async def open_connection(
+        self, host: str, port: int, **kwargs: Any
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """The same as asyncio.open_connection, with cached addresses of host. Socket is
+        connected by full address info, so flowinfo and scope id of IPv6 are kept. Pass
+        server_hostname for TLS connections."""
+        loop = asyncio.get_event_loop()
+        error: Optional[OSError] = None
+        for family, sock_type, proto, _, sockaddr in await self.aresolve(host, port):
+            sock = socket.socket(family, sock_type, proto)
+            try:
+                sock.setblocking(False)
+                await loop.sock_connect(sock, sockaddr)
+            except OSError as exc:
+                sock.close()
+                error = exc
+                continue
+            except BaseException:
+                sock.close()
+                raise
+            return await asyncio.open_connection(sock=sock, **kwargs)
+        self.evict(host, port)
+        raise error or OSError(f"No addresses of {host}")
+
+
+_default_dns_cache: Optional[DNSCache] = None
+_default_dns_cache_lock = threading.Lock()
+
+
+def get_dns_cache() -> DNSCache:
+    """Get dns cache shared by all connections"""
+    global _default_dns_cache  # pylint: disable=global-statement
+    with _default_dns_cache_lock:
+        if _default_dns_cache is None:
+            _default_dns_cache = DNSCache()
+        return _default_dns_cache
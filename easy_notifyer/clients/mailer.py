@@ -1,13 +1,235 @@
+import functools
+import threading
+import time
 import uuid
+from collections import deque
+from concurrent.futures import Executor
+from email.generator import BytesGenerator
 from email.mime.application import MIMEApplication
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from smtplib import SMTP, SMTP_SSL
-from typing import BinaryIO, List, Optional, Union
+from email.policy import SMTP as SMTP_POLICY
+from io import BytesIO
+from smtplib import (
+    SMTP, SMTP_SSL, SMTPDataError, SMTPException, SMTPRecipientsRefused, SMTPResponseException,
+    SMTPSenderRefused, SMTPServerDisconnected
+)
+from typing import BinaryIO, Deque, Dict, List, Optional, Tuple, Union
 
+from easy_notifyer.clients.dns import get_dns_cache
+from easy_notifyer.clients.smtp import (
+    RECIPIENT_OK, SENDER_OK, AsyncSMTP, AsyncSMTPPool, get_async_smtp_pool
+)
+from easy_notifyer.utils import (
+    COMPRESS_THRESHOLD, check_compression, compress_attach, run_in_executor
+)
 
-class Mailer:
-    """Object for send mail"""
+
+SMTPKey = Tuple[str, int, Optional[str], Optional[str], bool]
+
+HEADERS_CACHE_SIZE = 128
+
+
+class _SMTP(SMTP):
+    """Smtp session connected by cached addresses of server"""
+
+    def _get_socket(self, host, port, timeout):
+        return get_dns_cache().create_connection((host, port), timeout, self.source_address)
+
+
+class _SMTPSSL(SMTP_SSL, _SMTP):  # pylint: disable=too-many-ancestors
+    """Smtp session over SSL connected by cached addresses of server"""
+
+
+@functools.lru_cache(maxsize=HEADERS_CACHE_SIZE)
+def _encode_headers(from_addr: str, to_addrs: Tuple[str, ...], subject: Optional[str]) -> bytes:
+    """Encode From, To and Subject headers of message by SMTP policy"""
+    headers = [("From", from_addr), ("To", ", ".join(to_addrs))]
+    if subject is not None:
+        headers.append(("Subject", subject))
+    return "".join(
+        SMTP_POLICY.header_factory(name, value).fold(policy=SMTP_POLICY) for name, value in headers
+    ).encode("ascii")
+
+
+def _sendmail(conn: SMTP, from_addr: str, to_addrs: List[str], msg: bytes) -> Dict:
+    """Send message by smtplib session. MAIL FROM and all RCPT TO are sent in one round-trip
+    if server supports ESMTP PIPELINING.
+
+    Returns:
+        dict: refused recipients with reply of server.
+    """
+    conn.ehlo_or_helo_if_needed()
+    if not conn.has_extn("pipelining"):
+        return conn.sendmail(from_addr, to_addrs, msg)
+
+    commands = [f"MAIL FROM:<{from_addr}>\r\n"]
+    commands.extend(f"RCPT TO:<{addr}>\r\n" for addr in to_addrs)
+    conn.send("".join(commands))
+    sender_reply = conn.getreply()
+    refused = {}
+    for addr in to_addrs:
+        code, resp = conn.getreply()
+        if code not in RECIPIENT_OK:
+            refused[addr] = (code, resp)
+    if sender_reply[0] not in SENDER_OK:
+        conn.rset()
+        raise SMTPSenderRefused(sender_reply[0], sender_reply[1], from_addr)
+    if len(refused) == len(to_addrs):
+        conn.rset()
+        raise SMTPRecipientsRefused(refused)
+    code, resp = conn.data(msg)
+    if code != 250:
+        conn.rset()
+        raise SMTPDataError(code, resp)
+    return refused
+
+
+class SMTPPool:
+    """Thread-safe pool of authenticated smtp sessions of one server and account"""
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        port: int,
+        login: Optional[str],
+        password: Optional[str],
+        ssl: bool = False,
+        maxsize: int = 4,
+        idle_timeout: float = 60.0,
+        timeout: Optional[float] = 30.0,
+    ):
+        """
+        Args:
+            host (str): host of smtp server.
+            port (int): port of smtp server.
+            login (str, optional): login for auth in smtp server.
+            password (str, optional): password for auth in smtp server.
+            ssl (bool, optional): use SSL connection for smtp.
+            maxsize (int, optional): max count of idle sessions.
+            idle_timeout (float, optional): seconds after which an idle session is closed.
+            timeout (float, optional): socket timeout of sessions.
+        """
+        self._host = host
+        self._port = port
+        self._login = login
+        self._password = password
+        self._ssl = ssl
+        self._maxsize = maxsize
+        self._idle_timeout = idle_timeout
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._idle: Deque[Tuple[SMTP, float]] = deque()
+
+    def connect(self) -> SMTP:
+        """Open a new authenticated session"""
+        type_conn = _SMTPSSL if self._ssl is True else _SMTP
+        kwargs = {} if self._timeout is None else {"timeout": self._timeout}
+        conn = type_conn(host=self._host, port=self._port, **kwargs)
+        try:
+            if self._login is not None and self._password is not None:
+                conn.login(user=self._login, password=self._password)
+        except BaseException:
+            self.discard(conn)
+            raise
+        return conn
+
+    @staticmethod
+    def _is_alive(conn: SMTP) -> bool:
+        """Check idle session by NOOP command"""
+        try:
+            return conn.noop()[0] == 250
+        except (SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def discard(conn: SMTP) -> None:
+        """Close session without returning it to the pool"""
+        try:
+            conn.quit()
+        except (SMTPException, OSError):
+            conn.close()
+
+    def get(self) -> Tuple[SMTP, bool]:
+        """Take a session. Idle sessions are checked by NOOP before reuse.
+
+        Returns:
+            tuple: session and flag that session was reused from the pool.
+        """
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, released_at = self._idle.pop()
+            if time.monotonic() - released_at > self._idle_timeout:
+                self.discard(conn)
+                continue
+            if self._is_alive(conn) is False:
+                conn.close()
+                continue
+            return conn, True
+        return self.connect(), False
+
+    def put(self, conn: SMTP) -> None:
+        """Return session to the pool. Sessions idle for too long are closed.
+
+        Args:
+            conn (SMTP): session without transaction in progress.
+        """
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            while self._idle and now - self._idle[0][1] > self._idle_timeout:
+                expired.append(self._idle.popleft()[0])
+            if len(self._idle) < self._maxsize:
+                self._idle.append((conn, now))
+            else:
+                expired.append(conn)
+        for expired_conn in expired:
+            self.discard(expired_conn)
+
+    def close(self) -> None:
+        """Close all idle sessions"""
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for conn, _ in idle:
+            self.discard(conn)
+
+
+_smtp_pools: Dict[SMTPKey, SMTPPool] = {}
+_smtp_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(
+    *,
+    host: str,
+    port: int,
+    login: Optional[str],
+    password: Optional[str],
+    ssl: bool = False,
+) -> SMTPPool:
+    """Get pool of smtp sessions shared by all mailers with the same server and account."""
+    key = (host, port, login, password, ssl)
+    with _smtp_pools_lock:
+        pool = _smtp_pools.get(key)
+        if pool is None:
+            pool = _smtp_pools[key] = SMTPPool(
+                host=host, port=port, login=login, password=password, ssl=ssl
+            )
+        return pool
+
+
+def close_smtp_pools() -> None:
+    """Close sessions of all shared smtp pools"""
+    with _smtp_pools_lock:
+        pools = list(_smtp_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+class MailerBase:
+    """Base class of mailer"""
 
     def __init__(
         self,
@@ -17,6 +239,8 @@ class Mailer:
         login: str,
         password: str,
         ssl: bool = False,
+        compression: Optional[str] = None,
+        compress_threshold: int = COMPRESS_THRESHOLD,
     ):
         """
         Args:
@@ -25,12 +249,123 @@ class Mailer:
             login (str, optional): = login for auth in smtp server.
             password (str, optional): password for auth in smtp server.
             ssl (bool, optional): use SSL connection for smtp.
+            compression (str, optional): "gzip" or "zip" to compress attachments.
+            compress_threshold (int, optional): min size of attachment in bytes to compress.
         """
+        check_compression(compression)
         self._host = host
         self._port = port
         self._login = login
         self._password = password
         self._ssl = ssl
+        self._reused = False
+        self._compression = compression
+        self._compress_threshold = compress_threshold
+
+    def _compress_attach(
+        self, attach: Optional[Union[bytes, str, BinaryIO]], filename: Optional[str]
+    ) -> Tuple[Optional[Union[bytes, BinaryIO]], Optional[str]]:
+        """Compress attach if compression is set and it's not smaller than threshold.
+
+        Returns:
+            tuple: attach and filename, compressed or as is.
+        """
+        if self._compression is None or attach is None:
+            return attach, filename
+        if isinstance(attach, str):
+            attach = attach.encode()
+        filename, attach = compress_attach(
+            filename or uuid.uuid4().hex,
+            attach,
+            compression=self._compression,
+            threshold=self._compress_threshold,
+        )
+        return attach, filename
+
+    @staticmethod
+    def _format_message(
+        *,
+        from_addr: str,
+        to_addrs: List[str],
+        text: str,
+        subject: str,
+        attach: Union[bytes, str, BinaryIO],
+        filename: str,
+    ) -> bytes:
+        """Formatting message for send. Message is generated to bytes by SMTP policy, block of
+        From, To and Subject headers is encoded once for the same values.
+
+        Args:
+            from_addr (str): the address sending this mail.
+            to_addrs (list(str)): addresses to send this mail to.
+            subject (str, optional): subject of the mail.
+            attach (bytes, str, tuple, optional): file to send.
+            filename (str, optional): filename for attached file.
+
+        Returns:
+            bytes: message with headers, with CRLF line endings.
+        """
+        message = MIMEMultipart(policy=SMTP_POLICY)
+        message.attach(MIMEText(text, policy=SMTP_POLICY))
+
+        if attach is not None:
+            filename = filename or uuid.uuid4().hex
+            if hasattr(attach, "read") and isinstance(attach.read(0), bytes):
+                attach = attach.read()
+            elif hasattr(attach, "encode"):
+                attach = attach.encode()
+            message.attach(MIMEApplication(attach, name=filename, policy=SMTP_POLICY))
+
+        buffer = BytesIO()
+        buffer.write(_encode_headers(from_addr, tuple(to_addrs), subject))
+        BytesGenerator(buffer, policy=SMTP_POLICY).flatten(message)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _split_addrs(to_addrs: Union[str, List[str]]) -> List[str]:
+        """Get list of addresses from comma-separated string or list"""
+        if isinstance(to_addrs, str):
+            to_addrs = to_addrs.split(",")
+        return [mail.strip() for mail in to_addrs]
+
+
+class Mailer(MailerBase):
+    """Object for send mail"""
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        port: int,
+        login: str,
+        password: str,
+        ssl: bool = False,
+        pool: Optional[SMTPPool] = None,
+        compression: Optional[str] = None,
+        compress_threshold: int = COMPRESS_THRESHOLD,
+    ):
+        """
+        Args:
+            host (str, optional): = post of smtp server.
+            port (int, optional): = port of smtp server.
+            login (str, optional): = login for auth in smtp server.
+            password (str, optional): password for auth in smtp server.
+            ssl (bool, optional): use SSL connection for smtp.
+            pool (SMTPPool, optional): pool of sessions of the same server and account. If set,
+                session is taken from pool on connect and returned to it on disconnect.
+            compression (str, optional): "gzip" or "zip" to compress attachments.
+            compress_threshold (int, optional): min size of attachment in bytes to compress.
+        """
+        super().__init__(
+            host=host,
+            port=port,
+            login=login,
+            password=password,
+            ssl=ssl,
+            compression=compression,
+            compress_threshold=compress_threshold,
+        )
+        self._pool = pool
         self._connection: Optional[SMTP_SSL, SMTP] = None
 
     def __enter__(self):
@@ -38,12 +373,20 @@ class Mailer:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._pool is not None and exc_type is not None:
+            if not issubclass(exc_type, SMTPResponseException):
+                self._release(reuse=False)
+                return
         self.disconnect()
 
     def connect(self):
         """Connect to smtp-server and create session"""
+        if self._pool is not None:
+            if self._connection is None:
+                self._connection, self._reused = self._pool.get()
+            return
         if self._connection is None:
-            type_conn = SMTP_SSL if self._ssl is True else SMTP
+            type_conn = _SMTPSSL if self._ssl is True else _SMTP
             self._connection = type_conn(host=self._host, port=self._port)
         self.login()
 
@@ -53,48 +396,161 @@ class Mailer:
             self._connection.login(user=self._login, password=self._password)
 
     def disconnect(self):
-        """Terminate session"""
-        if self._connection is not None:
-            self._connection.quit()
+        """Terminate session, pooled session is returned to pool"""
+        if self._pool is not None:
+            self._release(reuse=True)
+        elif self._connection is not None:
+            conn, self._connection = self._connection, None
+            conn.quit()
 
-    @staticmethod
-    def _format_message(
+    def warmup(self) -> None:
+        """Resolve address of server, open session and check credentials by login, so the
+        first mail costs only sending. Session is kept in pool, without pool it's closed."""
+        self.connect()
+        self.disconnect()
+
+    def _release(self, reuse: bool) -> None:
+        """Return pooled session to pool, or close it if it's broken"""
+        conn, self._connection = self._connection, None
+        if conn is None:
+            return
+        if reuse is True:
+            self._pool.put(conn)
+        else:
+            self._pool.discard(conn)
+
+    def send_message(
+        self,
         *,
+        message: Optional[str] = None,
         from_addr: str,
-        to_addrs: List[str],
-        text: str,
-        subject: str,
-        attach: Union[bytes, str, BinaryIO],
-        filename: str,
-    ) -> MIMEMultipart:
-        """Formatting message for send.
+        to_addrs: Union[str, List[str]],
+        subject: Optional[str] = None,
+        attach: Optional[Union[bytes, str, BinaryIO]] = None,
+        filename: Optional[str] = None,
+    ):
+        """Send email.
 
         Args:
-            from_addr (str): the address sending this mail.
-            to_addrs (list(str)): addresses to send this mail to.
+            message (str, optional): Text body of message.
+            from_addr (str, optional): the address sending this mail.
+            to_addrs (str, list(str), optional): addresses to send this mail to.
             subject (str, optional): subject of the mail.
             attach (bytes, str, tuple, optional): file to send.
             filename (str, optional): filename for attached file.
+        """
+        to_addrs = self._split_addrs(to_addrs)
+        attach, filename = self._compress_attach(attach, filename)
+        msg = self._format_message(
+            from_addr=from_addr,
+            to_addrs=to_addrs,
+            text=message,
+            subject=subject,
+            attach=attach,
+            filename=filename,
+        )
 
-        Returns:
-            MIMEMultipart: multipart of message with body, from, to, attach and subject.
+        try:
+            _sendmail(self._connection, from_addr, to_addrs, msg)
+        except SMTPServerDisconnected:
+            if self._pool is None or self._reused is False:
+                raise
+            self._pool.discard(self._connection)
+            self._connection, self._reused = self._pool.connect(), False
+            _sendmail(self._connection, from_addr, to_addrs, msg)
+
+
+class MailerAsync(MailerBase):
+    """Async object for send mail. Sessions are pooled, network I/O doesn't use threads."""
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        port: int,
+        login: str,
+        password: str,
+        ssl: bool = False,
+        pool: Optional[AsyncSMTPPool] = None,
+        compression: Optional[str] = None,
+        compress_threshold: int = COMPRESS_THRESHOLD,
+        executor: Optional[Executor] = None,
+    ):
         """
-        message = MIMEMultipart()
-        message["From"] = from_addr
-        message["To"] = ", ".join(to_addrs)
-        message["Subject"] = subject
-        message.attach(MIMEText(text))
+        Args:
+            host (str, optional): = post of smtp server.
+            port (int, optional): = port of smtp server.
+            login (str, optional): = login for auth in smtp server.
+            password (str, optional): password for auth in smtp server.
+            ssl (bool, optional): use SSL connection for smtp.
+            pool (AsyncSMTPPool, optional): pool of sessions of the same server and account.
+                Default - pool shared by mailers of the running event loop.
+            compression (str, optional): "gzip" or "zip" to compress attachments, attachments
+                are compressed in executor.
+            compress_threshold (int, optional): min size of attachment in bytes to compress.
+            executor (Executor, optional): executor to compress attachments. Default - thread
+                pool of library.
+        """
+        super().__init__(
+            host=host,
+            port=port,
+            login=login,
+            password=password,
+            ssl=ssl,
+            compression=compression,
+            compress_threshold=compress_threshold,
+        )
+        self._pool = pool
+        self._connection: Optional[AsyncSMTP] = None
+        self._executor = executor
 
-        if attach is not None:
-            filename = filename or uuid.uuid4().hex
-            if hasattr(attach, "read") and isinstance(attach.read(0), bytes):
-                attach = attach.read()
-            elif hasattr(attach, "encode"):
-                attach = attach.encode()
-            message.attach(MIMEApplication(attach, name=filename))
-        return message
+    async def __aenter__(self):
+        await self.connect()
+        return self
 
-    def send_message(
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None and not issubclass(exc_type, SMTPResponseException):
+            await self._release(reuse=False)
+        else:
+            await self.disconnect()
+
+    def _get_pool(self) -> AsyncSMTPPool:
+        if self._pool is None:
+            self._pool = get_async_smtp_pool(
+                host=self._host,
+                port=self._port,
+                login=self._login,
+                password=self._password,
+                ssl=self._ssl,
+            )
+        return self._pool
+
+    async def connect(self):
+        """Take authenticated session from pool"""
+        if self._connection is None:
+            self._connection, self._reused = await self._get_pool().get()
+
+    async def disconnect(self):
+        """Return session to pool"""
+        await self._release(reuse=True)
+
+    async def warmup(self) -> None:
+        """Resolve address of server, open session and check credentials by login, so the
+        first mail costs only sending. Session is kept in pool of the running event loop."""
+        await self.connect()
+        await self.disconnect()
+
+    async def _release(self, reuse: bool) -> None:
+        """Return session to pool, or close it if it's broken"""
+        conn, self._connection = self._connection, None
+        if conn is None:
+            return
+        if reuse is True:
+            self._get_pool().put(conn)
+        else:
+            await self._get_pool().discard(conn)
+
+    async def send_message(
         self,
         *,
         message: Optional[str] = None,
@@ -114,7 +570,11 @@ class Mailer:
             attach (bytes, str, tuple, optional): file to send.
             filename (str, optional): filename for attached file.
         """
-        to_addrs = [mail.strip() for mail in to_addrs.split(",")]
+        to_addrs = self._split_addrs(to_addrs)
+        if self._compression is not None and attach is not None:
+            attach, filename = await run_in_executor(
+                self._executor, self._compress_attach, attach, filename
+            )
         msg = self._format_message(
             from_addr=from_addr,
             to_addrs=to_addrs,
@@ -124,4 +584,12 @@ class Mailer:
             filename=filename,
         )
 
-        self._connection.sendmail(from_addr=from_addr, to_addrs=to_addrs, msg=msg.as_string())
+        await self.connect()
+        try:
+            await self._connection.sendmail(from_addr, to_addrs, msg)
+        except SMTPServerDisconnected:
+            if self._reused is False:
+                raise
+            await self._release(reuse=False)
+            self._connection, self._reused = await self._get_pool().connect(), False
+            await self._connection.sendmail(from_addr, to_addrs, msg)
@@ -0,0 +1,337 @@
+import asyncio
+import atexit
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Deque, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+Task = Tuple[Future, Callable, tuple, dict]
+AsyncTask = Tuple[asyncio.AbstractEventLoop, Optional[Callable]]
+
+
+class Outbox:
+    """Bounded in-memory queue of sends drained by daemon worker threads. Queued sends are
+    flushed at interpreter shutdown."""
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = 1000,
+        workers: int = 1,
+        overflow: str = DROP_OLDEST,
+        block_timeout: Optional[float] = None,
+        shutdown_timeout: Optional[float] = 5.0,
+    ):
+        """
+        Args:
+            maxsize (int, optional): max count of queued sends.
+            workers (int, optional): count of worker threads.
+            overflow (str, optional): what to do with send if queue is full: "drop_oldest",
+                "drop_newest" or "block" caller until there is place in queue.
+            block_timeout (float, optional): max seconds to block caller with "block" policy,
+                send is dropped after timeout. None - wait without timeout.
+            shutdown_timeout (float, optional): seconds to flush queue at interpreter shutdown.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self._maxsize = maxsize
+        self._workers_count = max(1, workers)
+        self._overflow = overflow
+        self._block_timeout = block_timeout
+        self._queue: Deque[Task] = deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self._workers: List[threading.Thread] = []
+        self.dropped = 0
+        atexit.register(self.close, timeout=shutdown_timeout)
+
+    def _start_workers(self) -> None:
+        """Start worker threads at first send, under lock"""
+        while len(self._workers) < self._workers_count:
+            worker = threading.Thread(
+                target=self._run,
+                name=f"easy_notifyer-outbox-{len(self._workers)}",
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def _drop(self, task: Task) -> None:
+        """Cancel future of dropped send, under lock"""
+        self.dropped += 1
+        task[0].cancel()
+        logger.warning("Outbox is full, send is dropped.")
+
+    def submit(self, func: Callable, *args: Any, **kwargs: Any) -> Future:
+        """Put send to queue.
+
+        Args:
+            func (callable): function of send, called in worker thread.
+
+        Returns:
+            Future: result of func, cancelled if send was dropped.
+        """
+        task = (Future(), func, args, kwargs)
+        with self._cond:
+            if self._closed is True:
+                raise RuntimeError("Outbox is closed")
+            self._start_workers()
+            if len(self._queue) >= self._maxsize:
+                if self._overflow == DROP_NEWEST:
+                    self._drop(task)
+                    return task[0]
+                if self._overflow == DROP_OLDEST:
+                    self._drop(self._queue.popleft())
+                elif not self._cond.wait_for(
+                    lambda: len(self._queue) < self._maxsize, self._block_timeout
+                ):
+                    self._drop(task)
+                    return task[0]
+            self._queue.append(task)
+            self._cond.notify_all()
+        return task[0]
+
+    def _run(self) -> None:
+        """Loop of worker thread"""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                future, func, args, kwargs = self._queue.popleft()
+                self._in_flight += 1
+                self._cond.notify_all()
+            try:
+                if future.set_running_or_notify_cancel() is True:
+                    try:
+                        future.set_result(func(*args, **kwargs))
+                    except BaseException as error:  # noqa
+                        logger.exception("Send from outbox failed.")
+                        future.set_exception(error)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all queued sends are done.
+
+        Args:
+            timeout (float, optional): max seconds to wait. None - wait without timeout.
+
+        Returns:
+            bool: False if queue was not flushed in timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._queue and self._in_flight == 0, timeout
+            )
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Flush queue and stop workers. New sends are not accepted.
+
+        Args:
+            timeout (float, optional): max seconds to wait for queued sends.
+
+        Returns:
+            bool: False if queue was not flushed in timeout.
+        """
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        return flushed
+
+
+_default_outbox: Optional[Outbox] = None
+_default_outbox_lock = threading.Lock()
+
+
+def get_default_outbox() -> Outbox:
+    """Get outbox shared by all clients and reporters in background mode"""
+    global _default_outbox  # pylint: disable=global-statement
+    with _default_outbox_lock:
+        if _default_outbox is None:
+            _default_outbox = Outbox()
+        return _default_outbox
+
+
+class AsyncOutbox:
+    """Bounded set of background tasks of async sends. Tasks are kept by strong references
+    until they are done. Send of task cancelled by shutdown of event loop is handed to
+    fallback in outbox thread, fallbacks of tasks not done at interpreter shutdown are called
+    at exit, so in-flight sends are not lost."""
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = 100,
+        overflow: str = DROP_OLDEST,
+        block_timeout: Optional[float] = None,
+        outbox: Optional[Outbox] = None,
+    ):
+        """
+        Args:
+            maxsize (int, optional): max count of running tasks.
+            overflow (str, optional): what to do with send if set is full: "drop_oldest" task,
+                "drop_newest" send or "block" caller until one of tasks is done.
+            block_timeout (float, optional): max seconds to block caller with "block" policy,
+                send is dropped after timeout. None - wait without timeout.
+            outbox (Outbox, optional): outbox for fallbacks of cancelled tasks. Default -
+                outbox shared by all clients.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self._maxsize = max(1, maxsize)
+        self._overflow = overflow
+        self._block_timeout = block_timeout
+        self._outbox = outbox
+        self._tasks: "OrderedDict[asyncio.Future, AsyncTask]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.dropped = 0
+        atexit.register(self.close)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def _loop_tasks(self, loop: asyncio.AbstractEventLoop) -> List[asyncio.Future]:
+        """Running tasks of event loop"""
+        with self._lock:
+            return [task for task, (task_loop, _) in self._tasks.items() if task_loop is loop]
+
+    def _drop_oldest(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Cancel the oldest task without fallback"""
+        with self._lock:
+            task, (task_loop, _) = self._tasks.popitem(last=False)
+            self.dropped += 1
+        if task_loop is loop:
+            task.cancel()
+        else:
+            task_loop.call_soon_threadsafe(task.cancel)
+        logger.warning("Async outbox is full, the oldest send is dropped.")
+
+    def _drop_newest(self) -> None:
+        with self._lock:
+            self.dropped += 1
+        logger.warning("Async outbox is full, send is dropped.")
+
+    async def _wait_place(self, loop: asyncio.AbstractEventLoop) -> bool:
+        """Wait until count of tasks is less than max size, or block timeout is over"""
+        deadline = None if self._block_timeout is None else loop.time() + self._block_timeout
+        while len(self._tasks) >= self._maxsize:
+            tasks = self._loop_tasks(loop)
+            timeout = None if deadline is None else deadline - loop.time()
+            if not tasks or (timeout is not None and timeout <= 0):
+                return False
+            await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        return True
+
+    async def submit(
+        self,
+        func: Callable[..., Awaitable],
+        *args: Any,
+        fallback: Optional[Callable] = None,
+        **kwargs: Any,
+    ) -> Optional[asyncio.Future]:
+        """Start send as background task.
+
+        Args:
+            func (callable): coroutine function of send.
+            fallback (callable, optional): sync function of the same send, called if task is
+                cancelled by shutdown of event loop or is not done at interpreter shutdown.
+
+        Returns:
+            asyncio.Task: task of send, None if send was dropped.
+        """
+        if self._closed is True:
+            raise RuntimeError("Async outbox is closed")
+        loop = asyncio.get_event_loop()
+        if len(self._tasks) >= self._maxsize:
+            if self._overflow == DROP_OLDEST:
+                self._drop_oldest(loop)
+            elif self._overflow == DROP_NEWEST or await self._wait_place(loop) is False:
+                self._drop_newest()
+                return None
+        task = asyncio.ensure_future(func(*args, **kwargs))
+        with self._lock:
+            self._tasks[task] = (loop, fallback)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Future) -> None:
+        """Forget done task, hand send of cancelled task to fallback"""
+        with self._lock:
+            _, fallback = self._tasks.pop(task, (None, None))
+        if task.cancelled() is True:
+            if fallback is not None:
+                self._hand_off(fallback)
+        elif task.exception() is not None:
+            logger.error("Send from async outbox failed.", exc_info=task.exception())
+
+    def _hand_off(self, fallback: Callable) -> None:
+        """Send by fallback in outbox thread, or right away if outbox is closed"""
+        try:
+            (self._outbox or get_default_outbox()).submit(fallback)
+        except RuntimeError:
+            self._call(fallback)
+
+    @staticmethod
+    def _call(fallback: Callable) -> None:
+        try:
+            fallback()
+        except Exception:  # noqa
+            logger.exception("Fallback of async send failed.")
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until tasks of running event loop are done. Should be awaited at graceful
+        shutdown of application, before event loop is stopped.
+
+        Args:
+            timeout (float, optional): max seconds to wait. None - wait without timeout.
+
+        Returns:
+            bool: False if tasks were not done in timeout.
+        """
+        loop = asyncio.get_event_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        tasks = self._loop_tasks(loop)
+        while tasks:
+            timeout = None if deadline is None else deadline - loop.time()
+            if timeout is not None and timeout <= 0:
+                return False
+            await asyncio.wait(tasks, timeout=timeout)
+            tasks = self._loop_tasks(loop)
+        return True
+
+    def close(self) -> None:
+        """Stop accepting sends, call fallbacks of tasks which are not done. Tasks are not
+        run anymore, if their event loop is stopped."""
+        with self._lock:
+            self._closed = True
+            pending, self._tasks = self._tasks, OrderedDict()
+        for task, (_, fallback) in pending.items():
+            if task.done() is False and fallback is not None:
+                self._call(fallback)
+
+
+_default_async_outbox: Optional[AsyncOutbox] = None
+
+
+def get_default_async_outbox() -> AsyncOutbox:
+    """Get async outbox shared by all reporters in background mode"""
+    global _default_async_outbox  # pylint: disable=global-statement
+    with _default_outbox_lock:
+        if _default_async_outbox is None:
+            _default_async_outbox = AsyncOutbox()
+        return _default_async_outbox
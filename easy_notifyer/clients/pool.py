@@ -0,0 +1,288 @@
+import asyncio
+import select
+import socket
+import ssl
+import threading
+import time
+import weakref
+from collections import deque
+from http.client import HTTPConnection, HTTPSConnection
+from typing import Deque, Dict, Optional, Tuple
+from urllib.request import getproxies, proxy_bypass
+
+from easy_notifyer.clients.dns import DNSCache, get_dns_cache
+
+
+PoolKey = Tuple[str, str, int]
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive http connections, grouped by host"""
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = 10,
+        idle_timeout: float = 60.0,
+        timeout: Optional[float] = 30.0,
+        dns_cache: Optional[DNSCache] = None,
+    ):
+        """
+        Args:
+            maxsize (int, optional): max count of idle connections kept for one host.
+            idle_timeout (float, optional): seconds after which an idle connection is closed.
+            timeout (float, optional): socket timeout of connections.
+            dns_cache (DNSCache, optional): cache of addresses of hosts. Default - cache shared
+                by all connections.
+        """
+        self._dns_cache = dns_cache or get_dns_cache()
+        self._maxsize = maxsize
+        self._idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle: Dict[PoolKey, Deque[Tuple[HTTPConnection, float]]] = {}
+
+    @staticmethod
+    def _is_dropped(conn: HTTPConnection) -> bool:
+        """Check that server closed the socket of idle connection. Readable idle socket
+        means EOF or unexpected data, both make connection unusable."""
+        if conn.sock is None:
+            return True
+        try:
+            readable, _, _ = select.select([conn.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def _new_connection(self, scheme: str, host: str, port: int) -> HTTPConnection:
+        """Create a new connection, tunneled through proxy from environment if it's configured."""
+        conn_type = HTTPSConnection if scheme == "https" else HTTPConnection
+        proxy = getproxies().get(scheme)
+        if proxy is not None and not proxy_bypass(host):
+            proxy_host, _, proxy_port = proxy.split("://", 1)[-1].rstrip("/").partition(":")
+            conn = conn_type(proxy_host, int(proxy_port or 80), timeout=self.timeout)
+            conn.set_tunnel(host, port)
+        else:
+            conn = conn_type(host, port, timeout=self.timeout)
+        conn._create_connection = (  # pylint: disable=protected-access
+            self._dns_cache.create_connection
+        )
+        return conn
+
+    def get(self, key: PoolKey) -> Tuple[HTTPConnection, bool]:
+        """Take a connection for host.
+
+        Args:
+            key (tuple): (scheme, host, port) of server.
+
+        Returns:
+            tuple: connection and flag that connection was reused from the pool.
+        """
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                conn, released_at = idle.pop()
+            if now - released_at > self._idle_timeout or self._is_dropped(conn):
+                conn.close()
+                continue
+            return conn, True
+        return self._new_connection(*key), False
+
+    def put(self, key: PoolKey, conn: HTTPConnection) -> None:
+        """Return connection to the pool. Connection is closed if pool of host is full.
+
+        Args:
+            key (tuple): (scheme, host, port) of server.
+            conn (HTTPConnection): connection with fully read response.
+        """
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            if len(idle) < self._maxsize:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn, _ in connections:
+                conn.close()
+
+
+_default_pool: Optional[ConnectionPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> ConnectionPool:
+    """Get connection pool shared by all clients without own pool."""
+    global _default_pool  # pylint: disable=global-statement
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ConnectionPool()
+        return _default_pool
+
+
+class AsyncConnection:
+    """Keep-alive connection over asyncio streams"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(
+        cls,
+        key: PoolKey,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ) -> "AsyncConnection":
+        """Open connection to server, tunneled through proxy from environment if it's configured.
+
+        Args:
+            key (tuple): (scheme, host, port) of server.
+            ssl_context (SSLContext, optional): context for https connections.
+
+        Returns:
+            AsyncConnection: opened connection.
+        """
+        scheme, host, port = key
+        tls = None
+        if scheme == "https":
+            tls = ssl_context or ssl.create_default_context()
+
+        proxy = getproxies().get(scheme)
+        if proxy is None or proxy_bypass(host):
+            reader, writer = await get_dns_cache().open_connection(
+                host, port, ssl=tls, server_hostname=host if tls else None
+            )
+            return cls(reader, writer)
+
+        proxy_host, _, proxy_port = proxy.split("://", 1)[-1].rstrip("/").partition(":")
+        sock = await cls._open_tunnel(proxy_host, int(proxy_port or 80), host, port)
+        reader, writer = await asyncio.open_connection(
+            sock=sock, ssl=tls, server_hostname=host if tls else None
+        )
+        return cls(reader, writer)
+
+    @staticmethod
+    async def _open_tunnel(proxy_host: str, proxy_port: int, host: str, port: int) -> socket.socket:
+        """Create tunnel to server by CONNECT method of proxy. Handshake is made on the raw
+        socket, so TLS can be started on the top of it by asyncio.open_connection."""
+        loop = asyncio.get_event_loop()
+        family, type_, proto, _, address = (
+            await get_dns_cache().aresolve(proxy_host, proxy_port)
+        )[0]
+        sock = socket.socket(family, type_, proto)
+        sock.setblocking(False)
+        try:
+            await loop.sock_connect(sock, address)
+            request = f"CONNECT {host}:{port} HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n"
+            await loop.sock_sendall(sock, request.encode("ascii"))
+            response = b""
+            while b"\r\n\r\n" not in response:
+                chunk = await loop.sock_recv(sock, 4096)
+                if not chunk:
+                    raise ConnectionError("Proxy closed connection")
+                response += chunk
+            status_line = response.split(b"\r\n", 1)[0].split()
+            if len(status_line) < 2 or status_line[1] != b"200":
+                raise ConnectionError(f"Tunnel connection failed: {status_line}")
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def is_dropped(self) -> bool:
+        """Check that server closed the connection or sent unexpected data."""
+        return (
+            self.writer.is_closing() is True
+            or self.reader.at_eof() is True
+            or len(self.reader._buffer) > 0  # pylint: disable=protected-access
+        )
+
+    def close(self) -> None:
+        """Close connection"""
+        self.writer.close()
+
+
+class AsyncConnectionPool:
+    """Pool of keep-alive asyncio connections, grouped by host. Pool is bound to the event loop
+    where connections were opened."""
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = 10,
+        idle_timeout: float = 60.0,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        """
+        Args:
+            maxsize (int, optional): max count of idle connections kept for one host.
+            idle_timeout (float, optional): seconds after which an idle connection is closed.
+            ssl_context (SSLContext, optional): context for https connections. Default -
+                ssl.create_default_context().
+        """
+        self._maxsize = maxsize
+        self._idle_timeout = idle_timeout
+        self._ssl_context = ssl_context
+        self._idle: Dict[PoolKey, Deque[Tuple[AsyncConnection, float]]] = {}
+
+    async def get(self, key: PoolKey) -> Tuple[AsyncConnection, bool]:
+        """Take a connection for host.
+
+        Args:
+            key (tuple): (scheme, host, port) of server.
+
+        Returns:
+            tuple: connection and flag that connection was reused from the pool.
+        """
+        now = time.monotonic()
+        idle = self._idle.get(key)
+        while idle:
+            conn, released_at = idle.pop()
+            if now - released_at > self._idle_timeout or conn.is_dropped():
+                conn.close()
+                continue
+            return conn, True
+        return await AsyncConnection.open(key, self._ssl_context), False
+
+    def put(self, key: PoolKey, conn: AsyncConnection) -> None:
+        """Return connection to the pool. Connection is closed if pool of host is full.
+
+        Args:
+            key (tuple): (scheme, host, port) of server.
+            conn (AsyncConnection): connection with fully read response.
+        """
+        idle = self._idle.setdefault(key, deque())
+        if len(idle) < self._maxsize:
+            idle.append((conn, time.monotonic()))
+        else:
+            conn.close()
+
+    async def close(self) -> None:
+        """Close all idle connections"""
+        idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn, _ in connections:
+                conn.close()
+                try:
+                    await conn.writer.wait_closed()
+                except (OSError, ssl.SSLError):
+                    pass
+
+
+_default_async_pools: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_default_async_pool() -> AsyncConnectionPool:
+    """Get async connection pool shared by all clients of the running event loop."""
+    loop = asyncio.get_event_loop()
+    pool = _default_async_pools.get(loop)
+    if pool is None:
+        pool = _default_async_pools[loop] = AsyncConnectionPool()
+    return pool
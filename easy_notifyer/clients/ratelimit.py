@@ -0,0 +1,184 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple, Type, Union
+
+from easy_notifyer.clients.retry import DeadlineExceeded
+
+
+ChatId = Union[int, str]
+
+GLOBAL = "__global__"
+MAX_TRACKED_CHATS = 10000
+
+
+class RateLimitPolicy:
+    """Limits of telegram bot api. Defaults are from https://core.telegram.org/bots/faq"""
+
+    def __init__(
+        self,
+        *,
+        global_rate: float = 30.0,
+        global_burst: int = 30,
+        chat_rate: float = 1.0,
+        chat_burst: int = 1,
+        group_rate: float = 20 / 60,
+        group_burst: int = 20,
+    ):
+        """
+        Args:
+            global_rate (float, optional): messages per second for bot.
+            global_burst (int, optional): messages of bot can be sent at once.
+            chat_rate (float, optional): messages per second for one chat.
+            chat_burst (int, optional): messages to one chat can be sent at once.
+            group_rate (float, optional): messages per second for one group or channel.
+            group_burst (int, optional): messages to one group can be sent at once.
+        """
+        self.global_limit = (global_rate, global_burst)
+        self.chat_limit = (chat_rate, chat_burst)
+        self.group_limit = (group_rate, group_burst)
+
+    @staticmethod
+    def is_group(chat_id: ChatId) -> bool:
+        """Check that chat is group or channel: ids of groups are negative, channels can be
+        addressed by @username."""
+        chat_id = str(chat_id)
+        return chat_id.startswith("-") or chat_id.startswith("@")
+
+    def limits(self, chat_id: ChatId) -> Tuple[Tuple[float, int], ...]:
+        """Get limits (rate, burst) for sending to chat"""
+        if self.is_group(chat_id) is True:
+            return self.chat_limit, self.group_limit
+        return (self.chat_limit,)
+
+
+class RateLimiterBase:
+    """Token buckets of one bot in form of generic cell rate algorithm. Send is reserved in all
+    buckets of chat and bot at once, so the time of send is known right away and caller
+    only waits for it."""
+
+    def __init__(self, policy: Optional[RateLimitPolicy] = None):
+        """
+        Args:
+            policy (RateLimitPolicy, optional): limits of api. Default - limits of telegram.
+        """
+        self.policy = policy or RateLimitPolicy()
+        self._lock = threading.Lock()
+        self._arrivals: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._blocked: Dict[ChatId, float] = {}
+
+    def _ready_at(self, key: Hashable, limit: Tuple[float, int], now: float) -> float:
+        """Get time when bucket allows next send"""
+        rate, burst = limit
+        return self._arrivals.get(key, now) - (burst - 1) / rate
+
+    def _consume(self, key: Hashable, limit: Tuple[float, int], at_time: float) -> None:
+        """Take token of bucket at time of send"""
+        self._arrivals[key] = max(self._arrivals.get(key, at_time), at_time) + 1 / limit[0]
+        self._arrivals.move_to_end(key)
+
+    def _reserve(self, chat_id: ChatId, deadline: Optional[float] = None) -> float:
+        """Reserve send to chat in buckets of bot and chat. Bot bucket is taken at time of
+        reservation, so send delayed by limits of one chat doesn't hold sends to other chats.
+
+        Args:
+            chat_id (int, str): chat of message.
+            deadline (float, optional): time in time.monotonic() clock. DeadlineExceeded is
+                raised and nothing is reserved, if message can't be sent before deadline.
+
+        Returns:
+            float: seconds to wait before send.
+        """
+        chat_limits = self.policy.limits(chat_id)
+        with self._lock:
+            now = time.monotonic()
+            global_at = max(
+                now,
+                self._blocked.get(GLOBAL, now),
+                self._ready_at(GLOBAL, self.policy.global_limit, now),
+            )
+            send_at = max(global_at, self._blocked.get(chat_id, now))
+            for index, limit in enumerate(chat_limits):
+                send_at = max(send_at, self._ready_at((chat_id, index), limit, now))
+            if deadline is not None and send_at > deadline:
+                raise DeadlineExceeded(
+                    "Rate limit of telegram doesn't allow to send before deadline"
+                )
+
+            self._consume(GLOBAL, self.policy.global_limit, global_at)
+            for index, limit in enumerate(chat_limits):
+                self._consume((chat_id, index), limit, send_at)
+
+            while len(self._arrivals) > MAX_TRACKED_CHATS:
+                self._arrivals.popitem(last=False)
+            if self._blocked.get(chat_id, send_at) < send_at:
+                del self._blocked[chat_id]
+        return send_at - now
+
+    def penalize(self, chat_id: Optional[ChatId], retry_after: float) -> None:
+        """Block sends after telegram responded with 429.
+
+        Args:
+            chat_id (int, str, optional): blocked chat. None - all chats of bot are blocked.
+            retry_after (float): seconds from response of telegram.
+        """
+        key = GLOBAL if chat_id is None else chat_id
+        with self._lock:
+            until = time.monotonic() + retry_after
+            self._blocked[key] = max(self._blocked.get(key, until), until)
+
+
+class RateLimiter(RateLimiterBase):
+    """Rate limiter of bot for sync clients"""
+
+    def acquire(self, chat_id: ChatId, deadline: Optional[float] = None) -> None:
+        """Wait until message can be sent to chat.
+
+        Args:
+            chat_id (int, str): chat of message.
+            deadline (float, optional): time in time.monotonic() clock. DeadlineExceeded is
+                raised without waiting, if message can't be sent before deadline.
+        """
+        delay = self._reserve(chat_id, deadline)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class AsyncRateLimiter(RateLimiterBase):
+    """Rate limiter of bot for async clients"""
+
+    async def acquire(self, chat_id: ChatId, deadline: Optional[float] = None) -> None:
+        """Wait until message can be sent to chat.
+
+        Args:
+            chat_id (int, str): chat of message.
+            deadline (float, optional): time in time.monotonic() clock. DeadlineExceeded is
+                raised without waiting, if message can't be sent before deadline.
+        """
+        delay = self._reserve(chat_id, deadline)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_limiters: Dict[Tuple[Type[RateLimiterBase], str], RateLimiterBase] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    limiter_type: Type[RateLimiterBase],
+    token: str,
+    policy: Optional[RateLimitPolicy] = None,
+) -> RateLimiterBase:
+    """Get rate limiter of bot shared by all clients with the same token.
+
+    Args:
+        limiter_type (type): RateLimiter or AsyncRateLimiter.
+        token (str): token of bot.
+        policy (RateLimitPolicy, optional): limits for limiter created at first call.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get((limiter_type, token))
+        if limiter is None:
+            limiter = _limiters[(limiter_type, token)] = limiter_type(policy)
+        return limiter
@@ -0,0 +1,90 @@
+import threading
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple, Union
+
+from easy_notifyer.clients.mailer import close_smtp_pools
+from easy_notifyer.clients.smtp import close_async_smtp_pools
+from easy_notifyer.clients.telegram import Telegram, TelegramAsync
+from easy_notifyer.utils import run_in_threadpool
+
+
+TelegramKey = Tuple[
+    Union[str, Tuple[str, ...]], Tuple[Union[int, str], ...], Optional[str], Optional[Executor]
+]
+
+_telegram_clients: Dict[TelegramKey, Telegram] = {}
+_telegram_async_clients: Dict[TelegramKey, TelegramAsync] = {}
+_clients_lock = threading.Lock()
+
+
+def _telegram_key(
+    token: Union[str, List[str]],
+    chat_id: Union[List[int], int, List[str], str],
+    api_url: Optional[str],
+    executor: Optional[Executor],
+) -> TelegramKey:
+    chat_ids = (chat_id,) if isinstance(chat_id, (int, str)) else tuple(chat_id)
+    tokens = token if isinstance(token, str) else tuple(token)
+    return tokens, chat_ids, api_url, executor
+
+
+def _key_tokens(key: TelegramKey) -> Union[str, List[str]]:
+    return key[0] if isinstance(key[0], str) else list(key[0])
+
+
+def get_telegram(
+    *,
+    token: Union[str, List[str]],
+    chat_id: Union[List[int], int, List[str], str],
+    api_url: Optional[str] = None,
+    executor: Optional[Executor] = None,
+) -> Telegram:
+    """Get client of telegram shared by reporters with the same bots, chats, api url and
+    executor."""
+    key = _telegram_key(token, chat_id, api_url, executor)
+    with _clients_lock:
+        client = _telegram_clients.get(key)
+        if client is None:
+            client = _telegram_clients[key] = Telegram(
+                token=_key_tokens(key), chat_id=list(key[1]), api_url=api_url, executor=executor
+            )
+        return client
+
+
+def get_telegram_async(
+    *,
+    token: Union[str, List[str]],
+    chat_id: Union[List[int], int, List[str], str],
+    api_url: Optional[str] = None,
+    executor: Optional[Executor] = None,
+) -> TelegramAsync:
+    """Get async client of telegram shared by reporters with the same bots, chats, api url and
+    executor. Client can be used in any event loop."""
+    key = _telegram_key(token, chat_id, api_url, executor)
+    with _clients_lock:
+        client = _telegram_async_clients.get(key)
+        if client is None:
+            client = _telegram_async_clients[key] = TelegramAsync(
+                token=_key_tokens(key), chat_id=list(key[1]), api_url=api_url, executor=executor
+            )
+        return client
+
+
+def close_clients() -> None:
+    """Close shared clients of reporters: thread pools, idle connections and smtp sessions.
+    Clients stay in registry and open connections again on the next report."""
+    with _clients_lock:
+        clients = list(_telegram_clients.values())
+    for client in clients:
+        client.close()
+    close_smtp_pools()
+
+
+async def aclose_clients() -> None:
+    """Close shared clients of reporters, connections of the running event loop included."""
+    with _clients_lock:
+        clients = list(_telegram_async_clients.values())
+    for client in clients:
+        await client.aclose()
+    await close_async_smtp_pools()
+    await run_in_threadpool(close_clients)
@@ -1,10 +1,40 @@
 # pylint: disable=too-few-public-methods
-from http.client import HTTPResponse as Response
-from typing import Dict, Optional
-from urllib import request
+import asyncio
+import json
+from email.parser import Parser
+from http.client import HTTPException, HTTPMessage, RemoteDisconnected
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.error import HTTPError
 from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
 
-from easy_notifyer.utils import MultiPartForm, run_in_threadpool
+from easy_notifyer.clients.pool import (
+    AsyncConnection, AsyncConnectionPool, ConnectionPool, get_default_async_pool, get_default_pool
+)
+from easy_notifyer.utils import MultiPartForm
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class Response:
+    """Response of request with fully read body"""
+
+    def __init__(self, *, url: str, status: int, reason: str, headers: HTTPMessage, content: bytes):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    def json(self) -> Any:
+        """Decode json body of response"""
+        return json.loads(self.content.decode("utf-8"))
+
+    def raise_for_status(self):
+        """Raise HTTPError if status of response is not successful, same as urlopen."""
+        if self.status >= 400:
+            raise HTTPError(self.url, self.status, self.reason, self.headers, BytesIO(self.content))
 
 
 class RequestsBase:
@@ -20,10 +50,70 @@ class RequestsBase:
 
 
 class Requests(RequestsBase):
-    """Client for requests"""
+    """Client for requests with keep-alive connections"""
+
+    def __init__(self, pool: Optional[ConnectionPool] = None):
+        """
+        Args:
+            pool (ConnectionPool, optional): pool of connections. Default - pool shared by
+                all clients.
+        """
+        self._pool = pool or get_default_pool()
 
-    def __init__(self):
-        self._client = request.Request
+    def close(self) -> None:
+        """Close idle connections of pool"""
+        self._pool.close()
+
+    def _urlopen(
+        self,
+        *,
+        method: str,
+        url: str,
+        headers: Dict,
+        data: Optional[Union[bytes, MultiPartForm]],
+        timeout: Optional[float] = None,
+    ) -> Response:
+        """Send request over pooled connection. Request is sent again over a new connection
+        once, if server has closed reused keep-alive connection before response. Multipart form
+        is streamed by chunks."""
+        parsed = urlparse(url)
+        scheme = parsed.scheme or "http"
+        key = (scheme, parsed.hostname, parsed.port or DEFAULT_PORTS[scheme])
+        path = parsed.path or "/"
+        if parsed.query:
+            path = f"{path}?{parsed.query}"
+
+        while True:
+            conn, reused = self._pool.get(key)
+            conn.timeout = timeout if timeout is not None else self._pool.timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+            try:
+                conn.request(method, path, body=data, headers=headers)
+                resp = conn.getresponse()
+                content = resp.read()
+            except (RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused is True:
+                    continue
+                raise
+            except (OSError, HTTPException):
+                conn.close()
+                raise
+
+            if resp.will_close is True:
+                conn.close()
+            else:
+                self._pool.put(key, conn)
+            response = Response(
+                url=url,
+                status=resp.status,
+                reason=resp.reason,
+                headers=resp.msg,
+                content=content,
+            )
+            response.raise_for_status()
+            return response
 
     def post(
         self,
@@ -33,27 +123,164 @@ class Requests(RequestsBase):
         params: Optional[Dict] = None,
         body: Optional[Dict] = None,
         files: Optional[Dict] = None,
+        timeout: Optional[float] = None,
     ) -> Response:
-        """Send post request"""
+        """Send post request.
+
+        Args:
+            timeout (float, optional): socket timeout of request. Default - timeout of pool.
+        """
         data = None
         headers = headers or {}
         if params is not None:
             url = self._add_params(url, params)
         if body is not None or files is not None:
-            form = MultiPartForm(body=body, files=files)
-            data = bytes(form)
-            headers = {**headers, **form.header}
+            data = MultiPartForm(body=body, files=files)
+            headers = {**headers, **data.header, "Content-Length": str(data.content_length)}
 
-        req = self._client(url=url, headers=headers, data=data)
-        resp = request.urlopen(req)
-        return resp
+        return self._urlopen(method="POST", url=url, headers=headers, data=data, timeout=timeout)
 
 
-class AsyncRequests:
-    """Async client for requests"""
+class AsyncRequests(RequestsBase):
+    """Async client for requests. Http/1.1 over asyncio streams with keep-alive connections,
+    network I/O doesn't use threads."""
 
-    def __init__(self):
-        self._client = Requests()
+    def __init__(
+        self,
+        pool: Optional[AsyncConnectionPool] = None,
+        timeout: Optional[float] = 30.0,
+    ):
+        """
+        Args:
+            pool (AsyncConnectionPool, optional): pool of connections. Default - pool shared by
+                all clients of the running event loop.
+            timeout (float, optional): timeout of the whole request in seconds.
+        """
+        self._pool = pool
+        self._timeout = timeout
+
+    async def aclose(self) -> None:
+        """Close idle connections of pool of the running event loop"""
+        await (self._pool or get_default_async_pool()).close()
+
+    @staticmethod
+    async def _read_body(reader: asyncio.StreamReader, headers: HTTPMessage) -> bytes:
+        """Read body of response by chunked encoding, content-length or until EOF"""
+        if "chunked" in headers.get("Transfer-Encoding", "").lower():
+            chunks = []
+            while True:
+                size_line = await reader.readline()
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return b"".join(chunks)
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+        length = headers.get("Content-Length")
+        if length is not None:
+            return await reader.readexactly(int(length))
+        return await reader.read()
+
+    async def _exchange(
+        self,
+        conn: AsyncConnection,
+        *,
+        method: str,
+        host: str,
+        path: str,
+        headers: Dict,
+        data: Optional[Union[bytes, MultiPartForm]],
+    ) -> Tuple[int, str, HTTPMessage, bytes, bool]:
+        """Write request to connection and read response. Multipart form is streamed by chunks
+        with respect to flow control of transport.
+
+        Returns:
+            tuple: status, reason, headers, body and flag that connection can be reused.
+        """
+        data = data or b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        if "Content-Length" not in headers:
+            lines.append(f"Content-Length: {len(data)}")
+        conn.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if isinstance(data, MultiPartForm):
+            for chunk in data:
+                conn.writer.write(chunk)
+                await conn.writer.drain()
+        else:
+            conn.writer.write(data)
+        await conn.writer.drain()
+
+        status_line = await conn.reader.readline()
+        if not status_line:
+            raise RemoteDisconnected("Remote end closed connection without response")
+        version, status, reason = (status_line.decode("latin-1").rstrip() + " ").split(" ", 2)
+        raw_headers = []
+        while True:
+            line = await conn.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            raw_headers.append(line.decode("latin-1"))
+        resp_headers = Parser(_class=HTTPMessage).parsestr("".join(raw_headers))
+        content = await self._read_body(conn.reader, resp_headers)
+
+        connection = resp_headers.get("Connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        keep_alive = keep_alive and (
+            "Content-Length" in resp_headers or "Transfer-Encoding" in resp_headers
+        )
+        return int(status), reason.strip(), resp_headers, content, keep_alive
+
+    async def _urlopen(
+        self,
+        *,
+        method: str,
+        url: str,
+        headers: Dict,
+        data: Optional[Union[bytes, MultiPartForm]],
+    ) -> Response:
+        """Send request over pooled connection. Request is sent again over a new connection
+        once, if server has closed reused keep-alive connection before response. Connection
+        is closed if request was cancelled or timed out."""
+        pool = self._pool or get_default_async_pool()
+        parsed = urlparse(url)
+        scheme = parsed.scheme or "http"
+        port = parsed.port or DEFAULT_PORTS[scheme]
+        key = (scheme, parsed.hostname, port)
+        host = parsed.hostname if parsed.port is None else f"{parsed.hostname}:{port}"
+        path = parsed.path or "/"
+        if parsed.query:
+            path = f"{path}?{parsed.query}"
+
+        while True:
+            conn, reused = await pool.get(key)
+            try:
+                status, reason, resp_headers, content, keep_alive = await self._exchange(
+                    conn, method=method, host=host, path=path, headers=headers, data=data
+                )
+            except (RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused is True:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+            if keep_alive is True:
+                pool.put(key, conn)
+            else:
+                conn.close()
+            response = Response(
+                url=url,
+                status=status,
+                reason=reason,
+                headers=resp_headers,
+                content=content,
+            )
+            response.raise_for_status()
+            return response
 
     async def post(
         self,
@@ -63,13 +290,22 @@ class AsyncRequests:
         headers: Optional[Dict] = None,
         body: Optional[Dict] = None,
         files: Optional[Dict] = None,
+        timeout: Optional[float] = None,
     ) -> Response:
-        """Send async post request"""
-        return await run_in_threadpool(
-            self._client.post,
-            url=url,
-            headers=headers,
-            params=params,
-            body=body,
-            files=files,
+        """Send async post request.
+
+        Args:
+            timeout (float, optional): timeout of request. Default - timeout of client.
+        """
+        data = None
+        headers = headers or {}
+        if params is not None:
+            url = self._add_params(url, params)
+        if body is not None or files is not None:
+            data = MultiPartForm(body=body, files=files)
+            headers = {**headers, **data.header, "Content-Length": str(data.content_length)}
+
+        return await asyncio.wait_for(
+            self._urlopen(method="POST", url=url, headers=headers, data=data),
+            timeout if timeout is not None else self._timeout,
         )
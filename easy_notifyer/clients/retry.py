@@ -0,0 +1,147 @@
+import asyncio
+import random
+import socket
+import threading
+import time
+from http.client import HTTPException
+from smtplib import SMTPRecipientsRefused, SMTPResponseException, SMTPServerDisconnected
+from typing import Dict, Optional, Tuple, Type
+from urllib.error import HTTPError
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_EXCEPTIONS = (
+    ConnectionError,
+    TimeoutError,
+    socket.timeout,
+    asyncio.TimeoutError,
+    HTTPException,
+    SMTPServerDisconnected,
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Time budget of notification is over"""
+
+
+class RetryStats:
+    """Thread-safe counters of attempts and outcomes of requests"""
+
+    FIELDS = ("attempts", "retries", "successes", "failures", "deadline_exceeded")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self.FIELDS, 0)
+
+    def incr(self, field: str) -> None:
+        """Increment counter by one"""
+        with self._lock:
+            self._counters[field] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """Get copy of counters"""
+        with self._lock:
+            return dict(self._counters)
+
+
+class RetryPolicy:
+    """Policy of retrying failed requests: exponential backoff with jitter, bounded by count of
+    attempts and by deadline of notification."""
+
+    def __init__(
+        self,
+        *,
+        max_attempts: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 10.0,
+        jitter: float = 1.0,
+        deadline: Optional[float] = 30.0,
+        retry_statuses: Tuple[int, ...] = RETRY_STATUSES,
+        retry_exceptions: Tuple[Type[BaseException], ...] = RETRY_EXCEPTIONS,
+    ):
+        """
+        Args:
+            max_attempts (int, optional): max count of attempts of one request, 1 - no retries.
+            backoff (float, optional): delay before first retry in seconds, doubled every retry.
+            max_backoff (float, optional): max delay between attempts.
+            jitter (float, optional): part of delay in 0..1 that is randomized, so clients
+                failed together don't retry together.
+            deadline (float, optional): time budget of one notification in seconds, including
+                all attempts and waiting. None - without deadline.
+            retry_statuses (tuple(int), optional): http statuses of response to retry.
+            retry_exceptions (tuple(exception), optional): errors of connection to retry.
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.deadline = deadline
+        self.retry_statuses = retry_statuses
+        self.retry_exceptions = retry_exceptions
+        self.stats = RetryStats()
+
+    def get_deadline(self) -> Optional[float]:
+        """Get deadline of notification started now, in time.monotonic() clock"""
+        if self.deadline is None:
+            return None
+        return time.monotonic() + self.deadline
+
+    @staticmethod
+    def remaining(deadline: Optional[float]) -> Optional[float]:
+        """Get seconds left until deadline"""
+        if deadline is None:
+            return None
+        return max(deadline - time.monotonic(), 0.0)
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Check that request failed with error can be retried. Smtp replies are retried for
+        transient codes 4xx."""
+        if isinstance(error, HTTPError):
+            return error.code in self.retry_statuses
+        if isinstance(error, DeadlineExceeded):
+            return False
+        if isinstance(error, SMTPRecipientsRefused):
+            return all(400 <= code < 500 for code, _ in error.recipients.values())
+        if isinstance(error, SMTPResponseException):
+            return 400 <= error.smtp_code < 500
+        return isinstance(error, self.retry_exceptions)
+
+    def is_transient(self, error: BaseException) -> bool:
+        """Check that notification failed with error can be sent later: error is retryable or
+        deadline of notification is over"""
+        return isinstance(error, DeadlineExceeded) or self.is_retryable(error)
+
+    def next_delay(
+        self,
+        attempt: int,
+        error: BaseException,
+        *,
+        deadline: Optional[float] = None,
+        retry_after: Optional[float] = None,
+    ) -> Optional[float]:
+        """Get delay before next attempt and count outcome of failed attempt.
+
+        Args:
+            attempt (int): number of failed attempt, from 1.
+            error (exception): error of failed attempt.
+            deadline (float, optional): deadline of notification.
+            retry_after (float, optional): delay requested by server.
+
+        Returns:
+            float, optional: seconds to wait before retry, None if request is failed finally.
+        """
+        if isinstance(error, DeadlineExceeded):
+            self.stats.incr("deadline_exceeded")
+            return None
+        if attempt >= self.max_attempts or self.is_retryable(error) is False:
+            self.stats.incr("failures")
+            return None
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        delay -= delay * self.jitter * random.random()
+        delay = max(delay, retry_after or 0.0)
+        remaining = self.remaining(deadline)
+        if remaining is not None and delay >= remaining:
+            self.stats.incr("deadline_exceeded")
+            return None
+        self.stats.incr("retries")
+        return delay
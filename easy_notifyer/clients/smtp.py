@@ -0,0 +1,429 @@
+import asyncio
+import base64
+import re
+import socket
+import ssl
+import time
+import weakref
+from collections import deque
+from smtplib import (
+    SMTPAuthenticationError, SMTPConnectError, SMTPDataError, SMTPNotSupportedError,
+    SMTPRecipientsRefused, SMTPResponseException, SMTPSenderRefused, SMTPServerDisconnected
+)
+from typing import Deque, Dict, List, Optional, Tuple, Type
+
+from easy_notifyer.clients.dns import get_dns_cache
+from easy_notifyer.utils import run_in_threadpool
+
+
+CRLF = b"\r\n"
+LINE_END_RE = re.compile(rb"(?:\r\n|\n|\r(?!\n))")
+DOT_RE = re.compile(rb"(?m)^\.")
+SENDER_OK = (250, 251, 252)
+RECIPIENT_OK = (250, 251)
+
+Reply = Tuple[int, bytes]
+
+_local_fqdn: Optional[str] = None
+
+
+async def _get_local_fqdn() -> str:
+    """Fqdn of machine for EHLO, resolved once in thread pool to not block event loop"""
+    global _local_fqdn  # pylint: disable=global-statement
+    if _local_fqdn is None:
+        _local_fqdn = await run_in_threadpool(socket.getfqdn)
+    return _local_fqdn
+
+
+class AsyncSMTP:
+    """Smtp session over asyncio streams: EHLO, STARTTLS or implicit TLS, AUTH PLAIN/LOGIN and
+    MAIL/RCPT/DATA. Errors are the same as of smtplib."""
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        port: int,
+        ssl: bool = False,  # pylint: disable=redefined-outer-name
+        starttls: bool = False,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        timeout: Optional[float] = 30.0,
+        local_hostname: Optional[str] = None,
+    ):
+        """
+        Args:
+            host (str): host of smtp server.
+            port (int): port of smtp server.
+            ssl (bool, optional): use implicit TLS connection.
+            starttls (bool, optional): upgrade plain connection to TLS by STARTTLS command.
+            ssl_context (SSLContext, optional): context of TLS. Default -
+                ssl.create_default_context().
+            timeout (float, optional): timeout of connect and of every reply of server.
+            local_hostname (str, optional): hostname for EHLO. Default - fqdn of machine.
+        """
+        self._host = host
+        self._port = port
+        self._ssl = ssl
+        self._starttls = starttls
+        self._ssl_context = ssl_context
+        self._timeout = timeout
+        self._local_hostname = local_hostname
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self.extensions: Dict[str, str] = {}
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.quit()
+
+    def _get_ssl_context(self) -> ssl.SSLContext:
+        return self._ssl_context or ssl.create_default_context()
+
+    async def connect(self) -> None:
+        """Open connection, greet server and start TLS if it's required. Connection is closed
+        if greeting fails."""
+        tls = self._get_ssl_context() if self._ssl is True else None
+        self._reader, self._writer = await asyncio.wait_for(
+            get_dns_cache().open_connection(
+                self._host, self._port, ssl=tls, server_hostname=self._host if tls else None
+            ),
+            self._timeout,
+        )
+        try:
+            code, message = await self._read_reply()
+            if code != 220:
+                raise SMTPConnectError(code, message)
+            await self.ehlo()
+            if self._starttls is True:
+                if "starttls" not in self.extensions:
+                    raise SMTPNotSupportedError("STARTTLS extension not supported by server.")
+                await self.command("STARTTLS", expect=(220,))
+                await self._start_tls()
+                await self.ehlo()
+        except BaseException:
+            self.close()
+            raise
+
+    async def _start_tls(self) -> None:
+        """Upgrade connection to TLS in place"""
+        context = self._get_ssl_context()
+        if hasattr(self._writer, "start_tls"):
+            await self._writer.start_tls(context, server_hostname=self._host)
+            return
+        # pylint: disable=protected-access
+        loop = asyncio.get_event_loop()
+        transport = self._writer.transport
+        tls_transport = await loop.start_tls(
+            transport, transport.get_protocol(), context, server_hostname=self._host
+        )
+        self._writer._transport = tls_transport
+        self._reader._transport = tls_transport
+
+    async def _read_reply(self) -> Reply:
+        """Read reply of server, lines of multiline reply are joined"""
+        lines = []
+        while True:
+            try:
+                line = await asyncio.wait_for(self._reader.readline(), self._timeout)
+            except asyncio.TimeoutError:
+                self.close()
+                raise
+            if not line:
+                self.close()
+                raise SMTPServerDisconnected("Connection unexpectedly closed")
+            lines.append(line[4:].rstrip(b"\r\n"))
+            if line[3:4] != b"-":
+                break
+        try:
+            code = int(line[:3])
+        except ValueError:
+            code = -1
+        return code, b"\n".join(lines)
+
+    async def _send_commands(self, lines: List[str]) -> List[Reply]:
+        """Send commands at once and read their replies"""
+        if self._writer is None:
+            raise SMTPServerDisconnected("please run connect() first")
+        self._writer.write(b"".join(line.encode("utf-8") + CRLF for line in lines))
+        await self._writer.drain()
+        return [await self._read_reply() for _ in lines]
+
+    async def command(
+        self,
+        line: str,
+        *,
+        expect: Tuple[int, ...] = (250,),
+        error: Type[SMTPResponseException] = SMTPResponseException,
+    ) -> Reply:
+        """Send command and read reply.
+
+        Args:
+            line (str): command with arguments.
+            expect (tuple(int), optional): codes of successful reply.
+            error (type, optional): error raised for other codes.
+
+        Returns:
+            tuple: code and message of reply.
+        """
+        ((code, message),) = await self._send_commands([line])
+        if code not in expect:
+            raise error(code, message)
+        return code, message
+
+    async def ehlo(self) -> None:
+        """Greet server and read its extensions"""
+        local_hostname = self._local_hostname or await _get_local_fqdn()
+        _, message = await self.command(f"EHLO {local_hostname}")
+        self.extensions = {}
+        for line in message.decode("latin-1").split("\n")[1:]:
+            match = re.match(r"(?P<name>[A-Za-z0-9][A-Za-z0-9\-]*) ?(?P<params>.*)", line)
+            if match is None:
+                continue
+            name, params = match.group("name").lower(), match.group("params").lstrip("=")
+            if name == "auth":
+                params = " ".join([self.extensions.get("auth", ""), params]).strip()
+            self.extensions[name] = params
+
+    async def login(self, user: str, password: str) -> None:
+        """Authenticate by AUTH PLAIN or AUTH LOGIN"""
+        mechanisms = self.extensions.get("auth", "").upper().split()
+
+        def encode(value: str) -> str:
+            return base64.b64encode(value.encode("utf-8")).decode("ascii")
+
+        if "PLAIN" in mechanisms:
+            await self.command(
+                f"AUTH PLAIN {encode(f'{chr(0)}{user}{chr(0)}{password}')}",
+                expect=(235,),
+                error=SMTPAuthenticationError,
+            )
+        elif "LOGIN" in mechanisms:
+            await self.command("AUTH LOGIN", expect=(334,), error=SMTPAuthenticationError)
+            await self.command(encode(user), expect=(334,), error=SMTPAuthenticationError)
+            await self.command(encode(password), expect=(235,), error=SMTPAuthenticationError)
+        else:
+            raise SMTPNotSupportedError("No suitable authentication method found.")
+
+    async def sendmail(self, from_addr: str, to_addrs: List[str], msg: bytes) -> Dict[str, Reply]:
+        """Send message. MAIL FROM and all RCPT TO are sent in one round-trip if server
+        supports ESMTP PIPELINING.
+
+        Args:
+            from_addr (str): the address sending this mail.
+            to_addrs (list(str)): addresses to send this mail to.
+            msg (bytes): message with headers.
+
+        Returns:
+            dict: refused recipients with reply of server.
+        """
+        mail_line = f"MAIL FROM:<{from_addr}>"
+        rcpt_lines = [f"RCPT TO:<{addr}>" for addr in to_addrs]
+        if "pipelining" in self.extensions:
+            sender_reply, *rcpt_replies = await self._send_commands([mail_line, *rcpt_lines])
+        else:
+            (sender_reply,) = await self._send_commands([mail_line])
+            rcpt_replies = []
+            if sender_reply[0] in SENDER_OK:
+                for line in rcpt_lines:
+                    rcpt_replies.extend(await self._send_commands([line]))
+        if sender_reply[0] not in SENDER_OK:
+            await self.rset()
+            raise SMTPSenderRefused(sender_reply[0], sender_reply[1], from_addr)
+        refused = {
+            addr: reply
+            for addr, reply in zip(to_addrs, rcpt_replies)
+            if reply[0] not in RECIPIENT_OK
+        }
+        if len(refused) == len(to_addrs):
+            await self.rset()
+            raise SMTPRecipientsRefused(refused)
+
+        try:
+            await self.command("DATA", expect=(354,), error=SMTPDataError)
+        except SMTPDataError:
+            await self.rset()
+            raise
+        data = DOT_RE.sub(b"..", LINE_END_RE.sub(CRLF, msg))
+        if not data.endswith(CRLF):
+            data += CRLF
+        self._writer.write(data + b"." + CRLF)
+        await self._writer.drain()
+        code, message = await self._read_reply()
+        if code != 250:
+            await self.rset()
+            raise SMTPDataError(code, message)
+        return refused
+
+    async def noop(self) -> int:
+        """Send NOOP, returns code of reply"""
+        code, _ = await self.command("NOOP", expect=tuple(range(200, 600)))
+        return code
+
+    async def rset(self) -> None:
+        """Reset transaction, errors are ignored"""
+        try:
+            await self.command("RSET", expect=tuple(range(200, 600)))
+        except (SMTPServerDisconnected, OSError, asyncio.TimeoutError):
+            pass
+
+    async def quit(self) -> None:
+        """End session and close connection"""
+        try:
+            if self.is_dropped() is False:
+                await self.command("QUIT", expect=tuple(range(200, 600)))
+        except (SMTPServerDisconnected, OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.close()
+
+    def is_dropped(self) -> bool:
+        """Check that server closed the connection or sent unexpected data"""
+        return (
+            self._writer is None
+            or self._writer.is_closing() is True
+            or self._reader.at_eof() is True
+            or len(self._reader._buffer) > 0  # pylint: disable=protected-access
+        )
+
+    def close(self) -> None:
+        """Close connection without QUIT"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+SMTPKey = Tuple[str, int, Optional[str], Optional[str], bool, bool]
+
+
+class AsyncSMTPPool:
+    """Pool of authenticated async smtp sessions of one server and account. Pool is bound to
+    the event loop where sessions were opened."""
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        port: int,
+        login: Optional[str],
+        password: Optional[str],
+        ssl: bool = False,  # pylint: disable=redefined-outer-name
+        starttls: bool = False,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        maxsize: int = 4,
+        idle_timeout: float = 60.0,
+        timeout: Optional[float] = 30.0,
+    ):
+        """
+        Args:
+            host (str): host of smtp server.
+            port (int): port of smtp server.
+            login (str, optional): login for auth in smtp server.
+            password (str, optional): password for auth in smtp server.
+            ssl (bool, optional): use implicit TLS connection.
+            starttls (bool, optional): upgrade plain connection to TLS by STARTTLS command.
+            ssl_context (SSLContext, optional): context of TLS.
+            maxsize (int, optional): max count of idle sessions.
+            idle_timeout (float, optional): seconds after which an idle session is closed.
+            timeout (float, optional): timeout of connect and of every reply of server.
+        """
+        self._session_params = {
+            "host": host,
+            "port": port,
+            "ssl": ssl,
+            "starttls": starttls,
+            "ssl_context": ssl_context,
+            "timeout": timeout,
+        }
+        self._login = login
+        self._password = password
+        self._maxsize = maxsize
+        self._idle_timeout = idle_timeout
+        self._idle: Deque[Tuple[AsyncSMTP, float]] = deque()
+
+    async def connect(self) -> AsyncSMTP:
+        """Open a new authenticated session"""
+        conn = AsyncSMTP(**self._session_params)
+        await conn.connect()
+        try:
+            if self._login is not None and self._password is not None:
+                await conn.login(self._login, self._password)
+        except BaseException:
+            await self.discard(conn)
+            raise
+        return conn
+
+    @staticmethod
+    async def discard(conn: AsyncSMTP) -> None:
+        """Close session without returning it to the pool"""
+        await conn.quit()
+
+    async def get(self) -> Tuple[AsyncSMTP, bool]:
+        """Take a session. Idle sessions are checked by NOOP before reuse.
+
+        Returns:
+            tuple: session and flag that session was reused from the pool.
+        """
+        now = time.monotonic()
+        while self._idle:
+            conn, released_at = self._idle.pop()
+            if now - released_at > self._idle_timeout:
+                await self.discard(conn)
+                continue
+            try:
+                if conn.is_dropped() is False and await conn.noop() == 250:
+                    return conn, True
+            except (SMTPServerDisconnected, OSError, asyncio.TimeoutError):
+                pass
+            conn.close()
+        return await self.connect(), False
+
+    def put(self, conn: AsyncSMTP) -> None:
+        """Return session to the pool. Session is closed if pool is full.
+
+        Args:
+            conn (AsyncSMTP): session without transaction in progress.
+        """
+        if len(self._idle) < self._maxsize:
+            self._idle.append((conn, time.monotonic()))
+        else:
+            conn.close()
+
+    async def close(self) -> None:
+        """Close all idle sessions"""
+        idle, self._idle = self._idle, deque()
+        for conn, _ in idle:
+            await self.discard(conn)
+
+
+_async_smtp_pools: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_async_smtp_pool(
+    *,
+    host: str,
+    port: int,
+    login: Optional[str],
+    password: Optional[str],
+    ssl: bool = False,  # pylint: disable=redefined-outer-name
+    starttls: bool = False,
+) -> AsyncSMTPPool:
+    """Get pool of async smtp sessions shared by all mailers of the running event loop with
+    the same server and account."""
+    pools = _async_smtp_pools.setdefault(asyncio.get_event_loop(), {})
+    key: SMTPKey = (host, port, login, password, ssl, starttls)
+    pool = pools.get(key)
+    if pool is None:
+        pool = pools[key] = AsyncSMTPPool(
+            host=host, port=port, login=login, password=password, ssl=ssl, starttls=starttls
+        )
+    return pool
+
+
+async def close_async_smtp_pools() -> None:
+    """Close sessions of shared async smtp pools of the running event loop"""
+    pools = _async_smtp_pools.pop(asyncio.get_event_loop(), {})
+    for pool in pools.values():
+        await pool.close()
@@ -1,38 +1,210 @@
 # pylint: disable=too-few-public-methods
+import asyncio
+import functools
+import hashlib
+import json
 import logging
+import threading
+import time
 import uuid
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
 from io import BytesIO
-from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+from typing import BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
 from urllib.error import HTTPError
 
-from easy_notifyer.clients.requests import AsyncRequests, Requests
-from easy_notifyer.utils import run_in_threadpool
+from easy_notifyer.clients.coalesce import COALESCE_MAX_LATENCY, AsyncCoalescer, Coalescer
+from easy_notifyer.clients.outbox import Outbox
+from easy_notifyer.clients.ratelimit import (
+    AsyncRateLimiter, RateLimiter, RateLimiterBase, RateLimitPolicy, get_rate_limiter
+)
+from easy_notifyer.clients.requests import AsyncRequests, Requests, Response
+from easy_notifyer.clients.retry import RetryPolicy
+from easy_notifyer.clients.tokens import TOKEN_COOLDOWN, TokenPool
+from easy_notifyer.utils import (
+    CHUNK_SIZE, COMPRESS_THRESHOLD, LRUCache, check_compression, compress_attach, run_in_executor
+)
 
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_CONCURRENCY = 8
+FILE_ID_CACHE_SIZE = 256
+MESSAGE_LIMIT = 4096
+CAPTION_LIMIT = 1024
+MAX_MESSAGE_PARTS = 3
+TEXT_FILENAME = "message.txt"
+
+_file_id_cache = LRUCache(maxsize=FILE_ID_CACHE_SIZE)
+_delivered: ContextVar[Optional[Set[Union[int, str]]]] = ContextVar(
+    "easy_notifyer_delivered", default=None
+)
+
+
+@contextmanager
+def track_delivered(delivered: Set[Union[int, str]]) -> Iterator[Set[Union[int, str]]]:
+    """Collect chats which got successful request of clients in context, tasks started in
+    context included. Chats are added as requests are done, so they are known even if send
+    is cancelled halfway.
+
+    Args:
+        delivered (set): set for chat ids.
+    """
+    token = _delivered.set(delivered)
+    try:
+        yield delivered
+    finally:
+        _delivered.reset(token)
+
+
+def _text_length(text: str) -> int:
+    """Length of text as telegram counts it, in UTF-16 code units"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _cut_line(line: str, limit: int) -> Iterator[str]:
+    """Cut line longer than limit into pieces, in one pass over UTF-16 lengths of chars"""
+    start, size = 0, 0
+    for index, char in enumerate(line):
+        length = 2 if ord(char) > 0xFFFF else 1
+        if size > 0 and size + length > limit:
+            yield line[start:index]
+            start, size = index, 0
+        size += length
+    yield line[start:]
+
+
+def split_text(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """
+    Split text on line boundaries into ordered parts not longer than limit. Lines longer than
+    limit are cut.
+    Args:
+        text (str): text to split.
+        limit (int, optional): max length of part in UTF-16 code units, as telegram counts it.
+    Returns:
+        list: parts of text, joined they are the same text.
+    """
+    parts: List[str] = []
+    part, size = "", 0
+    for line in text.splitlines(keepends=True):
+        for piece in _cut_line(line, limit):
+            length = _text_length(piece)
+            if part and size + length > limit:
+                parts.append(part)
+                part, size = "", 0
+            part += piece
+            size += length
+    if part:
+        parts.append(part)
+    return parts
+
+
+class SendResult(NamedTuple):
+    """Result of sending to one chat"""
+
+    chat_id: Union[int, str]
+    result: Optional[Dict] = None
+    error: Optional[BaseException] = None
+    token: Optional[str] = None
+
+    def __repr__(self) -> str:
+        """Token of bot is not shown"""
+        return f"SendResult(chat_id={self.chat_id!r}, result={self.result!r}, error={self.error!r})"
+
+    @property
+    def ok(self) -> bool:  # pylint: disable=invalid-name
+        """True if request to chat was successful"""
+        return self.error is None
+
 
 class TelegramBase:
     """Base class of telegram"""
 
+    _limiter_type = RateLimiterBase
+
     def __init__(
         self,
         *,
-        token: str,
+        token: Union[str, List[str]],
         chat_id: Union[List[int], int, List[str], str],
         api_url: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        file_id_cache: Optional[LRUCache] = None,
+        rate_limiter: Optional[RateLimiterBase] = None,
+        rate_limit_policy: Optional[RateLimitPolicy] = None,
+        token_cooldown: float = TOKEN_COOLDOWN,
+        retry_policy: Optional[RetryPolicy] = None,
+        compression: Optional[str] = None,
+        compress_threshold: int = COMPRESS_THRESHOLD,
+        max_message_parts: int = MAX_MESSAGE_PARTS,
     ) -> None:
         """
         Args:
-            token (str): Telegram bot token. To receive: https://core.telegram.org/bots#6-botfather.
+            token (str, list): Telegram bot token or tokens of several bots, sends are spread
+                across bots. To receive: https://core.telegram.org/bots#6-botfather.
             chat_id (int, str, list): Chat ids for send message.
+            max_concurrency (int, optional): max count of chats receiving message at the same time.
+            file_id_cache (LRUCache, optional): cache of file_id of uploaded attachments by
+                content hash. Default - cache shared by all clients.
+            rate_limiter (RateLimiter, AsyncRateLimiter, optional): limiter of sending rate of
+                all tokens. Default - limiter with telegram limits for every token, shared by
+                clients with the same token.
+            rate_limit_policy (RateLimitPolicy, optional): limits for default limiters, if
+                they are not created yet. Default - limits of telegram.
+            token_cooldown (float, optional): seconds out of rotation for token rejected by
+                telegram (401). Token limited by flood control (429) is out of rotation for
+                retry_after from response.
+            retry_policy (RetryPolicy, optional): policy of retrying failed requests.
+            compression (str, optional): "gzip" or "zip" to compress attachments before upload.
+            compress_threshold (int, optional): min size of attachment in bytes to compress.
+            max_message_parts (int, optional): max count of messages for long text, longer
+                text is sent as document.
         """
-        self._token = token
+        check_compression(compression)
+        tokens = [token] if isinstance(token, str) else token
+        self._tokens = TokenPool(tokens, cooldown=token_cooldown)
+        self._token = self._tokens.tokens[0]
         self._chat_ids = [chat_id] if isinstance(chat_id, (int, str)) else chat_id
+        self._max_concurrency = max(1, max_concurrency)
+        self._file_ids = file_id_cache if file_id_cache is not None else _file_id_cache
+        self._rate_limiters = {
+            token: rate_limiter or get_rate_limiter(self._limiter_type, token, rate_limit_policy)
+            for token in self._tokens.tokens
+        }
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._compression = compression
+        self._compress_threshold = compress_threshold
+        self._max_message_parts = max(1, max_message_parts)
 
         api_url = api_url or "https://api.telegram.org"
         api_base_url = api_url[:-1] if api_url.endswith("/") else api_url
-        self._base_api_url = f"{api_base_url}/bot{self._token}/"
+        self._base_api_url = f"{api_base_url}/bot"
+
+    def _method_url(self, method_api: str, token: Optional[str] = None) -> str:
+        """Url of api method for bot of token. Default - the first token of client."""
+        return f"{self._base_api_url}{token or self._token}/{method_api}"
+
+    def _rotate(self, token: str, error: BaseException, attempt: int) -> bool:
+        """Take token out of rotation after 401 or 429 of telegram.
+
+        Returns:
+            bool: True if request can be retried by another token right away.
+        """
+        if len(self._tokens) == 1 or not isinstance(error, HTTPError):
+            return False
+        if error.code == 401:
+            self._tokens.cool_down(token)
+        elif error.code == 429:
+            self._tokens.cool_down(token, self._get_retry_after(error))
+        else:
+            return False
+        return attempt < self._retry_policy.max_attempts and self._tokens.available() is True
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Counters of attempts and outcomes of requests to telegram"""
+        return self._retry_policy.stats.snapshot()
 
     @staticmethod
     def _prepare_attach(
@@ -61,25 +233,245 @@ class TelegramBase:
             files["document"] = (filename, BytesIO(attach.encode()))
         return files
 
+    def _prepare_document(
+        self,
+        *,
+        attach: Union[bytes, str, BinaryIO, Tuple[str, Union[BinaryIO, bytes]]],
+        filename: Optional[str] = None,
+    ) -> Tuple[Dict, Tuple[str, str]]:
+        """Preparation of attach for sending and key of attach in cache of file ids. Key is
+        token of bot with hash of content, file objects are hashed by chunks. Filename is not
+        in key, so the same content with new name is sent by file_id under the name of the
+        first upload. Attach is compressed if compression is set and it's not smaller than
+        threshold.
+
+        Returns:
+            tuple: files for request and key of cache.
+        """
+        files = self._prepare_attach(attach=attach, filename=filename)
+        name, data = files["document"]
+        digest = hashlib.sha256((self._compression or "").encode("utf-8"))
+        if isinstance(data, BytesIO):
+            digest.update(data.getbuffer())
+        elif isinstance(data, (bytes, str)):
+            digest.update(data.encode("utf-8") if isinstance(data, str) else data)
+        else:
+            data.seek(0)
+            for chunk in iter(functools.partial(data.read, CHUNK_SIZE), b""):
+                digest.update(chunk)
+            data.seek(0)
+        if self._compression is not None:
+            files["document"] = compress_attach(
+                name, data, compression=self._compression, threshold=self._compress_threshold
+            )
+        return files, (self._token, digest.hexdigest())
+
+    def _split_message(self, text: str) -> Optional[List[str]]:
+        """Split text of message by limit of telegram.
+
+        Returns:
+            list, optional: parts of text, None if text needs more than max_message_parts
+                messages and should be sent as document.
+        """
+        parts = split_text(text, MESSAGE_LIMIT)
+        if len(parts) > self._max_message_parts:
+            return None
+        return parts or [text]
+
+    @staticmethod
+    def _split_caption(text: str) -> Tuple[str, List[str]]:
+        """Split text of caption by limit of telegram.
+
+        Returns:
+            tuple: caption and parts of the rest of text for messages after document.
+        """
+        parts = split_text(text, CAPTION_LIMIT)
+        if len(parts) <= 1:
+            return text, []
+        start = len(parts[0])
+        return parts[0], split_text(text[start:], MESSAGE_LIMIT)
+
+    @staticmethod
+    def _message_body(
+        msg: str, disable_notification: bool = False, disable_web_page_preview: bool = False
+    ) -> Dict:
+        """Body of sendMessage"""
+        body = {"text": msg}
+        if disable_web_page_preview is True:
+            body["disable_web_page_preview"] = True
+        if disable_notification is True:
+            body["disable_notification"] = True
+        return body
+
+    @staticmethod
+    def _document_params(body: Dict) -> Dict:
+        """Params of sendDocument for text of message sent as document"""
+        params = {"caption": TelegramBase._split_caption(body["text"])[0]}
+        if body.get("disable_notification") is True:
+            params["disable_notification"] = True
+        return params
+
+    @staticmethod
+    def _get_file_id(result: Optional[Dict]) -> Optional[str]:
+        """Get file_id of document from result of sendDocument"""
+        for field in ("document", "animation", "video", "audio"):
+            if isinstance(result, dict) and isinstance(result.get(field), dict):
+                return result[field].get("file_id")
+        return None
+
+    @staticmethod
+    def _get_error(error: BaseException) -> Dict:
+        """Get telegram response of failed request"""
+        try:
+            return json.loads(error.fp.getvalue().decode("utf-8"))
+        except (AttributeError, ValueError):
+            return {}
+
+    def _get_retry_after(self, error: BaseException) -> Optional[float]:
+        """Get seconds to wait from response 429 of telegram. None if error is not 429."""
+        if not isinstance(error, HTTPError) or error.code != 429:
+            return None
+        parameters = self._get_error(error).get("parameters") or {}
+        retry_after = parameters.get("retry_after") or error.headers.get("Retry-After") or 1
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return 1.0
+
+    def _is_bad_file_id(self, error: Optional[BaseException]) -> bool:
+        """Check that document was rejected by file_id, file_id is no longer valid"""
+        if not isinstance(error, HTTPError) or error.code != 400:
+            return False
+        return "file" in str(self._get_error(error).get("description", "")).lower()
+
+    @staticmethod
+    def _chat_payload(
+        chat_id: Union[int, str],
+        *,
+        params: Optional[Dict],
+        body: Optional[Dict],
+    ) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Add chat_id to body of request, or to params if request is without body.
+
+        Returns:
+            tuple: new params and body of request.
+        """
+        if body is not None:
+            return params, {**body, "chat_id": chat_id}
+        return {**(params or {}), "chat_id": chat_id}, body
+
+    @staticmethod
+    def _get_result(response: Response) -> Optional[Dict]:
+        """Get result of telegram api method from response"""
+        try:
+            return response.json().get("result")
+        except (ValueError, AttributeError):
+            return None
+
 
 class TelegramAsync(TelegramBase):
     """Async client for telegram"""
 
+    _limiter_type = AsyncRateLimiter
+
     def __init__(
         self,
         *,
-        token: str,
+        token: Union[str, List[str]],
         chat_id: Union[List[int], int, List[str], str],
         api_url: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        file_id_cache: Optional[LRUCache] = None,
+        rate_limiter: Optional[AsyncRateLimiter] = None,
+        rate_limit_policy: Optional[RateLimitPolicy] = None,
+        token_cooldown: float = TOKEN_COOLDOWN,
+        retry_policy: Optional[RetryPolicy] = None,
+        compression: Optional[str] = None,
+        compress_threshold: int = COMPRESS_THRESHOLD,
+        max_message_parts: int = MAX_MESSAGE_PARTS,
+        coalesce_window: Optional[float] = None,
+        coalesce_max_latency: float = COALESCE_MAX_LATENCY,
+        executor: Optional[Executor] = None,
     ) -> None:
         """
         Args:
-            token (str): Telegram bot token. To receive: https://core.telegram.org/bots#6-botfather.
+            token (str, list): Telegram bot token or tokens of several bots, sends are spread
+                across bots. To receive: https://core.telegram.org/bots#6-botfather.
             chat_id (int, str, list): Chat ids for send message.
             api_url (str, optional): telegram api url.
+            max_concurrency (int, optional): max count of chats receiving message at the same time.
+            file_id_cache (LRUCache, optional): cache of file_id of uploaded attachments by
+                content hash. Default - cache shared by all clients.
+            rate_limiter (AsyncRateLimiter, optional): limiter of sending rate of all tokens.
+                Default - limiter of every token shared by clients with the same token.
+            rate_limit_policy (RateLimitPolicy, optional): limits for default limiters, if
+                they are not created yet. Default - limits of telegram.
+            token_cooldown (float, optional): seconds out of rotation for token rejected by
+                telegram (401). Token limited by flood control (429) is out of rotation for
+                retry_after from response.
+            retry_policy (RetryPolicy, optional): policy of retrying failed requests.
+            compression (str, optional): "gzip" or "zip" to compress attachments before upload.
+            compress_threshold (int, optional): min size of attachment in bytes to compress.
+            max_message_parts (int, optional): max count of messages for text longer than
+                limit of telegram, longer text is sent as document.
+            coalesce_window (float, optional): seconds of merging messages sent one after
+                another into one message, up to limit of telegram. None - every message is
+                sent right away.
+            coalesce_max_latency (float, optional): max seconds from the first merged message
+                to sending.
+            executor (Executor, optional): executor to prepare attachments. Default - thread
+                pool of library.
         """
-        super().__init__(token=token, chat_id=chat_id, api_url=api_url)
+        super().__init__(
+            token=token,
+            chat_id=chat_id,
+            api_url=api_url,
+            max_concurrency=max_concurrency,
+            file_id_cache=file_id_cache,
+            rate_limiter=rate_limiter,
+            rate_limit_policy=rate_limit_policy,
+            token_cooldown=token_cooldown,
+            retry_policy=retry_policy,
+            compression=compression,
+            compress_threshold=compress_threshold,
+            max_message_parts=max_message_parts,
+        )
         self._client = AsyncRequests()
+        self._executor = executor
+        self._coalescer: Optional[AsyncCoalescer] = None
+        if coalesce_window is not None:
+            self._coalescer = AsyncCoalescer(
+                window=coalesce_window,
+                max_latency=coalesce_max_latency,
+                max_size=MESSAGE_LIMIT,
+                measure=_text_length,
+                on_flush=self._send_coalesced,
+            )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def warmup(self) -> Optional[Dict]:
+        """Resolve address of api, open pooled connection and check tokens by getMe, so the
+        first notification costs only one request.
+
+        Returns:
+            dict, optional: bot of the first token.
+        """
+        bots = [
+            await self._send_post(method_api="getMe", token=token) for token in self._tokens.tokens
+        ]
+        return bots[0]
+
+    async def aclose(self) -> None:
+        """Send merged messages and close idle connections of the running event loop. Client
+        can be used after close, connections are opened again."""
+        if self._coalescer is not None:
+            await self._coalescer.flush()
+        await self._client.aclose()
 
     async def _send_post(
         self,
@@ -89,7 +481,9 @@ class TelegramAsync(TelegramBase):
         params: Optional[Dict] = None,
         body: Optional[Dict] = None,
         files: Optional[Dict] = None,
-    ) -> None:
+        timeout: Optional[float] = None,
+        token: Optional[str] = None,
+    ) -> Optional[Dict]:
         """Send async post request.
 
         Args:
@@ -98,46 +492,255 @@ class TelegramAsync(TelegramBase):
             params (dict, optional): params of request.
             body (dict, optional): body of request.
             files (dict, optional): files of request in format ('filename.txt', b'filedata').
+            timeout (float, optional): timeout of request. Default - timeout of client.
+            token (str, optional): token of bot. Default - the first token of client.
+
+        Returns:
+            dict, optional: result of api method.
         """
-        try:
-            await self._client.post(
-                url=self._base_api_url + method_api,
-                headers=headers,
-                params=params,
-                body=body,
-                files=files,
+        response = await self._client.post(
+            url=self._method_url(method_api, token),
+            headers=headers,
+            params=params,
+            body=body,
+            files=files,
+            timeout=timeout,
+        )
+        return self._get_result(response)
+
+    async def _send_chat(
+        self,
+        chat_id: Union[int, str],
+        *,
+        method_api: str,
+        params: Optional[Dict] = None,
+        body: Optional[Dict] = None,
+        files: Optional[Dict] = None,
+        deadline: Optional[float] = None,
+        token: Optional[str] = None,
+    ) -> SendResult:
+        """Send request to one chat within rate limits of bot. Failed request is retried by
+        retry policy until deadline, request rejected by flood control is sent again after
+        retry_after from response. With several tokens every attempt takes the next token,
+        request rejected with 401 or 429 is retried by another bot right away, unless token
+        is set. Error of request is logged and returned in result."""
+        params, body = self._chat_payload(chat_id, params=params, body=body)
+        stats = self._retry_policy.stats
+        attempt = 0
+        while True:
+            attempt += 1
+            stats.incr("attempts")
+            current = token or self._tokens.next()
+            rate_limiter = self._rate_limiters[current]
+            try:
+                await rate_limiter.acquire(chat_id, deadline=deadline)
+                result = await self._send_post(
+                    method_api=method_api,
+                    params=params,
+                    body=body,
+                    files=files,
+                    timeout=self._retry_policy.remaining(deadline),
+                    token=current,
+                )
+            except Exception as error:  # noqa
+                retry_after = self._get_retry_after(error)
+                if retry_after is not None:
+                    rate_limiter.penalize(chat_id, retry_after)
+                if token is None and self._rotate(current, error, attempt) is True:
+                    logger.warning("Bot is out of rotation, retry by another bot: %r", error)
+                    continue
+                delay = self._retry_policy.next_delay(
+                    attempt, error, deadline=deadline, retry_after=retry_after
+                )
+                if delay is not None:
+                    logger.warning("Send to telegram failed, retry in %.2fs: %r", delay, error)
+                    await asyncio.sleep(delay)
+                    continue
+                if isinstance(error, HTTPError):
+                    logger.exception("Error. %s", error)
+                else:
+                    logger.error("Send message to telegram error.")
+                return SendResult(chat_id, error=error, token=current)
+            stats.incr("successes")
+            delivered = _delivered.get()
+            if delivered is not None:
+                delivered.add(chat_id)
+            return SendResult(chat_id, result=result, token=current)
+
+    async def _fan_out(
+        self,
+        *,
+        method_api: str,
+        params: Optional[Dict] = None,
+        body: Optional[Dict] = None,
+        files: Optional[Dict] = None,
+        chat_ids: Optional[List[Union[int, str]]] = None,
+        deadline: Optional[float] = None,
+        token: Optional[str] = None,
+    ) -> List[SendResult]:
+        """Send request to chats concurrently.
+
+        Args:
+            chat_ids (list, optional): chats to send. Default - all chats of client.
+            deadline (float, optional): deadline of notification.
+            token (str, optional): token of bot for all chats. Default - bots in rotation.
+
+        Returns:
+            list(SendResult): result for every chat in order of chat ids.
+        """
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        chat_ids = self._chat_ids if chat_ids is None else chat_ids
+
+        async def send(chat_id: Union[int, str]) -> SendResult:
+            async with semaphore:
+                return await self._send_chat(
+                    chat_id,
+                    method_api=method_api,
+                    params=params,
+                    body=body,
+                    files=files,
+                    deadline=deadline,
+                    token=token,
+                )
+
+        return list(await asyncio.gather(*(send(chat_id) for chat_id in chat_ids)))
+
+    async def _send_document(
+        self,
+        *,
+        files: Dict,
+        params: Dict,
+        key: Tuple,
+        deadline: Optional[float] = None,
+    ) -> List[SendResult]:
+        """Upload document to one chat and send it to other chats by file_id. Cached file_id
+        of the same document is used without upload, file_id rejected by telegram is
+        evicted from cache and document is uploaded again. File_id is valid only for bot
+        which uploaded document, so all chats get document from one bot.
+
+        Returns:
+            list(SendResult): result for every chat in order of chat ids.
+        """
+        method_api = "sendDocument"
+        token = self._tokens.next()
+        key = (token, *key[1:])
+        results: List[Optional[SendResult]] = [None] * len(self._chat_ids)
+        pending = list(range(len(self._chat_ids)))
+        file_id = self._file_ids.get(key)
+        while pending:
+            if file_id is None:
+                index = pending.pop(0)
+                results[index] = await self._send_chat(
+                    self._chat_ids[index],
+                    method_api=method_api,
+                    params=params,
+                    files=files,
+                    deadline=deadline,
+                    token=token,
+                )
+                file_id = self._get_file_id(results[index].result)
+                if file_id is not None:
+                    self._file_ids.set(key, file_id)
+                continue
+
+            sent = await self._fan_out(
+                method_api=method_api,
+                params={**params, "document": file_id},
+                chat_ids=[self._chat_ids[index] for index in pending],
+                deadline=deadline,
+                token=token,
+            )
+            rejected = []
+            for index, result in zip(pending, sent):
+                results[index] = result
+                if self._is_bad_file_id(result.error) is True:
+                    rejected.append(index)
+            if rejected:
+                self._file_ids.pop(key)
+                file_id = None
+            pending = rejected
+        return results
+
+    async def _send_parts(
+        self,
+        parts: List[str],
+        *,
+        body: Dict,
+        results: Optional[List[SendResult]] = None,
+        deadline: Optional[float] = None,
+    ) -> List[SendResult]:
+        """Send parts of text as messages in order. Chat gets the next part only if the
+        previous one was delivered.
+
+        Args:
+            parts (list): parts of text.
+            body (dict): body of sendMessage without text.
+            results (list(SendResult), optional): results of previous request, parts are sent
+                only to chats where it was successful.
+
+        Returns:
+            list(SendResult): result of the last sent part for every chat.
+        """
+        if results is None:
+            results = [SendResult(chat_id) for chat_id in self._chat_ids]
+        pending = [index for index, result in enumerate(results) if result.ok is True]
+        for part in parts:
+            if not pending:
+                break
+            sent = await self._fan_out(
+                method_api="sendMessage",
+                body={**body, "text": part},
+                chat_ids=[self._chat_ids[index] for index in pending],
+                deadline=deadline,
             )
-        except HTTPError as error:
-            logger.exception("Error. %s", error)
-        except Exception:  # noqa
-            logger.error("Send message to telegram error.")
+            for index, result in zip(pending, sent):
+                results[index] = result
+            pending = [index for index, result in zip(pending, sent) if result.ok is True]
+        return results
 
     async def send_message(
         self,
         msg: str,
         disable_notification: bool = False,
         disable_web_page_preview: bool = False,
-    ) -> None:
-        """Send message.
+    ) -> List[SendResult]:
+        """Send message. Text longer than limit of telegram is split on lines into several
+        messages, or sent as document if it needs more than max_message_parts messages. With
+        coalesce_window messages are merged and sent together after window.
 
         Args:
             msg (str): text of message.
             disable_notification (bool): True to disable notification of message.
             disable_web_page_preview (bool): True to disable web preview for links.
+
+        Returns:
+            list(SendResult): result for every chat, the same results for merged messages.
         """
-        method_api = "sendMessage"
+        if self._coalescer is not None:
+            return await self._coalescer.add(
+                msg, key=(disable_notification, disable_web_page_preview)
+            )
+        body = self._message_body(msg, disable_notification, disable_web_page_preview)
+        return await self._send_text(body=body, deadline=self._retry_policy.get_deadline())
 
-        for chat_id in self._chat_ids:
-            body = {
-                "chat_id": chat_id,
-                "text": msg,
-            }
+    async def _send_coalesced(self, text: str, key: Tuple[bool, bool]) -> List[SendResult]:
+        """Send merged messages"""
+        body = self._message_body(text, *key)
+        return await self._send_text(body=body, deadline=self._retry_policy.get_deadline())
 
-            if disable_web_page_preview is True:
-                body["disable_web_page_preview"] = True
-            if disable_notification is True:
-                body["disable_notification"] = True
-            await self._send_post(method_api=method_api, body=body)
+    async def _send_text(
+        self, *, body: Dict, deadline: Optional[float] = None
+    ) -> List[SendResult]:
+        """Send text by messages, or as document if it's too long"""
+        parts = self._split_message(body["text"])
+        if parts is not None:
+            return await self._send_parts(parts, body=body, deadline=deadline)
+        files, key = await run_in_executor(
+            self._executor, self._prepare_document, attach=body["text"], filename=TEXT_FILENAME
+        )
+        return await self._send_document(
+            files=files, params=self._document_params(body), key=key, deadline=deadline
+        )
 
     async def send_attach(
         self,
@@ -146,48 +749,236 @@ class TelegramAsync(TelegramBase):
         msg: Optional[str] = None,
         filename: Optional[str] = None,
         disable_notification: bool = False,
-    ) -> None:
+    ) -> List[SendResult]:
         """Send file.
 
         Args:
             attach (bytes, str, tuple): file to send. if tuple, then
                 ('filename.txt', b'text of file').
-            msg (str, optional): text of message.
+            msg (str, optional): text of message. Text longer than limit of caption is sent
+                by messages after document.
             filename (str, optional): filename if attach is string or bytes.
             disable_notification (bool): True to disable notification of message.
+
+        Returns:
+            list(SendResult): result for every chat.
         """
-        method_api = "sendDocument"
-        files = await run_in_threadpool(self._prepare_attach, attach=attach, filename=filename)
+        deadline = self._retry_policy.get_deadline()
+        files, key = await run_in_executor(
+            self._executor, self._prepare_document, attach=attach, filename=filename
+        )
 
-        params = {}
+        params, body, rest = {}, {}, []
         if msg is not None:
-            params["caption"] = msg
+            params["caption"], rest = self._split_caption(msg)
         if disable_notification is True:
-            params["disable_notification"] = True
+            params["disable_notification"] = body["disable_notification"] = True
 
-        for chat_id in self._chat_ids:
-            params["chat_id"] = chat_id
-            await self._send_post(method_api=method_api, params=params, files=files)
+        results = await self._send_document(
+            files=files, params=params, key=key, deadline=deadline
+        )
+        if rest:
+            results = await self._send_parts(rest, body=body, results=results, deadline=deadline)
+        return results
+
+    async def edit_message_text(
+        self, chat_id: Union[int, str], message_id: int, text: str, token: Optional[str] = None
+    ) -> SendResult:
+        """Edit text of sent message in one chat.
+
+        Args:
+            chat_id (int, str): chat of message.
+            message_id (int): id of message from result of sending.
+            token (str, optional): token of bot which sent message, from result of sending.
+            text (str): new text of message.
+
+        Returns:
+            SendResult: result of chat.
+        """
+        return await self._send_chat(
+            chat_id,
+            method_api="editMessageText",
+            body={"message_id": message_id, "text": text},
+            deadline=self._retry_policy.get_deadline(),
+            token=token,
+        )
+
+    async def edit_message_caption(
+        self, chat_id: Union[int, str], message_id: int, caption: str, token: Optional[str] = None
+    ) -> SendResult:
+        """Edit caption of sent document in one chat.
+
+        Args:
+            chat_id (int, str): chat of message.
+            message_id (int): id of message from result of sending.
+            token (str, optional): token of bot which sent message, from result of sending.
+            caption (str): new caption of document.
+
+        Returns:
+            SendResult: result of chat.
+        """
+        return await self._send_chat(
+            chat_id,
+            method_api="editMessageCaption",
+            body={"message_id": message_id, "caption": caption},
+            deadline=self._retry_policy.get_deadline(),
+            token=token,
+        )
 
 
 class Telegram(TelegramBase):
     """Client of telegram"""
 
+    _limiter_type = RateLimiter
+
     def __init__(
         self,
         *,
-        token: str,
+        token: Union[str, List[str]],
         chat_id: Union[List[int], int, List[str], str],
         api_url: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        file_id_cache: Optional[LRUCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        rate_limit_policy: Optional[RateLimitPolicy] = None,
+        token_cooldown: float = TOKEN_COOLDOWN,
+        retry_policy: Optional[RetryPolicy] = None,
+        compression: Optional[str] = None,
+        compress_threshold: int = COMPRESS_THRESHOLD,
+        max_message_parts: int = MAX_MESSAGE_PARTS,
+        coalesce_window: Optional[float] = None,
+        coalesce_max_latency: float = COALESCE_MAX_LATENCY,
+        outbox: Optional[Outbox] = None,
+        executor: Optional[Executor] = None,
     ) -> None:
         """
         Args:
-            token (str): Telegram bot token. To receive: https://core.telegram.org/bots#6-botfather.
+            token (str, list): Telegram bot token or tokens of several bots, sends are spread
+                across bots. To receive: https://core.telegram.org/bots#6-botfather.
             chat_id (int, str, list): Chat ids for send message.
             api_url (str, optional): telegram api url.
+            max_concurrency (int, optional): max count of chats receiving message at the same time.
+            file_id_cache (LRUCache, optional): cache of file_id of uploaded attachments by
+                content hash. Default - cache shared by all clients.
+            rate_limiter (RateLimiter, optional): limiter of sending rate of all tokens.
+                Default - limiter of every token shared by clients with the same token.
+            rate_limit_policy (RateLimitPolicy, optional): limits for default limiters, if
+                they are not created yet. Default - limits of telegram.
+            token_cooldown (float, optional): seconds out of rotation for token rejected by
+                telegram (401). Token limited by flood control (429) is out of rotation for
+                retry_after from response.
+            retry_policy (RetryPolicy, optional): policy of retrying failed requests.
+            compression (str, optional): "gzip" or "zip" to compress attachments before upload.
+            compress_threshold (int, optional): min size of attachment in bytes to compress.
+            max_message_parts (int, optional): max count of messages for text longer than
+                limit of telegram, longer text is sent as document.
+            coalesce_window (float, optional): seconds of merging messages sent one after
+                another into one message, up to limit of telegram. None - every message is
+                sent right away.
+            coalesce_max_latency (float, optional): max seconds from the first merged message
+                to sending.
+            outbox (Outbox, optional): queue for sending in background. If set, send methods
+                return right away with future of results.
+            executor (Executor, optional): executor for sending to several chats. Default - own
+                thread pool of client, stopped by close.
         """
-        super().__init__(token=token, chat_id=chat_id, api_url=api_url)
+        super().__init__(
+            token=token,
+            chat_id=chat_id,
+            api_url=api_url,
+            max_concurrency=max_concurrency,
+            file_id_cache=file_id_cache,
+            rate_limiter=rate_limiter,
+            rate_limit_policy=rate_limit_policy,
+            token_cooldown=token_cooldown,
+            retry_policy=retry_policy,
+            compression=compression,
+            compress_threshold=compress_threshold,
+            max_message_parts=max_message_parts,
+        )
         self._client = Requests()
+        self._outbox = outbox
+        self._own_executor = executor is None
+        self._executor: Optional[Executor] = executor
+        self._executor_lock = threading.Lock()
+        self._coalescer: Optional[Coalescer] = None
+        if coalesce_window is not None:
+            self._coalescer = Coalescer(
+                window=coalesce_window,
+                max_latency=coalesce_max_latency,
+                max_size=MESSAGE_LIMIT,
+                measure=_text_length,
+                on_flush=self._send_coalesced,
+            )
+
+    def _submit(self, func: Callable, **kwargs) -> Union[List[SendResult], Future]:
+        """Call send now, or put it to outbox in background mode. Deadline of notification
+        starts when send is taken from outbox."""
+
+        def send() -> List[SendResult]:
+            return func(deadline=self._retry_policy.get_deadline(), **kwargs)
+
+        if self._outbox is None:
+            return send()
+        return self._outbox.submit(send)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Send merged messages and wait until sends of outbox are done.
+
+        Args:
+            timeout (float, optional): max seconds to wait for each of them. None - wait
+                without timeout.
+
+        Returns:
+            bool: False if messages or outbox were not flushed in timeout.
+        """
+        flushed = True
+        if self._coalescer is not None:
+            flushed = self._coalescer.flush(timeout)
+        if self._outbox is not None:
+            flushed = self._outbox.flush(timeout) and flushed
+        return flushed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def warmup(self) -> Optional[Dict]:
+        """Resolve address of api, open pooled connection and check tokens by getMe, so the
+        first notification costs only one request.
+
+        Returns:
+            dict, optional: bot of the first token.
+        """
+        bots = [
+            self._send_post(method_api="getMe", token=token) for token in self._tokens.tokens
+        ]
+        return bots[0]
+
+    def close(self) -> None:
+        """Stop own thread pool of sending to several chats and close idle connections. Client
+        can be used after close, thread pool and connections are created again. Merged
+        messages are sent before."""
+        if self._coalescer is not None:
+            self._coalescer.flush()
+        if self._own_executor is True:
+            with self._executor_lock:
+                executor, self._executor = self._executor, None
+            if executor is not None:
+                executor.shutdown(wait=True)
+        self._client.close()
+
+    def _get_executor(self) -> Executor:
+        """Get thread pool for sending to several chats, pool is created at first use."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_concurrency,
+                    thread_name_prefix="easy_notifyer",
+                )
+            return self._executor
 
     def _send_post(
         self,
@@ -197,7 +988,9 @@ class Telegram(TelegramBase):
         params: Optional[Dict] = None,
         body: Optional[Dict] = None,
         files: Optional[Dict] = None,
-    ) -> None:
+        timeout: Optional[float] = None,
+        token: Optional[str] = None,
+    ) -> Optional[Dict]:
         """Send post request.
 
         Args:
@@ -206,45 +999,268 @@ class Telegram(TelegramBase):
             params (dict, optional): params of request.
             body (dict, optional): body of request.
             files (dict, optional): files of request in format ('filename.txt', b'filedata').
+            timeout (float, optional): timeout of request. Default - timeout of client.
+            token (str, optional): token of bot. Default - the first token of client.
+
+        Returns:
+            dict, optional: result of api method.
         """
-        try:
-            self._client.post(
-                url=self._base_api_url + method_api,
-                headers=headers,
-                params=params,
-                body=body,
-                files=files,
+        response = self._client.post(
+            url=self._method_url(method_api, token),
+            headers=headers,
+            params=params,
+            body=body,
+            files=files,
+            timeout=timeout,
+        )
+        return self._get_result(response)
+
+    def _send_chat(
+        self,
+        chat_id: Union[int, str],
+        *,
+        method_api: str,
+        params: Optional[Dict] = None,
+        body: Optional[Dict] = None,
+        files: Optional[Dict] = None,
+        deadline: Optional[float] = None,
+        token: Optional[str] = None,
+    ) -> SendResult:
+        """Send request to one chat within rate limits of bot. Failed request is retried by
+        retry policy until deadline, request rejected by flood control is sent again after
+        retry_after from response. With several tokens every attempt takes the next token,
+        request rejected with 401 or 429 is retried by another bot right away, unless token
+        is set. Error of request is logged and returned in result."""
+        params, body = self._chat_payload(chat_id, params=params, body=body)
+        stats = self._retry_policy.stats
+        attempt = 0
+        while True:
+            attempt += 1
+            stats.incr("attempts")
+            current = token or self._tokens.next()
+            rate_limiter = self._rate_limiters[current]
+            try:
+                rate_limiter.acquire(chat_id, deadline=deadline)
+                result = self._send_post(
+                    method_api=method_api,
+                    params=params,
+                    body=body,
+                    files=files,
+                    timeout=self._retry_policy.remaining(deadline),
+                    token=current,
+                )
+            except Exception as error:  # noqa
+                retry_after = self._get_retry_after(error)
+                if retry_after is not None:
+                    rate_limiter.penalize(chat_id, retry_after)
+                if token is None and self._rotate(current, error, attempt) is True:
+                    logger.warning("Bot is out of rotation, retry by another bot: %r", error)
+                    continue
+                delay = self._retry_policy.next_delay(
+                    attempt, error, deadline=deadline, retry_after=retry_after
+                )
+                if delay is not None:
+                    logger.warning("Send to telegram failed, retry in %.2fs: %r", delay, error)
+                    time.sleep(delay)
+                    continue
+                if isinstance(error, HTTPError):
+                    logger.exception("Error. %s", error)
+                else:
+                    logger.error("Send message to telegram error.")
+                return SendResult(chat_id, error=error, token=current)
+            stats.incr("successes")
+            delivered = _delivered.get()
+            if delivered is not None:
+                delivered.add(chat_id)
+            return SendResult(chat_id, result=result, token=current)
+
+    def _fan_out(
+        self,
+        *,
+        method_api: str,
+        params: Optional[Dict] = None,
+        body: Optional[Dict] = None,
+        files: Optional[Dict] = None,
+        chat_ids: Optional[List[Union[int, str]]] = None,
+        deadline: Optional[float] = None,
+        token: Optional[str] = None,
+    ) -> List[SendResult]:
+        """Send request to chats concurrently in thread pool.
+
+        Args:
+            chat_ids (list, optional): chats to send. Default - all chats of client.
+            deadline (float, optional): deadline of notification.
+            token (str, optional): token of bot for all chats. Default - bots in rotation.
+
+        Returns:
+            list(SendResult): result for every chat in order of chat ids.
+        """
+        kwargs = {
+            "method_api": method_api,
+            "params": params,
+            "body": body,
+            "files": files,
+            "deadline": deadline,
+            "token": token,
+        }
+        chat_ids = self._chat_ids if chat_ids is None else chat_ids
+        if len(chat_ids) == 1 or self._max_concurrency == 1:
+            return [self._send_chat(chat_id, **kwargs) for chat_id in chat_ids]
+
+        executor = self._get_executor()
+        futures = [executor.submit(self._send_chat, chat_id, **kwargs) for chat_id in chat_ids]
+        return [future.result() for future in futures]
+
+    def _send_document(
+        self,
+        *,
+        files: Dict,
+        params: Dict,
+        key: Tuple,
+        deadline: Optional[float] = None,
+    ) -> List[SendResult]:
+        """Upload document to one chat and send it to other chats by file_id. Cached file_id
+        of the same document is used without upload, file_id rejected by telegram is
+        evicted from cache and document is uploaded again. File_id is valid only for bot
+        which uploaded document, so all chats get document from one bot.
+
+        Returns:
+            list(SendResult): result for every chat in order of chat ids.
+        """
+        method_api = "sendDocument"
+        token = self._tokens.next()
+        key = (token, *key[1:])
+        results: List[Optional[SendResult]] = [None] * len(self._chat_ids)
+        pending = list(range(len(self._chat_ids)))
+        file_id = self._file_ids.get(key)
+        while pending:
+            if file_id is None:
+                index = pending.pop(0)
+                results[index] = self._send_chat(
+                    self._chat_ids[index],
+                    method_api=method_api,
+                    params=params,
+                    files=files,
+                    deadline=deadline,
+                    token=token,
+                )
+                file_id = self._get_file_id(results[index].result)
+                if file_id is not None:
+                    self._file_ids.set(key, file_id)
+                continue
+
+            sent = self._fan_out(
+                method_api=method_api,
+                params={**params, "document": file_id},
+                chat_ids=[self._chat_ids[index] for index in pending],
+                deadline=deadline,
+                token=token,
+            )
+            rejected = []
+            for index, result in zip(pending, sent):
+                results[index] = result
+                if self._is_bad_file_id(result.error) is True:
+                    rejected.append(index)
+            if rejected:
+                self._file_ids.pop(key)
+                file_id = None
+            pending = rejected
+        return results
+
+    def _send_parts(
+        self,
+        parts: List[str],
+        *,
+        body: Dict,
+        results: Optional[List[SendResult]] = None,
+        deadline: Optional[float] = None,
+    ) -> List[SendResult]:
+        """Send parts of text as messages in order. Chat gets the next part only if the
+        previous one was delivered.
+
+        Args:
+            parts (list): parts of text.
+            body (dict): body of sendMessage without text.
+            results (list(SendResult), optional): results of previous request, parts are sent
+                only to chats where it was successful.
+
+        Returns:
+            list(SendResult): result of the last sent part for every chat.
+        """
+        if results is None:
+            results = [SendResult(chat_id) for chat_id in self._chat_ids]
+        pending = [index for index, result in enumerate(results) if result.ok is True]
+        for part in parts:
+            if not pending:
+                break
+            sent = self._fan_out(
+                method_api="sendMessage",
+                body={**body, "text": part},
+                chat_ids=[self._chat_ids[index] for index in pending],
+                deadline=deadline,
             )
-        except HTTPError as error:
-            logger.exception("Error. %s", error)
-        except Exception:  # noqa
-            logger.error("Send message to telegram error.")
+            for index, result in zip(pending, sent):
+                results[index] = result
+            pending = [index for index, result in zip(pending, sent) if result.ok is True]
+        return results
+
+    def _send_text(self, *, body: Dict, deadline: Optional[float] = None) -> List[SendResult]:
+        """Send text by messages, or as document if it's too long"""
+        parts = self._split_message(body["text"])
+        if parts is not None:
+            return self._send_parts(parts, body=body, deadline=deadline)
+        return self._send_attach(
+            attach=body["text"],
+            filename=TEXT_FILENAME,
+            params=self._document_params(body),
+            deadline=deadline,
+        )
 
     def send_message(
         self,
         msg: str,
         disable_notification: bool = False,
         disable_web_page_preview: bool = False,
-    ) -> None:
-        """Send message.
+    ) -> Union[List[SendResult], Future]:
+        """Send message. Text longer than limit of telegram is split on lines into several
+        messages, or sent as document if it needs more than max_message_parts messages. With
+        coalesce_window messages are merged and sent together after window.
 
         Args:
             msg (str): text of message.
             disable_notification (bool): True to disable notification of message.
             disable_web_page_preview (bool): True to disable web preview for links.
+
+        Returns:
+            list(SendResult): result for every chat. Future of results in background and
+                coalescing modes.
         """
-        method_api = "sendMessage"
-
-        for chat_id in self._chat_ids:
-            body = {
-                "chat_id": chat_id,
-                "text": msg,
-            }
-            if disable_web_page_preview is True:
-                body["disable_web_page_preview"] = True
-            if disable_notification is True:
-                body["disable_notification"] = True
-            self._send_post(method_api=method_api, body=body)
+        if self._coalescer is not None:
+            return self._coalescer.add(msg, key=(disable_notification, disable_web_page_preview))
+        body = self._message_body(msg, disable_notification, disable_web_page_preview)
+        return self._submit(self._send_text, body=body)
+
+    def _send_coalesced(self, text: str, key: Tuple[bool, bool]) -> List[SendResult]:
+        """Send merged messages from worker of coalescing buffer"""
+        body = self._message_body(text, *key)
+        return self._send_text(body=body, deadline=self._retry_policy.get_deadline())
+
+    def _send_attach(
+        self,
+        *,
+        attach: Union[bytes, str, BinaryIO, Tuple[str, Union[BinaryIO, bytes]]],
+        filename: Optional[str],
+        params: Dict,
+        rest: Optional[List[str]] = None,
+        deadline: Optional[float] = None,
+    ) -> List[SendResult]:
+        """Prepare attach and send it to chats, then the rest of caption by messages"""
+        files, key = self._prepare_document(attach=attach, filename=filename)
+        results = self._send_document(files=files, params=params, key=key, deadline=deadline)
+        if rest:
+            body = {"disable_notification": True} if params.get("disable_notification") else {}
+            results = self._send_parts(rest, body=body, results=results, deadline=deadline)
+        return results
 
     def send_attach(
         self,
@@ -253,25 +1269,71 @@ class Telegram(TelegramBase):
         msg: Optional[str] = None,
         filename: Optional[str] = None,
         disable_notification: bool = False,
-    ) -> None:
+    ) -> Union[List[SendResult], Future]:
         """Send file.
 
         Args:
             attach (bytes, str, tuple): file to send. if tuple, then
-                ('filename.txt', b'text of file').
-            msg (str, optional): text of message.
+                ('filename.txt', b'text of file'). In background mode file object is read in
+                worker thread and must stay open until send is done.
+            msg (str, optional): text of message. Text longer than limit of caption is sent
+                by messages after document.
             filename (str, optional): filename if attach is string or bytes.
             disable_notification (bool): True to disable notification of message.
-        """
-        method_api = "sendDocument"
-        files = self._prepare_attach(attach=attach, filename=filename)
 
-        params = {}
+        Returns:
+            list(SendResult): result for every chat. Future of results in background mode.
+        """
+        params, rest = {}, []
         if msg is not None:
-            params["caption"] = msg
+            params["caption"], rest = self._split_caption(msg)
         if disable_notification is True:
             params["disable_notification"] = True
 
-        for chat_id in self._chat_ids:
-            params["chat_id"] = chat_id
-            self._send_post(method_api=method_api, params=params, files=files)
+        return self._submit(
+            self._send_attach, attach=attach, filename=filename, params=params, rest=rest
+        )
+
+    def edit_message_text(
+        self, chat_id: Union[int, str], message_id: int, text: str, token: Optional[str] = None
+    ) -> SendResult:
+        """Edit text of sent message in one chat.
+
+        Args:
+            chat_id (int, str): chat of message.
+            message_id (int): id of message from result of sending.
+            token (str, optional): token of bot which sent message, from result of sending.
+            text (str): new text of message.
+
+        Returns:
+            SendResult: result of chat.
+        """
+        return self._send_chat(
+            chat_id,
+            method_api="editMessageText",
+            body={"message_id": message_id, "text": text},
+            deadline=self._retry_policy.get_deadline(),
+            token=token,
+        )
+
+    def edit_message_caption(
+        self, chat_id: Union[int, str], message_id: int, caption: str, token: Optional[str] = None
+    ) -> SendResult:
+        """Edit caption of sent document in one chat.
+
+        Args:
+            chat_id (int, str): chat of message.
+            message_id (int): id of message from result of sending.
+            token (str, optional): token of bot which sent message, from result of sending.
+            caption (str): new caption of document.
+
+        Returns:
+            SendResult: result of chat.
+        """
+        return self._send_chat(
+            chat_id,
+            method_api="editMessageCaption",
+            body={"message_id": message_id, "caption": caption},
+            deadline=self._retry_policy.get_deadline(),
+            token=token,
+        )
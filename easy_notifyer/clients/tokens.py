@@ -0,0 +1,57 @@
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+
+TOKEN_COOLDOWN = 60.0
+
+
+class TokenPool:
+    """Round-robin of bot tokens. Token rejected by telegram (401) or limited by flood
+    control (429) is out of rotation until its cooldown is over."""
+
+    def __init__(self, tokens: Sequence[str], *, cooldown: float = TOKEN_COOLDOWN):
+        """
+        Args:
+            tokens (list): tokens of bots, the same token is used once.
+            cooldown (float, optional): seconds out of rotation for rejected token.
+        """
+        self.tokens: List[str] = list(dict.fromkeys(tokens))
+        if not self.tokens:
+            raise ValueError("At least one token of bot is required")
+        self.cooldown = cooldown
+        self._until: Dict[str, float] = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def next(self) -> str:
+        """Get the next token in rotation. If all tokens are out of rotation, token with the
+        nearest end of cooldown is returned."""
+        now = time.monotonic()
+        with self._lock:
+            for offset in range(len(self.tokens)):
+                index = (self._next + offset) % len(self.tokens)
+                if self._until.get(self.tokens[index], 0.0) <= now:
+                    self._next = (index + 1) % len(self.tokens)
+                    return self.tokens[index]
+            return min(self.tokens, key=lambda token: self._until[token])
+
+    def cool_down(self, token: str, seconds: Optional[float] = None) -> None:
+        """Take token out of rotation.
+
+        Args:
+            token (str): token of bot.
+            seconds (float, optional): seconds out of rotation. Default - cooldown of pool.
+        """
+        until = time.monotonic() + (self.cooldown if seconds is None else seconds)
+        with self._lock:
+            self._until[token] = max(self._until.get(token, 0.0), until)
+
+    def available(self) -> bool:
+        """Check that some token is in rotation"""
+        now = time.monotonic()
+        with self._lock:
+            return any(self._until.get(token, 0.0) <= now for token in self.tokens)
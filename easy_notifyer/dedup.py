@@ -0,0 +1,137 @@
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from easy_notifyer.report import Report
+
+
+logger = logging.getLogger(__name__)
+
+DEDUP_SIZE = 1024
+
+SummarySender = Callable[[Report, int, float], None]
+
+
+class _Window:
+    """Repeats of one fingerprint"""
+
+    __slots__ = ("report", "started", "repeats")
+
+    def __init__(self, report: Report, started: float):
+        self.report = report
+        self.started = started
+        self.repeats = 0
+
+
+class Deduplicator:
+    """Window of deduplication of reports by fingerprint. The first report of fingerprint is
+    sent, repeats in window are only counted and summary of them is sent at the end of window.
+    Count of tracked fingerprints is bounded, summary of evicted fingerprint is sent at once."""
+
+    def __init__(
+        self,
+        *,
+        window: float = 60.0,
+        maxsize: int = DEDUP_SIZE,
+        on_summary: SummarySender,
+    ):
+        """
+        Args:
+            window (float, optional): seconds of window from the first report of fingerprint.
+            maxsize (int, optional): max count of tracked fingerprints.
+            on_summary (callable): function sending summary, called with the first report of
+                window, count of repeats and seconds of window.
+        """
+        self.window = window
+        self._maxsize = maxsize
+        self._on_summary = on_summary
+        self._windows: "OrderedDict[str, _Window]" = OrderedDict()
+        self._pending: List[_Window] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+
+    def is_repeat(self, report: Report) -> bool:
+        """Check report and count it if it's repeat in window. Summaries are sent by worker
+        thread, caller never waits for them.
+
+        Returns:
+            bool: True if report is repeat and must not be sent.
+        """
+        now = time.monotonic()
+        with self._cond:
+            window = self._windows.get(report.fingerprint)
+            if window is not None and now - window.started < self.window:
+                window.repeats += 1
+                return True
+            if window is not None:
+                del self._windows[report.fingerprint]
+                self._pending.append(window)
+            self._windows[report.fingerprint] = _Window(report, now)
+            while len(self._windows) > self._maxsize:
+                self._pending.append(self._windows.popitem(last=False)[1])
+            self._start_worker()
+            if self._pending:
+                self._cond.notify()
+        return False
+
+    def _start_worker(self) -> None:
+        """Start thread sending summaries, under lock"""
+        if self._worker is None:
+            self._worker = threading.Thread(
+                target=self._run, name="easy_notifyer-dedup", daemon=True
+            )
+            self._worker.start()
+            atexit.register(self.close)
+
+    def _pop_summaries(self, force: bool = False) -> List[_Window]:
+        """Remove windows which are over or evicted, all windows if force"""
+        now = time.monotonic()
+        with self._cond:
+            windows, self._pending = self._pending, []
+            expired = [
+                fingerprint
+                for fingerprint, window in self._windows.items()
+                if force is True or now - window.started >= self.window
+            ]
+            windows.extend(self._windows.pop(fingerprint) for fingerprint in expired)
+        return windows
+
+    def _send_summaries(self, windows: List[_Window]) -> None:
+        now = time.monotonic()
+        for window in windows:
+            if window.repeats == 0:
+                continue
+            period = min(now - window.started, self.window)
+            try:
+                self._on_summary(window.report, window.repeats, period)
+            except Exception:  # noqa
+                logger.exception("Send summary of repeated reports failed.")
+
+    def _run(self) -> None:
+        """Send summaries of windows when they are over or evicted"""
+        while True:
+            with self._cond:
+                if not self._pending and self._closed is False:
+                    delay = self.window
+                    if self._windows:
+                        oldest = next(iter(self._windows.values()))
+                        delay = max(oldest.started + self.window - time.monotonic(), 0.0)
+                    self._cond.wait(delay)
+                if self._closed is True:
+                    return
+            self._send_summaries(self._pop_summaries())
+
+    def flush(self) -> None:
+        """Send summaries of all windows now"""
+        self._send_summaries(self._pop_summaries(force=True))
+
+    def close(self) -> None:
+        """Stop worker and send summaries of windows in progress"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
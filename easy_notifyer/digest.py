@@ -0,0 +1,183 @@
+import atexit
+import gzip
+import logging
+import threading
+import time
+from collections import OrderedDict
+from socket import gethostname
+from typing import Callable, List, Optional
+
+from easy_notifyer.report import Report
+
+
+logger = logging.getLogger(__name__)
+
+DIGEST_DT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+DigestSender = Callable[[str, bytes], None]
+
+
+class _Group:
+    """Reports of one fingerprint in digest"""
+
+    __slots__ = ("exception", "func_name", "count", "first_seen", "last_seen", "reports")
+
+    def __init__(self, report: Report):
+        self.exception = report.exception
+        self.func_name = report.func_name
+        self.count = 0
+        self.first_seen = report.created
+        self.last_seen = report.created
+        self.reports: List[Report] = []
+
+
+class Digest:
+    """Buffer of reports sent as one digest every interval or when enough reports are
+    collected. Reports are grouped by fingerprint, tracebacks are attached as one gzip file.
+    Memory is bounded: reports over max_reports are only counted, tracebacks are formatted
+    by worker and only max_bytes of them are attached."""
+
+    def __init__(
+        self,
+        *,
+        interval: float = 300.0,
+        max_reports: int = 100,
+        max_bytes: int = 1024 * 1024,
+        service_name: Optional[str] = None,
+        on_flush: DigestSender,
+    ):
+        """
+        Args:
+            interval (float, optional): max seconds from the first report to sending digest.
+            max_reports (int, optional): count of reports to send digest before interval.
+            max_bytes (int, optional): max size of tracebacks attached to one digest.
+            service_name (str, optional): Service name.
+            on_flush (callable): function sending digest, called with text of digest and
+                gzipped tracebacks.
+        """
+        self.interval = interval
+        self.max_reports = max(1, max_reports)
+        self._max_bytes = max_bytes
+        self._service_name = service_name
+        self._on_flush = on_flush
+        self._groups: "OrderedDict[str, _Group]" = OrderedDict()
+        self._count = 0
+        self._started: Optional[float] = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+
+    def add(self, report: Report) -> None:
+        """Add report to digest. Digest is sent by worker thread, caller never waits for it."""
+        with self._cond:
+            group = self._groups.get(report.fingerprint)
+            if group is None:
+                group = self._groups[report.fingerprint] = _Group(report)
+            group.count += 1
+            group.last_seen = report.created
+            if self._count < self.max_reports:
+                group.reports.append(report)
+            self._count += 1
+            if self._started is None:
+                self._started = time.monotonic()
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="easy_notifyer-digest", daemon=True
+                )
+                self._worker.start()
+                atexit.register(self.close)
+            if self._count >= self.max_reports:
+                self._cond.notify()
+
+    def _take(self, force: bool = False) -> Optional[List[_Group]]:
+        """Take groups of digest which is ready to send, under lock"""
+        if self._started is None:
+            return None
+        ready = self._count >= self.max_reports
+        if force is False and ready is False:
+            if time.monotonic() - self._started < self.interval:
+                return None
+        groups = list(self._groups.values())
+        self._groups = OrderedDict()
+        self._count = 0
+        self._started = None
+        return groups
+
+    def _render(self, groups: List[_Group]) -> str:
+        """Formatting text of digest"""
+        count = sum(group.count for group in groups)
+        first = min(group.first_seen for group in groups)
+        last = max(group.last_seen for group in groups)
+        lines = ["Digest of errors ☠️"]
+        if self._service_name is not None:
+            lines.append("Service: %s" % self._service_name)
+        lines.extend(
+            [
+                "Machine name: %s" % gethostname(),
+                "Reports: {:,}, errors: {:,}".format(count, len(groups)),
+                "Period: %s - %s"
+                % (first.strftime(DIGEST_DT_FORMAT), last.strftime(DIGEST_DT_FORMAT)),
+                "",
+            ]
+        )
+        for number, group in enumerate(sorted(groups, key=lambda g: -g.count), start=1):
+            lines.append("{}. x{:,} {}".format(number, group.count, group.exception))
+            if group.func_name is not None:
+                lines.append("   Main call: %s" % group.func_name)
+            first_seen = group.first_seen.strftime(DIGEST_DT_FORMAT)
+            last_seen = group.last_seen.strftime(DIGEST_DT_FORMAT)
+            lines.append("   First seen: %s, last seen: %s" % (first_seen, last_seen))
+        return "\n".join(lines)
+
+    def _compress(self, groups: List[_Group]) -> bytes:
+        """Format tracebacks of all groups and gzip them into one file"""
+        parts = []
+        size = 0
+        for group in groups:
+            parts.append("=== x{:,} {} ===\n".format(group.count, group.exception))
+            kept = 0
+            for report in group.reports:
+                size += len(report.tback)
+                if size > self._max_bytes:
+                    break
+                parts.append(f"{report.tback}\n")
+                kept += 1
+            if kept < group.count:
+                parts.append(f"... {group.count - kept} tracebacks are not kept\n")
+        return gzip.compress("".join(parts).encode("utf-8"))
+
+    def _send(self, groups: Optional[List[_Group]]) -> None:
+        if not groups:
+            return
+        try:
+            self._on_flush(self._render(groups), self._compress(groups))
+        except Exception:  # noqa
+            logger.exception("Send digest of reports failed.")
+
+    def _run(self) -> None:
+        """Send digest when interval is over or enough reports are collected"""
+        while True:
+            with self._cond:
+                groups = self._take()
+                while groups is None and self._closed is False:
+                    delay = self.interval
+                    if self._started is not None:
+                        delay = max(self._started + self.interval - time.monotonic(), 0.0)
+                    self._cond.wait(delay)
+                    groups = self._take()
+                if groups is None:
+                    return
+            self._send(groups)
+
+    def flush(self) -> None:
+        """Send collected reports now"""
+        with self._cond:
+            groups = self._take(force=True)
+        self._send(groups)
+
+    def close(self) -> None:
+        """Stop worker and send collected reports"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
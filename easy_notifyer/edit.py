@@ -0,0 +1,191 @@
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from easy_notifyer.clients.telegram import CAPTION_LIMIT, MESSAGE_LIMIT, SendResult, split_text
+from easy_notifyer.report import Report
+
+
+logger = logging.getLogger(__name__)
+
+EDIT_SIZE = 1024
+EDIT_DT_FORMAT = "%H:%M:%S"
+
+ChatId = Union[int, str]
+# message_id, text of message, True if text is caption of document, token of bot
+SentMessage = Tuple[int, str, bool, Optional[str]]
+EditSender = Callable[[ChatId, int, str, bool, Optional[str]], SendResult]
+
+
+class _Thread:
+    """Sent messages of one fingerprint and count of its reports"""
+
+    __slots__ = ("started", "messages", "count", "last_seen", "edited", "edited_count")
+
+    def __init__(self, report: Report, started: float):
+        self.started = started
+        self.messages: Optional[Dict[ChatId, SentMessage]] = None
+        self.count = 1
+        self.last_seen: datetime = report.created
+        self.edited = 0.0
+        self.edited_count = 1
+
+
+class RepeatEditor:
+    """Counter of repeating errors in sent messages. The first report of fingerprint is sent,
+    message_id of it is kept for every chat, repeats in window update this message by
+    editMessageText or editMessageCaption with count of reports and time of the last one.
+    Edits of one fingerprint are throttled to one per interval."""
+
+    def __init__(
+        self,
+        *,
+        window: float = 3600.0,
+        interval: float = 5.0,
+        maxsize: int = EDIT_SIZE,
+        on_edit: EditSender,
+    ):
+        """
+        Args:
+            window (float, optional): seconds from the first report of fingerprint while its
+                message is updated. Report after window is sent as new message.
+            interval (float, optional): min seconds between edits of one message.
+            maxsize (int, optional): max count of tracked fingerprints.
+            on_edit (callable): function editing message, called with chat id, message_id,
+                new text, True if text is caption of document and token of bot which sent
+                message.
+        """
+        self.window = window
+        self.interval = interval
+        self._maxsize = maxsize
+        self._on_edit = on_edit
+        self._threads: "OrderedDict[str, _Thread]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+
+    def is_repeat(self, report: Report) -> bool:
+        """Check report and count it if its message is already sent or being sent. Messages
+        are edited by worker thread, caller never waits for it.
+
+        Returns:
+            bool: True if report is repeat and must not be sent.
+        """
+        now = time.monotonic()
+        with self._cond:
+            thread = self._threads.get(report.fingerprint)
+            if thread is not None and now - thread.started < self.window:
+                thread.count += 1
+                thread.last_seen = report.created
+                self._start_worker()
+                self._cond.notify()
+                return True
+            self._threads[report.fingerprint] = _Thread(report, now)
+            self._threads.move_to_end(report.fingerprint)
+            while len(self._threads) > self._maxsize:
+                self._threads.popitem(last=False)
+        return False
+
+    def remember(self, report: Report, results: List[SendResult]) -> None:
+        """Keep messages of sent report to edit them on repeats. Fingerprint is forgotten if
+        report was not delivered to any chat, so the next report is sent again."""
+        messages = {}
+        for result in results:
+            if result.ok is True and isinstance(result.result, dict):
+                if "message_id" not in result.result:
+                    continue
+                is_caption = "text" not in result.result
+                text = result.result.get("caption" if is_caption else "text") or ""
+                message_id = result.result["message_id"]
+                messages[result.chat_id] = (message_id, text, is_caption, result.token)
+        with self._cond:
+            thread = self._threads.get(report.fingerprint)
+            if thread is None or thread.messages is not None:
+                return
+            if not messages:
+                del self._threads[report.fingerprint]
+                return
+            thread.messages = messages
+            thread.edited = time.monotonic()
+            self._cond.notify()
+
+    def _start_worker(self) -> None:
+        """Start thread editing messages, under lock"""
+        if self._worker is None:
+            self._worker = threading.Thread(
+                target=self._run, name="easy_notifyer-edit", daemon=True
+            )
+            self._worker.start()
+            atexit.register(self.close)
+
+    @staticmethod
+    def _render(text: str, count: int, last_seen: datetime, is_caption: bool) -> str:
+        """Text of message with counter of reports, text is cut to fit limit of telegram"""
+        counter = "\n\n🔁 x{:,}, last at {}".format(count, last_seen.strftime(EDIT_DT_FORMAT))
+        limit = CAPTION_LIMIT if is_caption else MESSAGE_LIMIT
+        limit -= len(counter.encode("utf-16-le")) // 2
+        parts = split_text(text, limit)
+        return (parts[0] if parts else "").rstrip("\n") + counter
+
+    def _pop_edits(self, force: bool = False) -> List[Tuple[Dict, int, datetime]]:
+        """Take messages to edit: throttle interval is over and count changed, under lock"""
+        now = time.monotonic()
+        edits = []
+        for thread in self._threads.values():
+            if thread.messages is None or thread.count == thread.edited_count:
+                continue
+            if force is True or now - thread.edited >= self.interval:
+                edits.append((thread.messages, thread.count, thread.last_seen))
+                thread.edited = now
+                thread.edited_count = thread.count
+        return edits
+
+    def _delay(self) -> Optional[float]:
+        """Seconds to the nearest edit, under lock. None - nothing to edit."""
+        pending = [
+            thread.edited + self.interval
+            for thread in self._threads.values()
+            if thread.messages is not None and thread.count != thread.edited_count
+        ]
+        if not pending:
+            return None
+        return max(min(pending) - time.monotonic(), 0.0)
+
+    def _edit(self, edits: List[Tuple[Dict, int, datetime]]) -> None:
+        for messages, count, last_seen in edits:
+            for chat_id, (message_id, text, is_caption, token) in messages.items():
+                text = self._render(text, count, last_seen, is_caption)
+                try:
+                    self._on_edit(chat_id, message_id, text, is_caption, token)
+                except Exception:  # noqa
+                    logger.exception("Edit of message with repeated reports failed.")
+
+    def _run(self) -> None:
+        """Edit messages when throttle interval is over"""
+        while True:
+            with self._cond:
+                edits = self._pop_edits()
+                while not edits and self._closed is False:
+                    self._cond.wait(self._delay())
+                    edits = self._pop_edits()
+                closed = self._closed
+            self._edit(edits)
+            if closed is True:
+                return
+
+    def flush(self) -> None:
+        """Edit messages with not shown repeats now"""
+        with self._cond:
+            edits = self._pop_edits(force=True)
+        self._edit(edits)
+
+    def close(self) -> None:
+        """Stop worker and show the last counts in messages"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
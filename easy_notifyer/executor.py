@@ -0,0 +1,168 @@
+import asyncio
+import atexit
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+EXECUTOR_WORKERS = 4
+EXECUTOR_QUEUE = 64
+
+
+class BoundedExecutor(Executor):
+    """Thread pool of library, separate from default executor of event loop, so blocking work
+    of reports doesn't take threads of application. Count of queued calls is bounded: sync
+    callers are blocked and async callers wait without blocking event loop until there is
+    place in queue."""
+
+    def __init__(self, *, max_workers: int = EXECUTOR_WORKERS, max_queue: int = EXECUTOR_QUEUE):
+        """
+        Args:
+            max_workers (int, optional): count of threads.
+            max_queue (int, optional): max count of calls waiting for free thread.
+        """
+        max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="easy_notifyer-executor"
+        )
+        self._limit = max_workers + max(0, max_queue)
+        self._lock = threading.Lock()
+        self._slots = 0
+        self._waiters: Deque[Future] = deque()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._shutdown = False
+
+    def _acquire(self) -> Future:
+        """Take place in queue. Returned future is done when place is taken."""
+        waiter = Future()
+        with self._lock:
+            if self._shutdown is True:
+                raise RuntimeError("Executor is shut down")
+            if self._slots < self._limit and not self._waiters:
+                self._slots += 1
+                waiter.set_result(None)
+            else:
+                self._waiters.append(waiter)
+        return waiter
+
+    def _release(self) -> None:
+        """Give place in queue to the next waiting caller"""
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.set_running_or_notify_cancel() is True:
+                    waiter.set_result(None)
+                    return
+            self._slots -= 1
+
+    def _call(self, submitted: float, func: Callable, args: tuple, kwargs: dict) -> Any:
+        wait_time = time.monotonic() - submitted
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._wait_time += wait_time
+            self._max_wait_time = max(self._max_wait_time, wait_time)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+            self._release()
+
+    def _submit(self, submitted: float, func: Callable, args: tuple, kwargs: dict) -> Future:
+        with self._lock:
+            self._queued += 1
+        try:
+            future = self._executor.submit(self._call, submitted, func, args, kwargs)
+        except BaseException:
+            self._forget()
+            raise
+        future.add_done_callback(self._forget_cancelled)
+        return future
+
+    def _forget(self) -> None:
+        """Free place of call which never starts"""
+        with self._lock:
+            self._queued -= 1
+        self._release()
+
+    def _forget_cancelled(self, future: Future) -> None:
+        """Free place of call cancelled before start, its _call is never run"""
+        if future.cancelled() is True:
+            self._forget()
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:  # noqa
+        """Schedule call in thread pool, caller is blocked while queue is full.
+
+        Returns:
+            Future: result of call.
+        """
+        submitted = time.monotonic()
+        self._acquire().result()
+        return self._submit(submitted, fn, args, kwargs)
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """Run call in thread pool, waiting for place in queue without blocking event loop.
+
+        Returns:
+            same as func.
+        """
+        submitted = time.monotonic()
+        waiter = self._acquire()
+        try:
+            await asyncio.wrap_future(waiter)
+        except asyncio.CancelledError:
+            if waiter.done() is True and waiter.cancelled() is False:
+                self._release()
+            raise
+        return await asyncio.wrap_future(self._submit(submitted, func, args, {}))
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Queue depth and wait time of calls: "queued" calls waiting for thread, "waiting"
+        callers blocked by full queue, "running" and "completed" calls, total and max seconds
+        from call to start in thread."""
+        with self._lock:
+            return {
+                "queued": self._queued,
+                "waiting": len(self._waiters),
+                "running": self._running,
+                "completed": self._completed,
+                "wait_time": self._wait_time,
+                "max_wait_time": self._max_wait_time,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:  # pylint: disable=arguments-differ
+        """Stop accepting calls, cancel waiting callers and stop threads.
+
+        Args:
+            wait (bool, optional): wait until queued calls are done.
+        """
+        with self._lock:
+            self._shutdown = True
+            waiters, self._waiters = self._waiters, deque()
+        for waiter in waiters:
+            waiter.cancel()
+        self._executor.shutdown(wait=wait)
+
+
+_default_executor: Optional[BoundedExecutor] = None
+_default_executor_lock = threading.Lock()
+
+
+def get_default_executor() -> BoundedExecutor:
+    """Get executor shared by clients and reporters without own executor. Executor is shut
+    down at interpreter exit, a new one is created if it was shut down."""
+    global _default_executor  # pylint: disable=global-statement
+    with _default_executor_lock:
+        if _default_executor is None or _default_executor._shutdown is True:
+            _default_executor = BoundedExecutor()
+            atexit.register(_default_executor.shutdown)
+        return _default_executor
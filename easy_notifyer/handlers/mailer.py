@@ -1,16 +1,38 @@
 import asyncio
 import functools
-import traceback
-from typing import Callable, List, Optional, Tuple, Type, Union
+import hashlib
+import logging
+from concurrent.futures import Executor
+from datetime import datetime
+from traceback import TracebackException
+from typing import Callable, Dict, List, Optional, Tuple, Type, Union
 
-from easy_notifyer.clients.mailer import Mailer
-from easy_notifyer.report import Report
-from easy_notifyer.utils import generate_filename, run_in_threadpool
+from easy_notifyer.clients.mailer import Mailer, MailerAsync, SMTPPool, get_smtp_pool
+from easy_notifyer.clients.outbox import get_default_outbox
+from easy_notifyer.clients.retry import RetryPolicy
+from easy_notifyer.dedup import Deduplicator
+from easy_notifyer.digest import Digest
+from easy_notifyer.report import TRACEBACK_LIMIT, Report, capture_traceback
+from easy_notifyer.sampling import CircuitBreaker, Sampler
+from easy_notifyer.spool import Spool, get_spool
+from easy_notifyer.utils import FILENAME_DT_FORMAT, generate_filename, run_in_executor
 
 
-def _report_mailer_handler(
+logger = logging.getLogger(__name__)
+
+_spool_policy = RetryPolicy()
+
+
+def _spool_channel(*, host: str, port: int, login: str, from_addr: str, to_addrs: str) -> str:
+    """Name of spool channel for smtp server and addresses. Credentials are not written to
+    spool, only hash of configuration."""
+    config = f"{host}|{port}|{login}|{from_addr}|{to_addrs}"
+    return f"mailer:{hashlib.sha256(config.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _send_mail(
     *,
-    report: Report,
+    payload: Dict,
     host: str,
     port: int,
     login: str,
@@ -18,26 +40,229 @@ def _report_mailer_handler(
     from_addr: str,
     to_addrs: Union[str, List[str]],
     ssl: bool = False,
-    filename: Optional[str] = None,
-    subject: Optional[str] = None,
-):
+    pool: Optional[SMTPPool] = None,
+) -> None:
+    """Send report from payload"""
     with Mailer(
         host=host,
         port=port,
         login=login,
         password=password,
         ssl=ssl,
+        pool=pool,
     ) as mailer:
         mailer.send_message(
-            message=report.report,
+            message=payload["text"],
             from_addr=from_addr,
             to_addrs=to_addrs,
-            subject=subject,
-            attach=report.attach,
-            filename=filename or generate_filename(),
+            subject=payload["subject"],
+            attach=payload["attach"],
+            filename=payload["filename"],
         )
 
 
+def _report_payload(*, report: Report, subject: Optional[str], filename: Optional[str]) -> Dict:
+    """Make json-serializable payload of report for spool"""
+    return {
+        "text": report.report,
+        "subject": subject,
+        "attach": report.attach,
+        "filename": filename or generate_filename(),
+    }
+
+
+async def _async_send_mail(
+    *,
+    payload: Dict,
+    host: str,
+    port: int,
+    login: str,
+    password: str,
+    from_addr: str,
+    to_addrs: Union[str, List[str]],
+    ssl: bool = False,
+    executor: Optional[Executor] = None,
+) -> None:
+    """Send report from payload by async smtp session"""
+    async with MailerAsync(
+        host=host,
+        port=port,
+        login=login,
+        password=password,
+        ssl=ssl,
+        executor=executor,
+    ) as mailer:
+        await mailer.send_message(
+            message=payload["text"],
+            from_addr=from_addr,
+            to_addrs=to_addrs,
+            subject=payload["subject"],
+            attach=payload["attach"],
+            filename=payload["filename"],
+        )
+
+
+def _replay_mailer_report(payload: Dict, **params_for_send) -> bool:
+    """Send spooled report. Report refused by smtp server is dropped.
+
+    Returns:
+        bool: False if report was not delivered and can be delivered later.
+    """
+    try:
+        _send_mail(payload=payload, **params_for_send)
+    except Exception as error:  # noqa
+        if _spool_policy.is_transient(error) is True:
+            raise
+        logger.exception("Spooled report is refused by smtp server and dropped.")
+    return True
+
+
+def _send_mailer_summary(report: Report, repeats: int, period: float, **params_for_send) -> None:
+    """Send summary of reports repeated in window of deduplication"""
+    payload = {
+        "text": report.make_summary(repeats, period),
+        "subject": None,
+        "attach": None,
+        "filename": None,
+    }
+    _send_mail(payload=payload, **params_for_send)
+
+
+def _send_mailer_digest(
+    text: str, tracebacks: bytes, *, subject: Optional[str], **params_for_send
+) -> None:
+    """Send digest of reports with gzipped tracebacks"""
+    payload = {
+        "text": text,
+        "subject": subject,
+        "attach": tracebacks,
+        "filename": "tracebacks %s.txt.gz" % datetime.now().strftime(FILENAME_DT_FORMAT),
+    }
+    _send_mail(payload=payload, **params_for_send)
+
+
+def _prewarm_mailer(**params) -> None:
+    """Warm up pool of smtp sessions of reporter, failure is only logged"""
+    try:
+        Mailer(**params).warmup()
+    except Exception:  # noqa
+        logger.exception("Prewarm of smtp session failed, check server and credentials.")
+
+
+def _report_mailer_handler(
+    *,
+    report: Report,
+    host: str,
+    port: int,
+    login: str,
+    password: str,
+    from_addr: str,
+    to_addrs: Union[str, List[str]],
+    ssl: bool = False,
+    filename: Optional[str] = None,
+    subject: Optional[str] = None,
+    spool: Optional[Spool] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    pool: Optional[SMTPPool] = None,
+):
+    payload = _report_payload(report=report, subject=subject, filename=filename)
+    params_for_send = {
+        "host": host,
+        "port": port,
+        "login": login,
+        "password": password,
+        "from_addr": from_addr,
+        "to_addrs": to_addrs,
+        "ssl": ssl,
+        "pool": pool,
+    }
+    channel = _spool_channel(
+        host=host, port=port, login=login, from_addr=from_addr, to_addrs=str(to_addrs)
+    )
+    if breaker is not None and breaker.allow() is False:
+        logger.warning("Circuit of smtp server is open, report is not sent.")
+        if spool is not None:
+            spool.append(channel, payload)
+        return
+    try:
+        _send_mail(payload=payload, **params_for_send)
+    except Exception as error:  # noqa
+        if breaker is not None:
+            breaker.record(False)
+        if spool is None:
+            raise
+        if _spool_policy.is_transient(error) is False:
+            logger.exception("Report is refused by smtp server, it's not spooled.")
+            return
+        logger.exception("Send report to mail error, report is spooled.")
+        spool.append(channel, payload)
+    except BaseException:
+        if breaker is not None:
+            breaker.record(False)
+        raise
+    else:
+        if breaker is not None:
+            breaker.record(True)
+
+
+async def _async_report_mailer_handler(
+    *,
+    report: Report,
+    host: str,
+    port: int,
+    login: str,
+    password: str,
+    from_addr: str,
+    to_addrs: Union[str, List[str]],
+    ssl: bool = False,
+    filename: Optional[str] = None,
+    subject: Optional[str] = None,
+    spool: Optional[Spool] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    executor: Optional[Executor] = None,
+):
+    payload = await run_in_executor(
+        executor, _report_payload, report=report, subject=subject, filename=filename
+    )
+    channel = _spool_channel(
+        host=host, port=port, login=login, from_addr=from_addr, to_addrs=str(to_addrs)
+    )
+    if breaker is not None and breaker.allow() is False:
+        logger.warning("Circuit of smtp server is open, report is not sent.")
+        if spool is not None:
+            await run_in_executor(executor, spool.append, channel, payload)
+        return
+    try:
+        await _async_send_mail(
+            payload=payload,
+            host=host,
+            port=port,
+            login=login,
+            password=password,
+            from_addr=from_addr,
+            to_addrs=to_addrs,
+            ssl=ssl,
+            executor=executor,
+        )
+    except Exception as error:  # noqa
+        if breaker is not None:
+            breaker.record(False)
+        if spool is None:
+            raise
+        if _spool_policy.is_transient(error) is False:
+            logger.exception("Report is refused by smtp server, it's not spooled.")
+            return
+        logger.exception("Send report to mail error, report is spooled.")
+        await run_in_executor(executor, spool.append, channel, payload)
+    except BaseException:
+        if breaker is not None:
+            breaker.record(False)
+        raise
+    else:
+        if breaker is not None:
+            breaker.record(True)
+
+
 def mailer_reporter(
     *,
     host: str,
@@ -48,8 +273,18 @@ def mailer_reporter(
     to_addrs: Union[str, List[str]],
     ssl: bool = False,
     service_name: Optional[str] = None,
+    spool_dir: Optional[str] = None,
+    dedup_window: Optional[float] = None,
+    sampler: Optional[Sampler] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+    digest_interval: Optional[float] = None,
+    digest_max_reports: int = 100,
+    prewarm: bool = False,
+    executor: Optional[Executor] = None,
 ) -> Callable:
-    """Handler errors for sending report on email.
+    """Handler errors for sending report on email. Pool of smtp sessions is created once and
+    shared by reporters with the same server and account, `close_clients()` or
+    `await aclose_clients()` of easy_notifyer.clients.registry close sessions at shutdown.
 
     Args:
         host(str, optional): = post of smtp server.
@@ -60,7 +295,75 @@ def mailer_reporter(
         to_addrs(str, list(str), optional): addresses to send this mail to.
         ssl(bool, optional): use SSL connection for smtp.
         service_name (optional): Service name.
+        spool_dir (str, optional): directory of spool. Undelivered reports are saved to spool
+            and sent again in background, when smtp server is available.
+        dedup_window (float, optional): seconds of deduplication window. Reports with the same
+            fingerprint in window are counted and sent as one summary at the end of window.
+            None - every report is sent.
+        sampler (Sampler, optional): sampler of reports for high rate of errors.
+        circuit_breaker (CircuitBreaker, optional): circuit breaker of smtp server, reports
+            are not sent to server which keeps failing.
+        digest_interval (float, optional): seconds of collecting reports into one digest mail.
+            Digest groups errors by fingerprint, tracebacks are attached as gzip file.
+            None - every report is sent as separate mail.
+        digest_max_reports (int, optional): count of reports to send digest before interval.
+        prewarm (bool, optional): resolve address of server, open session and check
+            credentials in background when reporter is made, so the first report costs only
+            sending.
+        executor (Executor, optional): executor of blocking work of reports in async code:
+            compression and spooling. Default - bounded thread pool of library, see
+            easy_notifyer.executor.
     """
+    mail_params = {
+        "host": host,
+        "port": port,
+        "login": login,
+        "password": password,
+        "from_addr": from_addr,
+        "to_addrs": to_addrs,
+        "ssl": ssl,
+    }
+    smtp_pool = get_smtp_pool(host=host, port=port, login=login, password=password, ssl=ssl)
+    if prewarm is True:
+        get_default_outbox().submit(
+            _prewarm_mailer,
+            host=host,
+            port=port,
+            login=login,
+            password=password,
+            ssl=ssl,
+            pool=smtp_pool,
+        )
+    spool = None
+    if spool_dir is not None:
+        spool = get_spool(spool_dir)
+        spool.register(
+            _spool_channel(
+                host=host, port=port, login=login, from_addr=from_addr, to_addrs=str(to_addrs)
+            ),
+            functools.partial(_replay_mailer_report, pool=smtp_pool, **mail_params),
+        )
+
+    dedup = None
+    if dedup_window is not None:
+        dedup = Deduplicator(
+            window=dedup_window,
+            on_summary=functools.partial(_send_mailer_summary, pool=smtp_pool, **mail_params),
+        )
+
+    digest = None
+    if digest_interval is not None:
+        digest = Digest(
+            interval=digest_interval,
+            max_reports=digest_max_reports,
+            service_name=service_name,
+            on_flush=functools.partial(
+                _send_mailer_digest,
+                subject="Digest of errors" + (f": {service_name}" if service_name else ""),
+                pool=smtp_pool,
+                **mail_params,
+            ),
+        )
 
     def mailer_wrapper(
         *,
@@ -70,6 +373,7 @@ def mailer_reporter(
         datetime_format: str = "%Y-%m-%d %H:%M:%S",
         subject: Optional[str] = None,
         filename: Optional[str] = None,
+        traceback_limit: Optional[int] = TRACEBACK_LIMIT,
     ):
         """Handler errors for sending report on email.
 
@@ -83,18 +387,16 @@ def mailer_reporter(
             subject(str, optional): subject of the mail.
             filename(str, optional): filename for sending report as file.
                 Default: datetime %Y-%m-%d %H_%M_%S.txt.
+            traceback_limit (int, optional): max count of the last frames of traceback in
+                report. Traceback is formatted when report is sent. None - all frames.
         """
         exceptions = exceptions or Exception
         params_for_send = {
-            "host": host,
-            "port": port,
-            "login": login,
-            "password": password,
-            "from_addr": from_addr,
-            "to_addrs": to_addrs,
-            "ssl": ssl,
+            **mail_params,
             "filename": filename,
             "subject": subject,
+            "spool": spool,
+            "breaker": circuit_breaker,
         }
 
         def decorator(func):
@@ -104,9 +406,8 @@ def mailer_reporter(
                 try:
                     return await func(*args, **kwargs)
                 except exceptions as exc:
-                    tback = traceback.format_exc()
-                    report = await run_in_threadpool(
-                        _report_maker,
+                    tback = capture_traceback(exc, limit=traceback_limit)
+                    report = _report_maker(
                         tback=tback,
                         func_name=func_name,
                         header=header,
@@ -114,10 +415,15 @@ def mailer_reporter(
                         service_name=service_name,
                         datetime_format=datetime_format,
                     )
-                    await run_in_threadpool(
-                        _report_mailer_handler,
-                        report=report,
-                        **params_for_send,
+                    if dedup is not None and dedup.is_repeat(report) is True:
+                        raise exc
+                    if sampler is not None and sampler.sample(report) is False:
+                        raise exc
+                    if digest is not None:
+                        digest.add(report)
+                        raise exc
+                    await _async_report_mailer_handler(
+                        report=report, executor=executor, **params_for_send
                     )
                     raise exc
 
@@ -125,7 +431,7 @@ def mailer_reporter(
                 try:
                     return func(*args, **kwargs)
                 except exceptions as exc:
-                    tback = traceback.format_exc()
+                    tback = capture_traceback(exc, limit=traceback_limit)
                     report = _report_maker(
                         tback=tback,
                         func_name=func_name,
@@ -134,7 +440,14 @@ def mailer_reporter(
                         service_name=service_name,
                         datetime_format=datetime_format,
                     )
-                    _report_mailer_handler(report=report, **params_for_send)
+                    if dedup is not None and dedup.is_repeat(report) is True:
+                        raise exc
+                    if sampler is not None and sampler.sample(report) is False:
+                        raise exc
+                    if digest is not None:
+                        digest.add(report)
+                        raise exc
+                    _report_mailer_handler(report=report, pool=smtp_pool, **params_for_send)
                     raise exc
 
             if asyncio.iscoroutinefunction(func) is True:
@@ -148,7 +461,7 @@ def mailer_reporter(
 
 def _report_maker(
     *,
-    tback: str,
+    tback: Union[str, TracebackException],
     func_name: Optional[str] = None,
     header: Optional[str] = None,
     as_attached: bool = False,
@@ -158,7 +471,7 @@ def _report_maker(
     """
     Make report from
     Args:
-        tback (str): traceback for report.
+        tback (str, TracebackException): traceback for report.
         func_name (str, optional): name of function when raised error.
         header (str, optional): first line in report message. Default -
         "Your program has crashed ☠️"
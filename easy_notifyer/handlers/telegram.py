@@ -1,20 +1,33 @@
 import asyncio
 import functools
+import hashlib
 import logging
-import traceback
-from typing import Callable, List, Optional, Tuple, Type, Union
+from concurrent.futures import Executor, Future
+from traceback import TracebackException
+from typing import Callable, Dict, List, Optional, Set, Tuple, Type, Union
 
-from easy_notifyer.clients.telegram import Telegram, TelegramAsync
-from easy_notifyer.report import Report
-from easy_notifyer.utils import generate_filename, run_in_threadpool
+from easy_notifyer.clients.outbox import (
+    AsyncOutbox, Outbox, get_default_async_outbox, get_default_outbox
+)
+from easy_notifyer.clients.registry import get_telegram, get_telegram_async
+from easy_notifyer.clients.retry import RetryPolicy
+from easy_notifyer.clients.telegram import SendResult, Telegram, TelegramAsync, track_delivered
+from easy_notifyer.dedup import Deduplicator
+from easy_notifyer.edit import RepeatEditor
+from easy_notifyer.report import TRACEBACK_LIMIT, Report, capture_traceback
+from easy_notifyer.sampling import CircuitBreaker, Sampler
+from easy_notifyer.spool import Spool, get_spool
+from easy_notifyer.utils import generate_filename, run_in_executor
 
 
 logger = logging.getLogger(__name__)
 
+_spool_policy = RetryPolicy()
+
 
 def _report_maker(
     *,
-    tback: str,
+    tback: Union[str, TracebackException],
     func_name: Optional[str],
     header: Optional[str],
     as_attached: bool,
@@ -24,7 +37,7 @@ def _report_maker(
     """Make report from.
 
     Args:
-        tback (str): traceback for report.
+        tback (str, TracebackException): traceback for report.
         func_name (str, optional): name of function when raised error.
         header (str, optional): first line in report message. Default -
         "Your program has crashed ☠️"
@@ -38,98 +51,457 @@ def _report_maker(
     return Report(tback, func_name, header, as_attached, service_name, datetime_format)
 
 
+def _spool_channel(token: Union[str, List[str]], api_url: Optional[str]) -> str:
+    """Name of spool channel for bots. Token is not written to spool, only its hash."""
+    tokens = token if isinstance(token, str) else "|".join(token)
+    digest = hashlib.sha256(f"{tokens}|{api_url}".encode("utf-8")).hexdigest()
+    return f"telegram:{digest[:16]}"
+
+
+def _is_transient(result: SendResult) -> bool:
+    """Check that report failed in chat can be delivered later"""
+    return result.ok is False and _spool_policy.is_transient(result.error)
+
+
+def _spool_failed(
+    *,
+    spool: Optional[Spool],
+    channel: str,
+    results: List[SendResult],
+    payload: Dict,
+) -> None:
+    """Write report to spool for chats where it was not delivered by transient error, such
+    as timeout or 5xx. Report rejected by telegram is not sent again."""
+    failed = [result.chat_id for result in results if _is_transient(result) is True]
+    if spool is not None and failed:
+        spool.append(channel, {**payload, "chat_id": failed})
+
+
+def _report_payload(
+    *,
+    report: Report,
+    filename: Optional[str],
+    disable_notification: bool,
+    disable_web_page_preview: bool,
+) -> Dict:
+    """Make json-serializable payload of report for spool"""
+    return {
+        "text": report.report,
+        "attach": report.attach,
+        "filename": filename,
+        "disable_notification": disable_notification,
+        "disable_web_page_preview": disable_web_page_preview,
+    }
+
+
+def _send_payload(bot: Telegram, payload: Dict) -> List[SendResult]:
+    """Send report from payload"""
+    if payload["attach"] is not None:
+        return bot.send_attach(
+            msg=payload["text"],
+            attach=payload["attach"],
+            filename=payload["filename"] or generate_filename(),
+            disable_notification=payload["disable_notification"],
+        )
+    return bot.send_message(
+        payload["text"],
+        disable_notification=payload["disable_notification"],
+        disable_web_page_preview=payload["disable_web_page_preview"],
+    )
+
+
+async def _async_send_payload(bot: TelegramAsync, payload: Dict) -> List[SendResult]:
+    """Send report from payload"""
+    if payload["attach"] is not None:
+        return await bot.send_attach(
+            msg=payload["text"],
+            attach=payload["attach"],
+            filename=payload["filename"] or generate_filename(),
+            disable_notification=payload["disable_notification"],
+        )
+    return await bot.send_message(
+        payload["text"],
+        disable_notification=payload["disable_notification"],
+        disable_web_page_preview=payload["disable_web_page_preview"],
+    )
+
+
+def _replay_telegram_report(
+    payload: Dict,
+    *,
+    token: Union[str, List[str]],
+    api_url: Optional[str],
+    spool: Spool,
+    channel: str,
+) -> bool:
+    """Send spooled report. Report is spooled again for chats where it failed again by
+    transient error.
+
+    Returns:
+        bool: False if report was not delivered to any chat and can be delivered later.
+    """
+    bot = get_telegram(token=token, chat_id=payload["chat_id"], api_url=api_url)
+    results = _send_payload(bot, payload)
+    if not any(result.ok for result in results) and any(map(_is_transient, results)):
+        return False
+    _spool_failed(spool=spool, channel=channel, results=results, payload=payload)
+    return True
+
+
+def _send_telegram_summary(
+    report: Report,
+    repeats: int,
+    period: float,
+    *,
+    token: Union[str, List[str]],
+    chat_id: Union[int, List[int]],
+    api_url: Optional[str],
+) -> None:
+    """Send summary of reports repeated in window of deduplication"""
+    bot = get_telegram(token=token, chat_id=chat_id, api_url=api_url)
+    bot.send_message(report.make_summary(repeats, period))
+
+
+def _edit_telegram_message(
+    chat_id: Union[int, str],
+    message_id: int,
+    text: str,
+    is_caption: bool,
+    bot_token: Optional[str],
+    *,
+    token: Union[str, List[str]],
+    chats: Union[List[int], List[str], int, str],
+    api_url: Optional[str],
+    executor: Optional[Executor],
+) -> SendResult:
+    """Edit message of report to show count of repeats, by client of reporter and the same
+    bot which sent message"""
+    bot = get_telegram(token=token, chat_id=chats, api_url=api_url, executor=executor)
+    if is_caption is True:
+        return bot.edit_message_caption(chat_id, message_id, text, token=bot_token)
+    return bot.edit_message_text(chat_id, message_id, text, token=bot_token)
+
+
+def _forget_dropped(
+    editor: RepeatEditor, report: Report, future: Union[Future, asyncio.Future]
+) -> None:
+    """Forget fingerprint of report dropped from outbox, so its repeats are sent"""
+    if future.cancelled() is True:
+        editor.remember(report, [])
+
+
+def _send_report(handler_params: Dict) -> None:
+    """Send report right away, error of send is only logged to not replace error of
+    function"""
+    try:
+        _report_telegram_handler(**handler_params)
+    except Exception:  # noqa
+        logger.exception("Send report to telegram error.")
+
+
+async def _async_send_report(handler_params: Dict) -> None:
+    """Send report right away in async code, error of send is only logged to not replace
+    error of function"""
+    try:
+        await _async_report_telegram_handler(**handler_params)
+    except Exception:  # noqa
+        logger.exception("Send report to telegram error.")
+
+
+def _submit_report(outbox: Outbox, handler_params: Dict) -> None:
+    """Put send of report to outbox. Report is sent right away if outbox is already closed
+    at shutdown, error of send is only logged to not replace error of function."""
+    editor, report = handler_params["editor"], handler_params["report"]
+    try:
+        future = outbox.submit(_report_telegram_handler, **handler_params)
+    except RuntimeError:
+        logger.warning("Outbox is closed, report is sent right away.")
+        _send_report(handler_params)
+        return
+    if editor is not None:
+        future.add_done_callback(functools.partial(_forget_dropped, editor, report))
+
+
+async def _async_report_tracked(delivered: Set[Union[int, str]], **handler_params) -> None:
+    """Send report in background, chats which got report are collected for fallback"""
+    with track_delivered(delivered):
+        await _async_report_telegram_handler(**handler_params)
+
+
+def _report_undelivered(delivered: Set[Union[int, str]], **handler_params) -> None:
+    """Fallback of cancelled background send, report is sent only to chats which didn't get
+    it"""
+    chat_id = handler_params["chat_id"]
+    chat_ids = [chat_id] if isinstance(chat_id, (int, str)) else chat_id
+    undelivered = [chat for chat in chat_ids if chat not in delivered]
+    if undelivered:
+        _report_telegram_handler(**{**handler_params, "chat_id": undelivered})
+
+
+async def _async_submit_report(async_outbox: AsyncOutbox, handler_params: Dict) -> None:
+    """Start send of report as task of async outbox. Report is sent right away if outbox is
+    already closed at shutdown, error of send is only logged to not replace error of
+    function."""
+    editor, report = handler_params["editor"], handler_params["report"]
+    delivered: Set[Union[int, str]] = set()
+    try:
+        task = await async_outbox.submit(
+            _async_report_tracked,
+            delivered,
+            fallback=functools.partial(_report_undelivered, delivered, **handler_params),
+            **handler_params,
+        )
+    except RuntimeError:
+        logger.warning("Async outbox is closed, report is sent right away.")
+        await _async_send_report(handler_params)
+        return
+    if editor is not None and task is None:
+        editor.remember(report, [])
+    elif editor is not None:
+        task.add_done_callback(functools.partial(_forget_dropped, editor, report))
+
+
+def _prewarm_telegram(bot: Telegram) -> None:
+    """Warm up client of reporter, failure is only logged"""
+    try:
+        bot.warmup()
+    except Exception:  # noqa
+        logger.exception("Prewarm of telegram client failed, check token and api url.")
+
+
 def _report_telegram_handler(
     *,
     report: Report,
-    token: str,
+    token: Union[str, List[str]],
     chat_id: Union[int, List[int]],
     api_url: Optional[str],
     filename: Optional[str],
     disable_notification: bool,
     disable_web_page_preview: bool,
+    spool: Optional[Spool] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    executor: Optional[Executor] = None,
+    editor: Optional[RepeatEditor] = None,
 ):
     """Send report.
 
     Args:
         report (Report): instance of ready to send report.
-        token (str): Telegram bot token.
+        token (str, list): Telegram bot token or tokens.
         chat_id (int, list): Chat ids for send message.
         filename (str, optional): make report for sending as a file.
         disable_notification (bool): True to disable notification of message.
         disable_web_page_preview (bool): True to disable web preview for links. Not worked for
             as_attached report.
+        spool (Spool, optional): spool for reports not delivered to some chats.
+        breaker (CircuitBreaker, optional): circuit breaker of bot. Report is not sent while
+            circuit is open, it's spooled if spool is set.
+        executor (Executor, optional): executor of client and of blocking work of report.
+        editor (RepeatEditor, optional): editor of messages, messages of sent report are
+            kept to show its repeats.
     """
-    bot = Telegram(token=token, chat_id=chat_id, api_url=api_url)
-    if report.attach is not None:
-        filename = filename or generate_filename()
-        bot.send_attach(
-            msg=report.report,
-            attach=report.attach,
+    results: List[SendResult] = []
+    unrecorded = False
+    try:
+        bot = get_telegram(token=token, chat_id=chat_id, api_url=api_url, executor=executor)
+        payload = _report_payload(
+            report=report,
             filename=filename,
             disable_notification=disable_notification,
-        )
-    else:
-        bot.send_message(
-            report.report,
-            disable_notification=disable_notification,
             disable_web_page_preview=disable_web_page_preview,
         )
+        channel = _spool_channel(token, api_url)
+        if breaker is not None and breaker.allow() is False:
+            logger.warning("Circuit of telegram is open, report is not sent.")
+            if spool is not None:
+                spool.append(channel, {**payload, "chat_id": chat_id})
+            return
+        unrecorded = breaker is not None
+        results = _send_payload(bot, payload)
+        if breaker is not None:
+            breaker.record(any(result.ok for result in results))
+            unrecorded = False
+    finally:
+        if editor is not None:
+            editor.remember(report, results)
+        if unrecorded is True:
+            breaker.record(False)
+    _spool_failed(spool=spool, channel=channel, results=results, payload=payload)
 
 
 async def _async_report_telegram_handler(
     *,
     report: Report,
-    token: str,
+    token: Union[str, List[str]],
     chat_id: Union[int, List[int]],
     api_url: Optional[str],
     filename: Optional[str],
     disable_notification: bool,
     disable_web_page_preview: bool,
+    spool: Optional[Spool] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    executor: Optional[Executor] = None,
+    editor: Optional[RepeatEditor] = None,
 ):
     """Send report.
 
     Args:
         report (Report): instance of ready to send report.
-        token (str): Telegram bot token.
+        token (str, list): Telegram bot token or tokens.
         chat_id (int, list): Chat ids for send message.
         filename (str, optional): make report for sending as a file.
         disable_notification (bool): True to disable notification of message.
         disable_web_page_preview (bool): True to disable web preview for links. Not worked for
             as_attached report.
+        spool (Spool, optional): spool for reports not delivered to some chats.
+        breaker (CircuitBreaker, optional): circuit breaker of bot. Report is not sent while
+            circuit is open, it's spooled if spool is set.
+        executor (Executor, optional): executor of client and of blocking work of report.
+        editor (RepeatEditor, optional): editor of messages, messages of sent report are
+            kept to show its repeats.
     """
-    bot = TelegramAsync(token=token, chat_id=chat_id, api_url=api_url)
-    if report.attach is not None:
-        filename = filename or generate_filename()
-        await bot.send_attach(
-            msg=report.report,
-            attach=report.attach,
-            filename=filename,
-            disable_notification=disable_notification,
+    results: List[SendResult] = []
+    unrecorded = False
+    try:
+        bot = get_telegram_async(
+            token=token, chat_id=chat_id, api_url=api_url, executor=executor
         )
-    else:
-        await bot.send_message(
-            report.report,
+        payload = await run_in_executor(
+            executor,
+            _report_payload,
+            report=report,
+            filename=filename,
             disable_notification=disable_notification,
             disable_web_page_preview=disable_web_page_preview,
         )
+        channel = _spool_channel(token, api_url)
+        if breaker is not None and breaker.allow() is False:
+            logger.warning("Circuit of telegram is open, report is not sent.")
+            if spool is not None:
+                await run_in_executor(
+                    executor, spool.append, channel, {**payload, "chat_id": chat_id}
+                )
+            return
+        unrecorded = breaker is not None
+        results = await _async_send_payload(bot, payload)
+        if breaker is not None:
+            breaker.record(any(result.ok for result in results))
+            unrecorded = False
+    finally:
+        if editor is not None:
+            editor.remember(report, results)
+        if unrecorded is True:
+            breaker.record(False)
+    if spool is not None and not all(result.ok for result in results):
+        await run_in_executor(
+            executor,
+            _spool_failed,
+            spool=spool,
+            channel=channel,
+            results=results,
+            payload=payload,
+        )
 
 
 def telegram_reporter(
     *,
-    token: str,
+    token: Union[str, List[str]],
     chat_id: Union[List[int], List[str], int, str],
     api_url: Optional[str] = None,
     service_name: Optional[str] = None,
+    spool_dir: Optional[str] = None,
+    background: bool = False,
+    outbox: Optional[Outbox] = None,
+    async_outbox: Optional[AsyncOutbox] = None,
+    dedup_window: Optional[float] = None,
+    sampler: Optional[Sampler] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+    prewarm: bool = False,
+    executor: Optional[Executor] = None,
+    edit_window: Optional[float] = None,
+    edit_interval: float = 5.0,
 ) -> Union[Callable]:
-    """Handler errors for sending report in telegram.
+    """Handler errors for sending report in telegram. Clients are created once and shared by
+    reporters with the same bot and chats, `close_clients()` or `await aclose_clients()` of
+    easy_notifyer.clients.registry close their connections at shutdown.
 
     Args:
-        token (str): Telegram bot token. Can be use from environment variable
-        To receive: https://core.telegram.org/bots#6-botfather.
+        token (str, list): Telegram bot token or tokens of several bots, reports are spread
+            across bots. To receive: https://core.telegram.org/bots#6-botfather.
         chat_id (int, str, list): Chat ids for send message.
         api_url (str): Url api for telegram.
         service_name (optional): Service name.
+        spool_dir (str, optional): directory of spool. Undelivered reports are saved to spool
+            and sent again in background, when telegram is available.
+        background (bool, optional): send reports in background, exception is re-raised
+            without waiting for telegram. Reports of sync functions are sent from outbox,
+            reports of async functions are sent by tasks of async outbox.
+        outbox (Outbox, optional): outbox for background mode. Default - outbox shared by
+            all clients.
+        async_outbox (AsyncOutbox, optional): set of tasks for background mode. Default - async
+            outbox shared by all reporters, `await get_default_async_outbox().drain()` waits
+            for sending of reports at shutdown.
+        dedup_window (float, optional): seconds of deduplication window. Reports with the same
+            fingerprint in window are counted and sent as one summary at the end of window.
+            None - every report is sent.
+        sampler (Sampler, optional): sampler of reports for high rate of errors.
+        circuit_breaker (CircuitBreaker, optional): circuit breaker of bot, reports are not
+            sent to telegram which keeps failing.
+        prewarm (bool, optional): resolve address of api, open connection and check token
+            in background when reporter is made, so the first report costs one request.
+        executor (Executor, optional): executor of clients and of blocking work of reports in
+            async code: rendering, compression and spooling. Default - bounded thread pool of
+            library, see easy_notifyer.executor.
+        edit_window (float, optional): seconds from the first report of error while its
+            message is edited to show count of repeats and time of the last one, instead of
+            sending new messages. None - every report is sent.
+        edit_interval (float, optional): min seconds between edits of one message.
     """
+    bot = get_telegram(token=token, chat_id=chat_id, api_url=api_url, executor=executor)
+    get_telegram_async(token=token, chat_id=chat_id, api_url=api_url, executor=executor)
+    if prewarm is True:
+        (outbox or get_default_outbox()).submit(_prewarm_telegram, bot)
+    if background is True and outbox is None:
+        outbox = get_default_outbox()
+    if background is True and async_outbox is None:
+        async_outbox = get_default_async_outbox()
+    spool = None
+    if spool_dir is not None:
+        spool = get_spool(spool_dir)
+        channel = _spool_channel(token, api_url)
+        spool.register(
+            channel,
+            functools.partial(
+                _replay_telegram_report,
+                token=token,
+                api_url=api_url,
+                spool=spool,
+                channel=channel,
+            ),
+        )
+
+    dedup = None
+    if dedup_window is not None:
+        dedup = Deduplicator(
+            window=dedup_window,
+            on_summary=functools.partial(
+                _send_telegram_summary, token=token, chat_id=chat_id, api_url=api_url
+            ),
+        )
+
+    editor = None
+    if edit_window is not None:
+        editor = RepeatEditor(
+            window=edit_window,
+            interval=edit_interval,
+            on_edit=functools.partial(
+                _edit_telegram_message,
+                token=token,
+                chats=chat_id,
+                api_url=api_url,
+                executor=executor,
+            ),
+        )
 
     def telegram_wrapper(
         exceptions: Optional[Union[Type[BaseException], Tuple[Type[BaseException], ...]]] = None,
@@ -139,6 +511,7 @@ def telegram_reporter(
         filename: Optional[str] = None,
         disable_notification: bool = False,
         disable_web_page_preview: bool = False,
+        traceback_limit: Optional[int] = TRACEBACK_LIMIT,
     ):
         """Handler errors for sending report in telegram.
         Args:
@@ -153,6 +526,8 @@ def telegram_reporter(
             disable_notification (bool): True to disable notification of message.
             disable_web_page_preview (bool): True to disable web preview for links.
                 Not worked for as_attached report.
+            traceback_limit (int, optional): max count of the last frames of traceback in
+                report. Traceback is formatted when report is sent. None - all frames.
         """
         if as_attached is True and disable_web_page_preview is True:
             logger.error(
@@ -170,7 +545,7 @@ def telegram_reporter(
                 try:
                     return func(*args, **kwargs)
                 except exceptions as exc:
-                    tback = traceback.format_exc()
+                    tback = capture_traceback(exc, limit=traceback_limit)
                     report = _report_maker(
                         tback=tback,
                         func_name=func_name,
@@ -179,24 +554,37 @@ def telegram_reporter(
                         service_name=service_name,
                         datetime_format=datetime_format,
                     )
-                    _report_telegram_handler(
-                        report=report,
-                        token=token,
-                        chat_id=chat_id,
-                        api_url=api_url,
-                        filename=filename,
-                        disable_notification=disable_notification,
-                        disable_web_page_preview=disable_web_page_preview,
-                    )
+                    if dedup is not None and dedup.is_repeat(report) is True:
+                        raise exc
+                    if sampler is not None and sampler.sample(report) is False:
+                        raise exc
+                    if editor is not None and editor.is_repeat(report) is True:
+                        raise exc
+                    handler_params = {
+                        "report": report,
+                        "token": token,
+                        "chat_id": chat_id,
+                        "api_url": api_url,
+                        "filename": filename,
+                        "disable_notification": disable_notification,
+                        "disable_web_page_preview": disable_web_page_preview,
+                        "spool": spool,
+                        "breaker": circuit_breaker,
+                        "executor": executor,
+                        "editor": editor,
+                    }
+                    if outbox is not None:
+                        _submit_report(outbox, handler_params)
+                    else:
+                        _send_report(handler_params)
                     raise exc
 
             async def async_wrapped_view(*args, **kwargs):
                 try:
                     return await func(*args, **kwargs)
                 except exceptions as exc:
-                    tback = traceback.format_exc()
-                    report = await run_in_threadpool(
-                        _report_maker,
+                    tback = capture_traceback(exc, limit=traceback_limit)
+                    report = _report_maker(
                         tback=tback,
                         func_name=func_name,
                         header=header,
@@ -204,15 +592,29 @@ def telegram_reporter(
                         service_name=service_name,
                         datetime_format=datetime_format,
                     )
-                    await _async_report_telegram_handler(
-                        report=report,
-                        token=token,
-                        chat_id=chat_id,
-                        api_url=api_url,
-                        filename=filename,
-                        disable_notification=disable_notification,
-                        disable_web_page_preview=disable_web_page_preview,
-                    )
+                    if dedup is not None and dedup.is_repeat(report) is True:
+                        raise exc
+                    if sampler is not None and sampler.sample(report) is False:
+                        raise exc
+                    if editor is not None and editor.is_repeat(report) is True:
+                        raise exc
+                    handler_params = {
+                        "report": report,
+                        "token": token,
+                        "chat_id": chat_id,
+                        "api_url": api_url,
+                        "filename": filename,
+                        "disable_notification": disable_notification,
+                        "disable_web_page_preview": disable_web_page_preview,
+                        "spool": spool,
+                        "breaker": circuit_breaker,
+                        "executor": executor,
+                        "editor": editor,
+                    }
+                    if async_outbox is not None:
+                        await _async_submit_report(async_outbox, handler_params)
+                    else:
+                        await _async_send_report(handler_params)
                     raise exc
 
             if asyncio.iscoroutinefunction(func):
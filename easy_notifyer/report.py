@@ -1,7 +1,96 @@
 # pylint: disable=too-few-public-methods, too-many-instance-attributes
+import hashlib
+import itertools
+import re
 from datetime import datetime
 from socket import gethostname
-from typing import Optional
+from traceback import TracebackException
+from typing import Iterator, List, Optional, Tuple, Union
+
+
+FRAME_RE = re.compile(r'^\s*File "(?P<file>.+)", line \d+, in (?P<func>.+)$')
+
+TRACEBACK_LIMIT = 100
+MAX_TRACEBACK_SIZE = 64 * 1024
+RECURSION_PERIOD = 8
+RECURSION_REPEATS = 3
+
+
+def capture_traceback(
+    exc: BaseException, *, limit: Optional[int] = TRACEBACK_LIMIT
+) -> TracebackException:
+    """
+    Capture traceback of exception without rendering it. Source lines are read and traceback
+    is formatted only when report is sent.
+    Args:
+        exc (BaseException): exception to capture.
+        limit (int, optional): max count of the last frames of every exception in chain.
+            None - all frames, zero and negative - no frames.
+    Returns:
+        TracebackException: captured traceback.
+    """
+    return TracebackException(
+        type(exc),
+        exc,
+        exc.__traceback__,
+        limit=None if limit is None else -max(0, limit),
+        lookup_lines=False,
+    )
+
+
+def _collapse_recursion(chunks: List[str]) -> List[str]:
+    """Collapse frames of recursion: the same sequence of frames repeated in a row is kept
+    a few times, the rest is replaced with count of repeats."""
+    collapsed = []
+    position = 0
+    while position < len(chunks):
+        for period in range(1, RECURSION_PERIOD + 1):
+            end = position + period
+            block = chunks[position:end]
+            repeats = 1
+            following = end + period
+            while chunks[end:following] == block:
+                repeats += 1
+                end, following = following, following + period
+            if repeats > RECURSION_REPEATS and len(block) == period:
+                collapsed.extend(block * RECURSION_REPEATS)
+                collapsed.append(
+                    "  [Previous {} frames repeated {:,} more times]\n".format(
+                        period, repeats - RECURSION_REPEATS
+                    )
+                )
+                position = end
+                break
+        else:
+            collapsed.append(chunks[position])
+            position += 1
+    return collapsed
+
+
+def _cut_traceback(tback: str, max_size: int) -> str:
+    """Cut middle of traceback longer than max size"""
+    if len(tback) <= max_size:
+        return tback
+    half = max(1, max_size // 2)
+    return "%s\n... %s characters of traceback are cut ...\n%s" % (
+        tback[:half],
+        "{:,}".format(len(tback) - 2 * half),
+        tback[-half:],
+    )
+
+
+def _exception_chain(tb_exc: TracebackException) -> Iterator[TracebackException]:
+    """Exceptions of chain from the first to the last raised, as in formatted traceback"""
+    chain = []
+    while tb_exc is not None:
+        chain.append(tb_exc)
+        if tb_exc.__cause__ is not None:
+            tb_exc = tb_exc.__cause__
+        elif tb_exc.__context__ is not None and not tb_exc.__suppress_context__:
+            tb_exc = tb_exc.__context__
+        else:
+            tb_exc = None
+    return reversed(chain)
 
 
 class Report:
@@ -9,36 +98,140 @@ class Report:
 
     def __init__(
         self,
-        tback: str,
+        tback: Union[str, TracebackException],
         func_name: Optional[str],
         header: Optional[str],
         as_attached: bool,
         service_name: Optional[str],
         datetime_format: Optional[str],
+        max_size: int = MAX_TRACEBACK_SIZE,
     ):
-        self._tback = tback
+        """Report is made with captured traceback, traceback and text of report are
+        formatted on first access, by the code which sends report.
+
+        Args:
+            tback (str, TracebackException): traceback for report.
+            max_size (int, optional): max length of traceback in report, middle of longer
+                traceback is cut.
+        """
+        self._tback = tback if isinstance(tback, str) else None
+        self._tb_exc = tback if isinstance(tback, TracebackException) else None
+        self._max_size = max_size
         self._func_name = func_name
         self._header = header
         self._host_name = gethostname()
         self._service_name = service_name
         self._as_attached = as_attached
         self._datetime_format = datetime_format
-        self.report = None
-        self.attach = None
-        if self._as_attached is True:
-            self._make_attach_report()
+        self.created = datetime.now().replace(microsecond=0)
+        self._report: Optional[str] = None
+        self._dropped = 0
+        if self._tb_exc is not None:
+            self.exception, self.fingerprint = self._make_captured_fingerprint()
         else:
-            self._make_text_report()
+            self.exception, self.fingerprint = self._make_fingerprint()
+            self._tback = _cut_traceback(self._tback, max_size)
+
+    @property
+    def tback(self) -> str:
+        """Traceback of report, formatted on first access"""
+        if self._tback is None:
+            chunks = _collapse_recursion(list(self._tb_exc.format()))
+            self._tback = _cut_traceback("".join(chunks), self._max_size)
+            self._tb_exc = None
+        return self._tback
+
+    @property
+    def report(self) -> str:
+        """Text of report, formatted on first access"""
+        if self._report is None:
+            if self._as_attached is True:
+                self._make_attach_report()
+            else:
+                self._make_text_report()
+            if self._dropped:
+                self._report = "\n".join(
+                    [self._report, "Reports dropped by sampling: {:,}".format(self._dropped)]
+                )
+        return self._report
+
+    @property
+    def attach(self) -> Optional[str]:
+        """Traceback for sending as a file, if report is made as attached"""
+        if self._as_attached is True:
+            return self.tback
+        return None
+
+    @property
+    def func_name(self) -> Optional[str]:
+        """Name of function when raised error"""
+        return self._func_name
+
+    def _make_fingerprint(self):
+        """Get line of exception and fingerprint of traceback: hash of exception type and
+        files and functions of frames. Line numbers and message of exception are ignored, so
+        the same error raised with different values has the same fingerprint."""
+        lines = self._tback.splitlines()
+        frames = []
+        last_frame = -1
+        for number, line in enumerate(lines):
+            match = FRAME_RE.match(line)
+            if match is not None:
+                frames.append("%s:%s" % match.group("file", "func"))
+                last_frame = number
+        after_frames = itertools.islice(lines, last_frame + 1, None)
+        exception = next((line for line in after_frames if line and not line[0].isspace()), "")
+        digest = hashlib.sha256(exception.split(":", 1)[0].encode("utf-8"))
+        digest.update("\n".join(frames).encode("utf-8"))
+        return exception, digest.hexdigest()[:16]
+
+    def _make_captured_fingerprint(self) -> Tuple[str, str]:
+        """Get line of exception and fingerprint of captured traceback, the same as of
+        formatted traceback, without formatting of frames."""
+        frames = []
+        for tb_exc in _exception_chain(self._tb_exc):
+            frames.extend("%s:%s" % (frame.filename, frame.name) for frame in tb_exc.stack)
+        lines = "".join(self._tb_exc.format_exception_only()).splitlines()
+        exception = next((line for line in lines if line and not line[0].isspace()), "")
+        digest = hashlib.sha256(exception.split(":", 1)[0].encode("utf-8"))
+        digest.update("\n".join(frames).encode("utf-8"))
+        return exception, digest.hexdigest()[:16]
+
+    def add_dropped(self, dropped: int):
+        """Add count of reports which were dropped before this report by sampling."""
+        self._dropped += dropped
+        self._report = None
+
+    def make_summary(self, repeats: int, period: float) -> str:
+        """Formatting summary of repeats of report.
+
+        Args:
+            repeats (int): count of reports with the same fingerprint which were not sent.
+            period (float): seconds of counting repeats.
+        """
+        report = [
+            "Your program has crashed ☠️",
+            "Machine name: %s" % self._host_name,
+            "Same error x{:,} in last {:g}s".format(repeats, round(period)),
+            self.exception,
+        ]
+        if self._header is not None:
+            report[0] = "%s" % self._header
+        if self._service_name is not None:
+            report.insert(1, "Service: %s" % self._service_name)
+        if self._func_name is not None:
+            report.insert(3, "Main call: %s" % self._func_name)
+        return "\n".join(report)
 
     def _make_text_report(self):
         """Formatting text report before sending."""
-        crash_time = datetime.now().replace(microsecond=0)
+        crash_time = self.created
         report = [
             "Your program has crashed ☠️",
             "Machine name: %s" % self._host_name,
             "Crash date: %s" % crash_time.strftime(self._datetime_format),
             "Traceback:",
-            "%s" % self._tback,
+            "%s" % self.tback,
         ]
         if self._header is not None:
             report[0] = "%s" % self._header
@@ -46,11 +239,11 @@ class Report:
             report.insert(1, "Service: %s" % self._service_name)
         if self._func_name is not None:
             report.insert(3, "Main call: %s" % self._func_name)
-        self.report = "\n".join(report)
+        self._report = "\n".join(report)
 
     def _make_attach_report(self):
         """Formatting report with attach before sending."""
-        crash_time = datetime.now().replace(microsecond=0)
+        crash_time = self.created
         report = [
             "Your program has crashed ☠️",
             "Machine name: %s" % self._host_name,
@@ -62,5 +255,4 @@ class Report:
             report.insert(1, "Service: %s" % self._service_name)
         if self._func_name is not None:
             report.insert(2, "Main call: %s" % self._func_name)
-        self.report = "\n".join(report)
-        self.attach = self._tback
+        self._report = "\n".join(report)
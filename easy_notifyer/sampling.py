@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+from easy_notifyer.report import Report
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Sampler:
+    """Adaptive sampling of reports. Rate of reports is counted in sliding window, while it's
+    above threshold only first reports are sent and then one of every few. Count of dropped
+    reports is added to the next sent report."""
+
+    def __init__(
+        self,
+        *,
+        window: float = 60.0,
+        threshold: int = 20,
+        first: int = 5,
+        every: int = 10,
+        resolution: int = 60,
+    ):
+        """
+        Args:
+            window (float, optional): seconds of sliding window of rate.
+            threshold (int, optional): count of reports in window to start sampling.
+            first (int, optional): count of reports sent after start of sampling.
+            every (int, optional): one of every reports is sent after the first ones.
+            resolution (int, optional): count of buckets of window, memory of sampler is
+                bounded by it.
+        """
+        self.window = window
+        self.threshold = threshold
+        self.first = first
+        self.every = max(1, every)
+        self._bucket_size = window / max(1, resolution)
+        self._buckets: Deque[List] = deque()
+        self._count = 0
+        self._sampled = 0
+        self._dropped = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def _add(self, now: float) -> int:
+        """Count report in window, under lock.
+
+        Returns:
+            int: count of reports in window.
+        """
+        bucket = int(now / self._bucket_size)
+        oldest = bucket - int(self.window / self._bucket_size)
+        while self._buckets and self._buckets[0][0] <= oldest:
+            self._count -= self._buckets.popleft()[1]
+        if self._buckets and self._buckets[-1][0] == bucket:
+            self._buckets[-1][1] += 1
+        else:
+            self._buckets.append([bucket, 1])
+        self._count += 1
+        return self._count
+
+    def sample(self, report: Report) -> bool:
+        """Count report and decide to send it. Count of reports dropped before is added to
+        report which is sent.
+
+        Returns:
+            bool: True if report must be sent.
+        """
+        with self._lock:
+            if self._add(time.monotonic()) <= self.threshold:
+                self._sampled = 0
+            else:
+                self._sampled += 1
+                after_first = self._sampled - self.first
+                if after_first > 0 and after_first % self.every != 0:
+                    self._dropped += 1
+                    self.dropped += 1
+                    return False
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            report.add_dropped(dropped)
+        return True
+
+
+class CircuitBreaker:
+    """Circuit breaker of channel. After several failed sends in a row channel is not called
+    until reset timeout, then one trial send is allowed to check that channel is available."""
+
+    def __init__(self, *, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        """
+        Args:
+            failure_threshold (int, optional): count of failed sends in a row to open circuit.
+            reset_timeout (float, optional): seconds of open circuit before trial send.
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._trial_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """State of circuit: "closed", "open" or "half_open" """
+        with self._lock:
+            if self._opened_at is None:
+                return CLOSED
+            if self._trial is True or time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return OPEN
+
+    def allow(self) -> bool:
+        """Check that channel can be called. The first call after reset timeout is trial,
+        other calls are not allowed until result of trial is recorded. Trial without result
+        for reset timeout is lost, the next call is a new trial."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if self._trial is True and now - self._trial_at < self.reset_timeout:
+                return False
+            if now - self._opened_at >= self.reset_timeout:
+                self._trial = True
+                self._trial_at = now
+                return True
+            return False
+
+    def record(self, success: bool) -> None:
+        """Record result of send to channel.
+
+        Args:
+            success (bool): True if send was successful.
+        """
+        with self._lock:
+            if success is True:
+                self._failures = 0
+                self._opened_at = None
+            else:
+                self._failures += 1
+                if self._trial is True or self._failures >= self.failure_threshold:
+                    self._opened_at = time.monotonic()
+            self._trial = False
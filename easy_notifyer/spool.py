@@ -0,0 +1,347 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+LOG_FILENAME = "spool.log"
+OFFSET_FILENAME = "spool.offset"
+LOCK_FILENAME = "spool.lock"
+REPLAY_LOCK_FILENAME = "replay.lock"
+DEAD_FILENAME = "spool.dead"
+
+Sender = Callable[[Dict], bool]
+
+
+class Spool:
+    """Durable outbox of undelivered notifications: append-only log in directory with offset of
+    delivered records. Offset is saved with inode of log, so crash during compaction doesn't
+    skip records. Several processes can write the same spool, appends are serialized with
+    compaction by file locks and only one process replays at a time."""
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        max_bytes: int = 50 * 1024 * 1024,
+        fsync_interval: float = 1.0,
+        fsync_batch: int = 32,
+        replay_interval: float = 30.0,
+        compact_bytes: int = 1024 * 1024,
+        max_attempts: int = 20,
+        max_failures: int = 3,
+    ):
+        """
+        Args:
+            directory (str): directory of spool, created if not exists.
+            max_bytes (int, optional): max size of log, new records are dropped if it's full.
+            fsync_interval (float, optional): max seconds between append and fsync.
+            fsync_batch (int, optional): count of appends which is fsynced at once.
+            replay_interval (float, optional): seconds between attempts of replay.
+            compact_bytes (int, optional): size of delivered part of log to compact it.
+            max_attempts (int, optional): count of failed replays of notification to move it
+                to dead letter file.
+            max_failures (int, optional): count of failed sends in a row to stop replay,
+                server is likely unavailable.
+        """
+        self.directory = directory
+        self._max_bytes = max_bytes
+        self._fsync_interval = fsync_interval
+        self._fsync_batch = fsync_batch
+        self._replay_interval = replay_interval
+        self._compact_bytes = compact_bytes
+        self._max_attempts = max(1, max_attempts)
+        self._max_failures = max(1, max_failures)
+        self._log_path = os.path.join(directory, LOG_FILENAME)
+        self._offset_path = os.path.join(directory, OFFSET_FILENAME)
+
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._unsynced = 0
+        self._senders: Dict[str, Sender] = {}
+        self._stop = threading.Event()
+        self._replayer: Optional[threading.Thread] = None
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    @contextmanager
+    def _file_lock(self, filename: str, exclusive: bool, blocking: bool = True) -> Iterator[bool]:
+        """Lock file of spool between processes. Yield False if lock was not acquired in
+        non-blocking mode. Without fcntl (windows) only threads of one process are locked."""
+        if fcntl is None:
+            yield True
+            return
+        fd = os.open(os.path.join(self.directory, filename), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            try:
+                fcntl.flock(fd, operation if blocking else operation | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        finally:
+            os.close(fd)
+
+    def _open_log(self) -> int:
+        """Get descriptor of log, log is reopened if it was replaced by compaction"""
+        if self._fd is not None:
+            try:
+                if os.fstat(self._fd).st_ino == os.stat(self._log_path).st_ino:
+                    return self._fd
+            except FileNotFoundError:
+                pass
+            self._close_log()
+        self._fd = os.open(self._log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        return self._fd
+
+    def _close_log(self) -> None:
+        if self._fd is not None:
+            if self._unsynced:
+                os.fsync(self._fd)
+                self._unsynced = 0
+            os.close(self._fd)
+            self._fd = None
+
+    def _log_inode(self) -> Optional[int]:
+        try:
+            return os.stat(self._log_path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _read_offset(self) -> int:
+        """Read offset of delivered records. Offset is saved with inode of log, it's reset if
+        log was replaced by compaction which was interrupted before offset was saved."""
+        try:
+            with open(self._offset_path, "r") as file:
+                offset, _, inode = file.read().strip().partition(" ")
+                offset = int(offset or 0)
+                if inode and int(inode) != self._log_inode():
+                    return 0
+                return offset
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_offset(self, offset: int) -> None:
+        tmp_path = f"{self._offset_path}.tmp"
+        inode = self._log_inode()
+        with open(tmp_path, "w") as file:
+            file.write(str(offset) if inode is None else f"{offset} {inode}")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self._offset_path)
+
+    def append(self, channel: str, payload: Dict) -> bool:
+        """Add notification to spool.
+
+        Args:
+            channel (str): name of channel, sender of channel is used for replay.
+            payload (dict): json-serializable notification.
+
+        Returns:
+            bool: False if spool is full and notification was dropped.
+        """
+        return self._write({"channel": channel, "created": time.time(), "payload": payload})
+
+    def _write(self, record: Dict) -> bool:
+        """Append record to log, False if spool is full"""
+        data = (json.dumps(record) + "\n").encode("utf-8")
+        with self._lock, self._file_lock(LOCK_FILENAME, exclusive=False):
+            fd = self._open_log()
+            if os.fstat(fd).st_size - self._read_offset() + len(data) > self._max_bytes:
+                logger.error("Spool %s is full, notification is dropped.", self.directory)
+                return False
+            os.write(fd, data)
+            self._unsynced += 1
+            if self._unsynced >= self._fsync_batch:
+                os.fsync(fd)
+                self._unsynced = 0
+        return True
+
+    def flush(self) -> None:
+        """Fsync appended records"""
+        with self._lock:
+            if self._fd is not None and self._unsynced:
+                os.fsync(self._fd)
+                self._unsynced = 0
+
+    def _read_records(self, offset: int) -> Iterator[Tuple[int, Optional[Dict]]]:
+        """Read complete records from offset to current end of log. Yield offset after record
+        and record, None for corrupted record."""
+        try:
+            file = open(self._log_path, "rb")
+        except FileNotFoundError:
+            return
+        with file:
+            end = os.fstat(file.fileno()).st_size
+            file.seek(offset)
+            for line in file:
+                if not line.endswith(b"\n") or offset + len(line) > end:
+                    return
+                offset += len(line)
+                try:
+                    yield offset, json.loads(line.decode("utf-8"))
+                except ValueError:
+                    yield offset, None
+
+    def replay(self) -> int:
+        """Send spooled notifications by senders of channels. Failed notification is moved to
+        the end of log, so it doesn't block others, and after max_attempts to dead letter
+        file. Replay stops after max_failures failed sends in a row. Notifications of
+        channels without sender in this process are moved to the end of log.
+
+        Returns:
+            int: count of delivered notifications.
+        """
+        delivered = 0
+        failures = 0
+        with self._file_lock(REPLAY_LOCK_FILENAME, exclusive=True, blocking=False) as locked:
+            if locked is False:
+                return delivered
+            offset = self._read_offset()
+            try:
+                for next_offset, record in self._read_records(offset):
+                    if record is not None:
+                        sender = self._senders.get(record.get("channel"))
+                        if sender is None:
+                            self._write(record)
+                        elif self._send(sender, record) is True:
+                            delivered += 1
+                            failures = 0
+                        else:
+                            self._retry_later(record)
+                            failures += 1
+                    offset = next_offset
+                    if failures >= self._max_failures:
+                        break
+            finally:
+                self._write_offset(offset)
+            if offset >= self._compact_bytes:
+                self._compact()
+        return delivered
+
+    @staticmethod
+    def _send(sender: Sender, record: Dict) -> bool:
+        try:
+            return bool(sender(record["payload"]))
+        except Exception:  # noqa
+            logger.exception("Replay of spooled notification failed.")
+            return False
+
+    def _retry_later(self, record: Dict) -> None:
+        """Move failed record to the end of log or to dead letter file after max attempts"""
+        attempts = record.get("attempts", 0) + 1
+        if attempts < self._max_attempts:
+            self._write({**record, "attempts": attempts})
+            return
+        logger.error(
+            "Spooled notification of channel %s failed %s times, it's moved to %s.",
+            record.get("channel"),
+            attempts,
+            DEAD_FILENAME,
+        )
+        data = (json.dumps({**record, "attempts": attempts}) + "\n").encode("utf-8")
+        with self._lock:
+            fd = os.open(
+                os.path.join(self.directory, DEAD_FILENAME),
+                os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                0o600,
+            )
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+    def compact(self) -> None:
+        """Remove delivered records from log"""
+        with self._file_lock(REPLAY_LOCK_FILENAME, exclusive=True):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite log without delivered records, under lock of replay"""
+        with self._lock, self._file_lock(LOCK_FILENAME, exclusive=True):
+            offset = self._read_offset()
+            if offset == 0:
+                return
+            self._close_log()
+            tmp_path = f"{self._log_path}.tmp"
+            with open(self._log_path, "rb") as src, open(tmp_path, "wb") as dst:
+                src.seek(offset)
+                while True:
+                    chunk = src.read(64 * 1024)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp_path, self._log_path)
+            self._write_offset(0)
+
+    def register(self, channel: str, sender: Sender) -> None:
+        """Set sender of channel and start replayer thread.
+
+        Args:
+            channel (str): name of channel.
+            sender (callable): function sending payload of notification, returns True if
+                notification is delivered.
+        """
+        self._senders[channel] = sender
+        with self._lock:
+            if self._replayer is None:
+                self._replayer = threading.Thread(
+                    target=self._run_replayer,
+                    name=f"easy_notifyer-spool-{self.directory}",
+                    daemon=True,
+                )
+                self._replayer.start()
+
+    def _run_replayer(self) -> None:
+        """Fsync appends every fsync_interval and replay spool every replay_interval"""
+        next_replay = time.monotonic()
+        while not self._stop.wait(self._fsync_interval):
+            self.flush()
+            if time.monotonic() < next_replay:
+                continue
+            try:
+                self.replay()
+            except OSError:
+                logger.exception("Replay of spool %s failed.", self.directory)
+            next_replay = time.monotonic() + self._replay_interval
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop replayer and fsync appended records.
+
+        Args:
+            timeout (float, optional): seconds to wait for replay in progress.
+        """
+        self._stop.set()
+        if self._replayer is not None:
+            self._replayer.join(timeout)
+        with self._lock:
+            self._close_log()
+
+
+_spools: Dict[str, Spool] = {}
+_spools_lock = threading.Lock()
+
+
+def get_spool(directory: str) -> Spool:
+    """Get spool of directory shared by all reporters of process"""
+    directory = os.path.abspath(directory)
+    with _spools_lock:
+        spool = _spools.get(directory)
+        if spool is None:
+            spool = _spools[directory] = Spool(directory)
+            atexit.register(spool.close, timeout=1.0)
+        return spool
@@ -1,9 +1,18 @@
 import asyncio
 import functools
+import gzip
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Executor
 from datetime import datetime
-from typing import Any, Callable, Dict, Optional
+from io import BytesIO
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Tuple, Union
 from uuid import uuid4
 
+from easy_notifyer.executor import BoundedExecutor, get_default_executor
+
 
 try:
     import contextvars  # noqa 401
@@ -12,10 +21,17 @@ except ImportError:
 
 
 FILENAME_DT_FORMAT = "%Y-%m-%d %H_%M_%S"
+CHUNK_SIZE = 64 * 1024
+
+GZIP = "gzip"
+ZIP = "zip"
+COMPRESSIONS = (GZIP, ZIP)
+COMPRESS_THRESHOLD = 64 * 1024
 
 
 class MultiPartForm:
-    """Creating body of request"""
+    """Creating body of request. Body can be encoded at once or streamed by chunks, files are
+    never read to memory at whole in streaming mode."""
 
     def __init__(self, body: Optional[Dict] = None, files: Optional[Dict] = None):
         self._body = body
@@ -25,6 +41,9 @@ class MultiPartForm:
     def __bytes__(self):
         return self.encode()
 
+    def __iter__(self) -> Iterator[Union[bytes, memoryview]]:
+        return self.iter_encode()
+
     @staticmethod
     def _form_data(name: str) -> str:
         """Get formdata for input in body"""
@@ -40,33 +59,176 @@ class MultiPartForm:
         """Get a header request"""
         return {"Content-type": f"multipart/form-data; boundary={self.boundary}"}
 
-    def encode(self) -> bytes:
-        """Create a body request."""
-        body = []
-        boundary = b"--" + self.boundary.encode("utf-8")
+    @property
+    def _boundary(self) -> bytes:
+        return b"--" + self.boundary.encode("utf-8")
+
+    def _parts(self) -> Iterator[Tuple[bytes, Union[bytes, BinaryIO]]]:
+        """Get parts of body: headers of part and data as bytes or binary file"""
         if self._body is not None and isinstance(self._body, dict):
             for name, value in self._body.items():
-                body.append(boundary)
-                body.append(self._form_data(name).encode("utf-8"))
-                body.append(b"")
-                body.append(str(value).encode("utf-8"))
+                disposition = self._form_data(name).encode("utf-8")
+                head = b"\r\n".join([self._boundary, disposition, b"", b""])
+                yield head, str(value).encode("utf-8")
 
         if self._files is not None and isinstance(self._files, dict):
             for fieldname in self._files:
                 if len(self._files[fieldname]) != 2:
                     continue
                 filename, data = self._files[fieldname]
-                body.append(boundary)
-                body.append(self._attached_file(fieldname, filename).encode("utf-8"))
-                body.append(b"")
+                disposition = self._attached_file(fieldname, filename).encode("utf-8")
+                head = b"\r\n".join([self._boundary, disposition, b"", b""])
                 if hasattr(data, "read") is True:
-                    data.seek(0)
-                    body.append(data.read())
+                    yield head, data
                 elif hasattr(data, "encode") is True:
-                    body.append(data.encode("utf-8"))
+                    yield head, data.encode("utf-8")
+                else:
+                    yield head, bytes(data or b"")
+
+    @staticmethod
+    def _size(data: Union[bytes, BinaryIO]) -> int:
+        """Get size of data, files are measured from the beginning"""
+        if isinstance(data, bytes):
+            return len(data)
+        if isinstance(data, BytesIO):
+            return data.getbuffer().nbytes
+        position = data.tell()
+        size = data.seek(0, os.SEEK_END)
+        data.seek(position)
+        return size
+
+    @property
+    def content_length(self) -> int:
+        """Get size of encoded body without encoding it"""
+        size = len(self._boundary) + 2
+        for head, data in self._parts():
+            size += len(head) + self._size(data) + 2
+        return size
+
+    def iter_encode(self, chunk_size: int = CHUNK_SIZE) -> Iterator[Union[bytes, memoryview]]:
+        """Create a body request by chunks. Files are read by chunks of chunk_size, in-memory
+        data is sliced without copying.
+
+        Args:
+            chunk_size (int, optional): max size of chunk with data of file.
+        """
+        for head, data in self._parts():
+            yield head
+            if isinstance(data, BytesIO):
+                with data.getbuffer() as view:
+                    for start in range(0, view.nbytes, chunk_size):
+                        yield view[start:][:chunk_size]
+            elif hasattr(data, "read") is True:
+                data.seek(0)
+                yield from iter(functools.partial(data.read, chunk_size), b"")
+            else:
+                view = memoryview(data)
+                for start in range(0, view.nbytes, chunk_size):
+                    yield view[start:][:chunk_size]
+            yield b"\r\n"
+        yield self._boundary + b"--"
+
+    def encode(self) -> bytes:
+        """Create a body request."""
+        return b"".join(self.iter_encode())
+
+
+class LRUCache:
+    """Thread-safe mapping of limited size, least recently used items are evicted first"""
+
+    def __init__(self, maxsize: int = 128):
+        """
+        Args:
+            maxsize (int, optional): max count of items.
+        """
+        self._maxsize = maxsize
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._data
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Get item and mark it as recently used"""
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Any, value: Any) -> None:
+        """Set item, least recently used item is evicted if cache is full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        """Remove item and return it"""
+        with self._lock:
+            return self._data.pop(key, default)
 
-        body.append(boundary + b"--")
-        return b"\r\n".join(body)
+
+def check_compression(compression: Optional[str]) -> None:
+    """Check that compression of attachments is known"""
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"compression must be one of {COMPRESSIONS}, got {compression!r}")
+
+
+def _attach_size(data: Union[bytes, BinaryIO]) -> Optional[int]:
+    """Size of attach from current position. None if size of file is unknown."""
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    if isinstance(data, BytesIO):
+        return data.getbuffer().nbytes - data.tell()
+    try:
+        position = data.tell()
+        size = data.seek(0, os.SEEK_END)
+        data.seek(position)
+    except (AttributeError, OSError, ValueError):
+        return None
+    return size - position
+
+
+def compress_attach(
+    filename: str,
+    data: Union[bytes, BinaryIO],
+    *,
+    compression: str,
+    threshold: int = COMPRESS_THRESHOLD,
+) -> Tuple[str, Union[bytes, BinaryIO]]:
+    """
+    Compress attach by gzip or zip, if it's not smaller than threshold. Archive is the same
+    for the same content, without time of compression.
+    Args:
+        filename (str): filename of attach.
+        data (bytes, binaryio): content of attach.
+        compression (str): "gzip" or "zip".
+        threshold (int, optional): min size of attach in bytes to compress.
+    Returns:
+        tuple: filename with .gz/.zip suffix and compressed bytes, or attach as is.
+    """
+    size = _attach_size(data)
+    if size is None or size < threshold:
+        return filename, data
+    if not isinstance(data, (bytes, bytearray)):
+        data = data.read()
+    buffer = BytesIO()
+    if compression == GZIP:
+        with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as archive:
+            archive.write(data)
+        return f"{filename}.gz", buffer.getvalue()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            zipfile.ZipInfo(filename, date_time=(1980, 1, 1, 0, 0, 0)),
+            data,
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+    return f"{filename}.zip", buffer.getvalue()
 
 
 def generate_filename(date_fmt: Optional[str] = None) -> str:
@@ -81,17 +243,20 @@ def generate_filename(date_fmt: Optional[str] = None) -> str:
     return f"{datetime.now().replace(microsecond=0).strftime(date_fmt)}.txt"
 
 
-async def run_in_threadpool(func: Callable, *args: Any, **kwargs: Any) -> Any:
+async def run_in_executor(
+    executor: Optional[Executor], func: Callable, *args: Any, **kwargs: Any
+) -> Any:
     """
-    Run sync func in async code in thread pool.
+    Run sync func in async code in executor.
     Args:
+        executor(Executor, optional): executor to run func. None - executor of library.
         func(callable): func to run
         *args:
         **kwargs:
     Returns:
         same as func
     """
-    loop = asyncio.get_event_loop()
+    executor = executor or get_default_executor()
     if contextvars is not None:
         child = functools.partial(func, *args, **kwargs)
         context = contextvars.copy_context()
@@ -99,4 +264,20 @@ async def run_in_threadpool(func: Callable, *args: Any, **kwargs: Any) -> Any:
         args = (child,)
     elif kwargs:
         func = functools.partial(func, **kwargs)
-    return await loop.run_in_executor(None, func, *args)
+    if isinstance(executor, BoundedExecutor):
+        return await executor.run(func, *args)
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+
+async def run_in_threadpool(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Run sync func in async code in thread pool of library.
+    Args:
+        func(callable): func to run
+        *args:
+        **kwargs:
+    Returns:
+        same as func
+    """
+    return await run_in_executor(None, func, *args, **kwargs)
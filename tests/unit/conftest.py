@@ -1,13 +1,154 @@
+import base64
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 
+from easy_notifyer.clients.pool import AsyncConnectionPool, ConnectionPool
+from easy_notifyer.clients.ratelimit import AsyncRateLimiter, RateLimiter, RateLimitPolicy
 from easy_notifyer.clients.requests import AsyncRequests, Requests
+from easy_notifyer.clients.telegram import Telegram, TelegramAsync
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # noqa
+        length = int(self.headers.get("Content-Length", 0))
+        data = self.rfile.read(length)
+        self.server.requests.append((self.path, dict(self.headers), data))
+        content = b'{"ok": true, "result": {"message_id": 1}}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):  # noqa
+        pass
+
+
+@pytest.fixture(scope="function")
+def http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal smtp server: EHLO, AUTH PLAIN/LOGIN, MAIL/RCPT/DATA, NOOP, RSET, QUIT"""
+
+    def reply(self, *lines: str):
+        for line in lines[:-1]:
+            self.wfile.write(f"{line[:3]}-{line[4:]}\r\n".encode())
+        self.wfile.write(f"{lines[-1]}\r\n".encode())
+
+    def handle(self):
+        self.server.sessions += 1
+        self.reply("220 localhost ESMTP")
+        mail_from, rcpts = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().rstrip("\r\n")
+            self.server.commands.append(command)
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 localhost", *self.server.extensions)
+            elif verb == "AUTH":
+                mechanism, _, initial = command[5:].partition(" ")
+                if mechanism.upper() == "LOGIN":
+                    self.reply("334 VXNlcm5hbWU6")
+                    user = base64.b64decode(self.rfile.readline().strip()).decode()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    password = base64.b64decode(self.rfile.readline().strip()).decode()
+                else:
+                    _, user, password = base64.b64decode(initial).decode().split("\0")
+                self.server.logins.append((user, password))
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == "MAIL":
+                mail_from, rcpts = command[10:].strip("<>"), []
+                self.reply(self.server.mail_reply)
+            elif verb == "RCPT":
+                rcpts.append(command[8:].strip("<>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b".\r\n", b""):
+                        break
+                    data.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                self.server.messages.append((mail_from, rcpts, b"".join(data)))
+                self.reply("250 OK")
+            elif verb in ("NOOP", "RSET"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+@pytest.fixture(scope="function")
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPHandler)
+    server.daemon_threads = True
+    server.sessions = 0
+    server.commands = []
+    server.logins = []
+    server.messages = []
+    server.extensions = ["250 AUTH PLAIN LOGIN"]
+    server.mail_reply = "250 OK"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
 
 
 @pytest.fixture(scope="function")
 def client():
-    return Requests()
+    return Requests(pool=ConnectionPool())
 
 
 @pytest.fixture(scope="function")
 def async_client():
-    return AsyncRequests()
+    return AsyncRequests(pool=AsyncConnectionPool())
+
+
+@pytest.fixture(scope="function")
+def no_rate_limit():
+    return RateLimitPolicy(
+        global_rate=1000,
+        global_burst=1000,
+        chat_rate=1000,
+        chat_burst=1000,
+        group_rate=1000,
+        group_burst=1000,
+    )
+
+
+@pytest.fixture(scope="function")
+def telegram(no_rate_limit: RateLimitPolicy):
+    return Telegram(
+        token="123:token",
+        chat_id=[1, 2, 3],
+        rate_limiter=RateLimiter(no_rate_limit),
+    )
+
+
+@pytest.fixture(scope="function")
+def telegram_async(no_rate_limit: RateLimitPolicy):
+    return TelegramAsync(
+        token="123:token",
+        chat_id=[1, 2, 3],
+        rate_limiter=AsyncRateLimiter(no_rate_limit),
+    )
@@ -1,14 +1,17 @@
+import asyncio
+import socket
+from io import BytesIO
 from typing import Dict
 
 import pytest
 from pytest_mock import MockerFixture
 
-from easy_notifyer import requests
-from easy_notifyer.requests import Requests as Requests
+from easy_notifyer.clients.dns import DNSCache
+from easy_notifyer.clients.pool import ConnectionPool
+from easy_notifyer.clients.requests import AsyncRequests, Requests
 
 
 pytestmark = [
-    pytest.mark.asyncio,
     pytest.mark.unit,
 ]
 
@@ -30,26 +33,136 @@ def test_add_params(
     params: Dict,
     result: str,
 ):
-    mocker.patch.object(client, "_client")
-    mocker.patch.object(requests, "request")
-    mocker.patch.object(requests, "HTTPResponse")
+    mocker.patch.object(client, "_urlopen")
     client.post(
         url=url,
         params=params,
     )
-    client._client.assert_called_once_with(
+    client._urlopen.assert_called_once_with(
+        method="POST",
         url=result,
         headers={},
         data=None,
+        timeout=None,
     )
 
 
 class TestRequests:
-    pass
+    def test_keep_alive(self, client: Requests, http_server, mocker: MockerFixture):
+        url = "http://127.0.0.1:%s/bot/sendMessage" % http_server.server_port
+        new_connection = mocker.spy(client._pool, "_new_connection")
+
+        for _ in range(3):
+            resp = client.post(url=url, body={"text": "hello"})
+            assert resp.status == 200
+            assert resp.json()["ok"] is True
+
+        assert new_connection.call_count == 1
+        assert len(http_server.requests) == 3
+
+    def test_reconnect_after_server_close(self, client: Requests, http_server):
+        url = "http://127.0.0.1:%s/bot/sendMessage" % http_server.server_port
+        client.post(url=url, body={"text": "hello"})
+        key = ("http", "127.0.0.1", http_server.server_port)
+        conn, _ = client._pool._idle[key][0]
+        conn.sock.close()
+
+        resp = client.post(url=url, body={"text": "hello"})
+        assert resp.status == 200
+
+    def test_stream_files(self, client: Requests, http_server):
+        url = "http://127.0.0.1:%s/bot/sendDocument" % http_server.server_port
+        document = BytesIO(b"traceback" * 100000)
+
+        client.post(url=url, body={"chat_id": 1}, files={"document": ("report.txt", document)})
+
+        _, headers, data = http_server.requests[0]
+        assert int(headers["Content-Length"]) == len(data)
+        assert b"traceback" * 100000 in data
 
 
 class TestAsyncRequests:
-    pass
+    @pytest.mark.asyncio
+    async def test_keep_alive(self, async_client: AsyncRequests, http_server):
+        url = "http://127.0.0.1:%s/bot/sendMessage" % http_server.server_port
+
+        for _ in range(3):
+            resp = await async_client.post(url=url, params={"a": "b"}, body={"text": "hello"})
+            assert resp.status == 200
+            assert resp.json()["ok"] is True
+
+        key = ("http", "127.0.0.1", http_server.server_port)
+        assert len(async_client._pool._idle[key]) == 1
+        assert [path for path, _, _ in http_server.requests] == ["/bot/sendMessage?a=b"] * 3
+        assert b"hello" in http_server.requests[0][2]
+
+    @pytest.mark.asyncio
+    async def test_stream_files(self, async_client: AsyncRequests, http_server):
+        url = "http://127.0.0.1:%s/bot/sendDocument" % http_server.server_port
+        document = BytesIO(b"traceback" * 100000)
+
+        await async_client.post(url=url, files={"document": ("report.txt", document)})
+
+        _, headers, data = http_server.requests[0]
+        assert int(headers["Content-Length"]) == len(data)
+        assert b"traceback" * 100000 in data
+
+    @pytest.mark.asyncio
+    async def test_timeout_closes_connection(self, async_client: AsyncRequests):
+        connections = []
+
+        async def silent(reader, writer):
+            connections.append(writer)
+
+        server = await asyncio.start_server(silent, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        with pytest.raises(asyncio.TimeoutError):
+            await async_client.post(url="http://127.0.0.1:%s/" % port, timeout=0.1)
+        server.close()
+
+        assert len(connections) == 1
+        assert async_client._pool._idle == {}
+
+
+class TestDNSCache:
+    def test_resolve_once(self, http_server, mocker: MockerFixture):
+        getaddrinfo = mocker.spy(socket, "getaddrinfo")
+        pool = ConnectionPool(dns_cache=DNSCache())
+        client = Requests(pool=pool)
+        url = "http://localhost:%s/bot/getMe" % http_server.server_port
+
+        for _ in range(2):
+            assert client.post(url=url).status == 200
+            pool.close()
+
+        assert [call.args[0] for call in getaddrinfo.call_args_list].count("localhost") == 1
+
+    def test_evict_failed(self, mocker: MockerFixture):
+        dns_cache = DNSCache(ttl=60)
+        mocker.patch.object(
+            socket, "getaddrinfo", return_value=[(socket.AF_INET, 1, 6, "", ("127.0.0.1", 1))]
+        )
+        with pytest.raises(OSError):
+            dns_cache.create_connection(("closed.test", 1), 1)
+        assert dns_cache._get("closed.test", 1) is None
+
+    def test_full_ipv6_address(self, mocker: MockerFixture):
+        sockaddr = ("fe80::1", 443, 0, 3)
+        mocker.patch.object(
+            socket, "getaddrinfo", return_value=[(socket.AF_INET6, 1, 6, "", sockaddr)]
+        )
+        sock = mocker.patch.object(socket, "socket").return_value
+
+        assert DNSCache().create_connection(("link.test", 443), 1) is sock
+        sock.connect.assert_called_once_with(sockaddr)
+
+    @pytest.mark.asyncio
+    async def test_async_resolve_once(self, http_server):
+        dns_cache = DNSCache()
+        for _ in range(2):
+            _, writer = await dns_cache.open_connection("localhost", http_server.server_port)
+            writer.close()
+        assert dns_cache._get("localhost", http_server.server_port)
 
 
 class TestResponse:
@@ -0,0 +1,70 @@
+import time
+import traceback
+
+import pytest
+
+from easy_notifyer.dedup import Deduplicator
+from easy_notifyer.report import Report
+
+
+pytestmark = [
+    pytest.mark.unit,
+]
+
+
+def make_report(value: int) -> Report:
+    try:
+        if value % 2:
+            raise ValueError(f"request {value}")
+        raise KeyError(value)
+    except Exception:  # noqa
+        tback = traceback.format_exc()
+    return Report(tback, "handler", None, False, None, "%Y-%m-%d %H:%M:%S")
+
+
+class TestFingerprint:
+    def test_same_error(self):
+        first, second, other = make_report(1), make_report(3), make_report(2)
+        assert first.fingerprint == second.fingerprint
+        assert first.fingerprint != other.fingerprint
+        assert first.exception == "ValueError: request 1"
+
+    def test_line_numbers_ignored(self):
+        tback = (
+            'Traceback (most recent call last):\n  File "app.py", line %d, in run\n'
+            "    x()\nOSError: %s\n"
+        )
+        first = Report(tback % (10, "a"), None, None, False, None, "%Y")
+        second = Report(tback % (12, "b"), None, None, False, None, "%Y")
+        assert first.fingerprint == second.fingerprint
+
+
+class TestDeduplicator:
+    def test_summary_of_repeats(self):
+        summaries = []
+        dedup = Deduplicator(window=0.2, on_summary=lambda *args: summaries.append(args))
+
+        assert dedup.is_repeat(make_report(1)) is False
+        assert [dedup.is_repeat(make_report(3)) for _ in range(3)] == [True] * 3
+        assert dedup.is_repeat(make_report(2)) is False
+
+        for _ in range(50):
+            if summaries:
+                break
+            time.sleep(0.02)
+        dedup.close()
+        assert len(summaries) == 1
+        report, repeats, period = summaries[0]
+        assert repeats == 3
+        assert "Same error x3 in last" in report.make_summary(repeats, period)
+        assert dedup.is_repeat(make_report(1)) is False
+
+    def test_bounded(self):
+        summaries = []
+        dedup = Deduplicator(window=60, maxsize=1, on_summary=lambda *args: summaries.append(args))
+        dedup.is_repeat(make_report(1))
+        dedup.is_repeat(make_report(1))
+        dedup.is_repeat(make_report(2))
+        dedup.close()
+        assert len(dedup._windows) == 0
+        assert [repeats for _, repeats, _ in summaries] == [1]
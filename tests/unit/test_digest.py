@@ -0,0 +1,104 @@
+import gzip
+import time
+import traceback
+from email import message_from_bytes
+
+import pytest
+
+from easy_notifyer import mailer_reporter
+from easy_notifyer.digest import Digest
+from easy_notifyer.report import Report
+
+
+pytestmark = [
+    pytest.mark.unit,
+]
+
+
+def make_report(value: int) -> Report:
+    try:
+        if value % 2:
+            raise ValueError(f"request {value}")
+        raise KeyError(value)
+    except Exception:  # noqa
+        tback = traceback.format_exc()
+    return Report(tback, "handler", None, False, None, "%Y-%m-%d %H:%M:%S")
+
+
+def wait_for(items: list):
+    for _ in range(100):
+        if items:
+            return
+        time.sleep(0.02)
+
+
+class TestDigest:
+    def test_group_by_fingerprint(self):
+        digests = []
+        digest = Digest(interval=60, max_reports=4, on_flush=lambda *args: digests.append(args))
+        for value in (1, 3, 2, 5):
+            digest.add(make_report(value))
+
+        wait_for(digests)
+        digest.close()
+        assert len(digests) == 1
+        text, tracebacks = digests[0]
+        assert "Reports: 4, errors: 2" in text
+        assert "1. x3 ValueError: request 1" in text
+        assert "2. x1 KeyError: 2" in text
+        assert gzip.decompress(tracebacks).decode().count("Traceback") == 4
+
+    def test_max_bytes(self):
+        digests = []
+        report = make_report(1)
+        digest = Digest(
+            interval=60,
+            max_bytes=len(report.tback),
+            on_flush=lambda *args: digests.append(args),
+        )
+        for _ in range(3):
+            digest.add(report)
+        digest.flush()
+        digest.close()
+        tracebacks = gzip.decompress(digests[0][1]).decode()
+        assert tracebacks.count("Traceback") == 1
+        assert "2 tracebacks are not kept" in tracebacks
+
+    def test_interval(self):
+        digests = []
+        digest = Digest(interval=0.1, on_flush=lambda *args: digests.append(args))
+        digest.add(make_report(1))
+        wait_for(digests)
+        digest.close()
+        assert len(digests) == 1
+
+
+def test_mailer_reporter_digest(smtp_server):
+    reporter = mailer_reporter(
+        host="127.0.0.1",
+        port=smtp_server.server_address[1],
+        login="user",
+        password="secret",
+        from_addr="app@test",
+        to_addrs="ops@test",
+        service_name="api",
+        digest_interval=60,
+        digest_max_reports=2,
+    )
+
+    @reporter()
+    def crash():
+        raise ValueError("crash")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            crash()
+
+    wait_for(smtp_server.messages)
+    assert len(smtp_server.messages) == 1
+    message = message_from_bytes(smtp_server.messages[0][2])
+    assert message["Subject"] == "Digest of errors: api"
+    text, attach = message.get_payload()
+    assert "x2 ValueError: crash" in text.get_payload(decode=True).decode()
+    assert attach.get_filename().endswith(".txt.gz")
+    assert gzip.decompress(attach.get_payload(decode=True)).count(b"Traceback") == 2
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from easy_notifyer.executor import BoundedExecutor
+from easy_notifyer.utils import run_in_executor, run_in_threadpool
+
+
+pytestmark = [
+    pytest.mark.unit,
+]
+
+
+class TestBoundedExecutor:
+    @pytest.mark.asyncio
+    async def test_queue_bound(self):
+        executor = BoundedExecutor(max_workers=1, max_queue=1)
+        release = threading.Event()
+        started = threading.Event()
+
+        def hold():
+            started.set()
+            release.wait(5)
+            return "held"
+
+        first = executor.submit(hold)
+        started.wait(5)
+        second = executor.submit(int, "2")
+        third = asyncio.ensure_future(executor.run(int, "3"))
+        await asyncio.sleep(0.05)
+
+        assert executor.stats["queued"] == 1
+        assert executor.stats["waiting"] == 1
+        assert executor.stats["running"] == 1
+        assert third.done() is False
+
+        release.set()
+        assert await third == 3
+        assert first.result(timeout=5) == "held"
+        assert second.result(timeout=5) == 2
+        stats = executor.stats
+        assert stats["completed"] == 3
+        assert stats["max_wait_time"] >= 0.05
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter(self):
+        executor = BoundedExecutor(max_workers=1, max_queue=0)
+        release = threading.Event()
+        executor.submit(release.wait, 5)
+        waiter = asyncio.ensure_future(executor.run(int, "1"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        release.set()
+        assert await executor.run(int, "2") == 2
+        executor.shutdown()
+        with pytest.raises(RuntimeError):
+            executor.submit(int, "3")
+
+    @pytest.mark.asyncio
+    async def test_cancelled_queued_call(self):
+        executor = BoundedExecutor(max_workers=1, max_queue=1)
+        release = threading.Event()
+        executor.submit(release.wait, 5)
+        queued = asyncio.ensure_future(executor.run(int, "1"))
+        await asyncio.sleep(0.01)
+        assert executor.stats["queued"] == 1
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+        assert executor.stats["queued"] == 0
+        release.set()
+        results = await asyncio.gather(executor.run(int, "2"), executor.run(int, "3"))
+        assert results == [2, 3]
+        assert executor._slots == 0
+        executor.shutdown()
+
+
+class TestRunInExecutor:
+    @pytest.mark.asyncio
+    async def test_library_executor(self):
+        thread = await run_in_threadpool(threading.current_thread)
+        assert thread.name.startswith("easy_notifyer-executor")
+
+    @pytest.mark.asyncio
+    async def test_own_executor(self):
+        with ThreadPoolExecutor(thread_name_prefix="app") as executor:
+            thread = await run_in_executor(executor, threading.current_thread)
+        assert thread.name.startswith("app")
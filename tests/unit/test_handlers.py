@@ -0,0 +1,307 @@
+import asyncio
+import threading
+import time
+from io import BytesIO
+from urllib.error import HTTPError
+
+import pytest
+from pytest_mock import MockerFixture
+
+from easy_notifyer import telegram_reporter
+from easy_notifyer.clients.outbox import AsyncOutbox, Outbox, get_default_async_outbox
+from easy_notifyer.clients.registry import (
+    aclose_clients, close_clients, get_telegram, get_telegram_async
+)
+from easy_notifyer.clients.retry import DeadlineExceeded, RetryPolicy
+from easy_notifyer.clients.telegram import Telegram, TelegramAsync
+from easy_notifyer.sampling import CircuitBreaker, Sampler
+from easy_notifyer.spool import get_spool
+
+
+pytestmark = [
+    pytest.mark.unit,
+]
+
+
+class TestTelegramReporter:
+    def test_spool_undelivered(self, tmp_path, mocker: MockerFixture):
+        def send_post(*, method_api: str, body: dict, **kwargs):
+            if body["chat_id"] == 2:
+                raise DeadlineExceeded()
+            if body["chat_id"] == 3:
+                raise HTTPError("url", 400, "Bad Request", {}, BytesIO(b""))
+            return {"message_id": 1}
+
+        mocker.patch.object(Telegram, "_send_post", side_effect=send_post)
+        reporter = telegram_reporter(
+            token="123:spool", chat_id=[1, 2, 3], spool_dir=str(tmp_path)
+        )
+
+        @reporter()
+        def crash():
+            raise ValueError("crash")
+
+        with pytest.raises(ValueError):
+            crash()
+
+        records = [record for _, record in get_spool(str(tmp_path))._read_records(0)]
+        assert len(records) == 1
+        assert records[0]["payload"]["chat_id"] == [2]
+        assert "ValueError: crash" in records[0]["payload"]["text"]
+
+    def test_failing_spool(self, tmp_path, mocker: MockerFixture):
+        mocker.patch.object(Telegram, "_send_post", side_effect=DeadlineExceeded())
+        reporter = telegram_reporter(token="123:disk", chat_id=9, spool_dir=str(tmp_path))
+        append = mocker.patch.object(
+            get_spool(str(tmp_path)), "append", side_effect=OSError("disk is full")
+        )
+
+        @reporter()
+        def crash():
+            raise ValueError("crash")
+
+        with pytest.raises(ValueError):
+            crash()
+        assert append.call_count == 1
+
+    def test_background(self, mocker: MockerFixture):
+        release = threading.Event()
+        sent = []
+
+        def send_post(*, method_api: str, body: dict, **kwargs):
+            if body["chat_id"] == 1:
+                release.wait(5)
+                sent.append(body["chat_id"])
+            return {"message_id": 1}
+
+        mocker.patch.object(Telegram, "_send_post", side_effect=send_post)
+        outbox = Outbox()
+        reporter = telegram_reporter(token="123:background", chat_id=1, outbox=outbox)
+
+        @reporter()
+        def crash():
+            raise ValueError("crash")
+
+        with pytest.raises(ValueError):
+            crash()
+        assert sent == []
+
+        release.set()
+        assert outbox.close(timeout=5) is True
+        assert sent == [1]
+
+        with pytest.raises(ValueError):
+            crash()
+        assert sent == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_background_async(self, mocker: MockerFixture):
+        release = asyncio.Event()
+        sent = []
+
+        async def send_post(*, method_api: str, body: dict, **kwargs):
+            await release.wait()
+            sent.append(body["chat_id"])
+            return {"message_id": 1}
+
+        mocker.patch.object(TelegramAsync, "_send_post", side_effect=send_post)
+        async_outbox = AsyncOutbox()
+        reporter = telegram_reporter(
+            token="123:background", chat_id=1, background=True, async_outbox=async_outbox
+        )
+
+        @reporter()
+        async def crash():
+            raise ValueError("crash")
+
+        with pytest.raises(ValueError):
+            await crash()
+        assert sent == [] and len(async_outbox) == 1
+
+        release.set()
+        assert await async_outbox.drain(timeout=5) is True
+        assert sent == [1] and len(async_outbox) == 0
+
+        async_outbox.close()
+        with pytest.raises(ValueError):
+            await crash()
+        assert sent == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_fallback_undelivered_chats(self, mocker: MockerFixture):
+        sent, resent = [], []
+
+        async def send_post(*, method_api: str, body: dict, **kwargs):
+            if body["chat_id"] == 22:
+                await asyncio.sleep(5)
+            sent.append(body["chat_id"])
+            return {"message_id": 1}
+
+        def resend_post(*, method_api: str, body: dict, **kwargs):
+            resent.append(body["chat_id"])
+            return {"message_id": 1}
+
+        mocker.patch.object(TelegramAsync, "_send_post", side_effect=send_post)
+        mocker.patch.object(Telegram, "_send_post", side_effect=resend_post)
+        outbox = Outbox()
+        async_outbox = AsyncOutbox(outbox=outbox)
+        reporter = telegram_reporter(
+            token="123:fallback", chat_id=[21, 22], background=True, async_outbox=async_outbox
+        )
+
+        @reporter()
+        async def crash():
+            raise ValueError("crash")
+
+        with pytest.raises(ValueError):
+            await crash()
+        while not sent:
+            await asyncio.sleep(0.01)
+        tasks = list(async_outbox._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.wait(tasks)
+
+        assert outbox.close(timeout=5) is True
+        assert sent == [21]
+        assert [chat_id for chat_id in resent if chat_id in (21, 22)] == [22]
+
+    def test_circuit_breaker(self, mocker: MockerFixture):
+        sent = []
+
+        def send_post(*, method_api: str, body: dict, **kwargs):
+            sent.append(body["chat_id"])
+            raise ConnectionError
+
+        mocker.patch.object(Telegram, "_send_post", side_effect=send_post)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        reporter = telegram_reporter(token="123:breaker", chat_id=7, circuit_breaker=breaker)
+
+        @reporter()
+        def crash():
+            raise ValueError("crash")
+
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                crash()
+
+        assert breaker.state == "open"
+        assert sent.count(7) == RetryPolicy().max_attempts
+
+    @pytest.mark.asyncio
+    async def test_cancelled_trial(self, mocker: MockerFixture):
+        async def send_post(**kwargs):
+            await asyncio.sleep(5)
+
+        mocker.patch.object(TelegramAsync, "_send_post", side_effect=send_post)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        breaker.record(False)
+        breaker._opened_at -= 60
+        reporter = telegram_reporter(
+            token="123:trial", chat_id=8, circuit_breaker=breaker, background=True
+        )
+
+        @reporter()
+        async def crash():
+            raise ValueError("crash")
+
+        with pytest.raises(ValueError):
+            await crash()
+        await asyncio.sleep(0.05)
+        assert breaker.state == "half_open"
+        tasks = get_default_async_outbox()._loop_tasks(asyncio.get_event_loop())
+        for task in tasks:
+            task.cancel()
+        await asyncio.wait(tasks)
+
+        assert breaker.state == "open"
+        assert breaker._trial is False
+
+    def test_edit_repeats(self, mocker: MockerFixture):
+        calls = []
+
+        def send_post(*, method_api: str, body: dict, **kwargs):
+            if body["chat_id"] == 5:
+                calls.append((method_api, body))
+            return {"message_id": 42, "text": body.get("text", "")}
+
+        mocker.patch.object(Telegram, "_send_post", side_effect=send_post)
+        reporter = telegram_reporter(
+            token="123:edit", chat_id=5, edit_window=60, edit_interval=0.05
+        )
+
+        @reporter()
+        def crash():
+            raise ValueError("crash")
+
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                crash()
+        for _ in range(100):
+            if len(calls) > 1:
+                break
+            time.sleep(0.05)
+
+        assert [method for method, _ in calls] == ["sendMessage", "editMessageText"]
+        edit = calls[1][1]
+        assert edit["message_id"] == 42 and edit["chat_id"] == 5
+        assert edit["text"].startswith(calls[0][1]["text"].rstrip("\n"))
+        assert "🔁 x3, last at " in edit["text"]
+
+    def test_edit_after_sampled_out(self, mocker: MockerFixture):
+        send_post = mocker.patch.object(
+            Telegram, "_send_post", return_value={"message_id": 42, "text": "crash"}
+        )
+        reporter = telegram_reporter(
+            token="123:edit-sampled",
+            chat_id=6,
+            edit_window=60,
+            sampler=Sampler(threshold=0, first=0, every=3),
+        )
+
+        @reporter()
+        def crash():
+            raise ValueError("crash")
+
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                crash()
+
+        methods = [
+            call.kwargs["method_api"]
+            for call in send_post.call_args_list
+            if call.kwargs["body"]["chat_id"] == 6
+        ]
+        assert methods == ["sendMessage"]
+
+
+class TestClientRegistry:
+    def test_shared_clients(self, mocker: MockerFixture):
+        mocker.patch.object(Telegram, "_send_post", return_value={"message_id": 1})
+        first = telegram_reporter(token="123:registry", chat_id=[1, 2])
+        second = telegram_reporter(token="123:registry", chat_id=[1, 2])
+        client = get_telegram(token="123:registry", chat_id=[1, 2])
+        init = mocker.spy(Telegram, "__init__")
+
+        for reporter in (first, second):
+
+            @reporter()
+            def crash():
+                raise ValueError("crash")
+
+            with pytest.raises(ValueError):
+                crash()
+
+        init.assert_not_called()
+        assert client is get_telegram(token="123:registry", chat_id=(1, 2))
+        assert client._executor is not None
+        close_clients()
+        assert client._executor is None
+        assert client is get_telegram(token="123:registry", chat_id=[1, 2])
+
+    @pytest.mark.asyncio
+    async def test_aclose(self, mocker: MockerFixture):
+        client = get_telegram_async(token="123:registry", chat_id=1)
+        aclose = mocker.spy(client._client, "aclose")
+        await aclose_clients()
+        aclose.assert_called_once()
@@ -0,0 +1,256 @@
+import asyncio
+import gzip
+import threading
+from email import message_from_bytes, policy
+from smtplib import SMTP, SMTPNotSupportedError, SMTPServerDisconnected
+
+import pytest
+
+from easy_notifyer import mailer_reporter
+from easy_notifyer.clients import smtp as smtp_module
+from easy_notifyer.clients.mailer import Mailer, MailerAsync, SMTPPool, _encode_headers
+from easy_notifyer.clients.outbox import get_default_outbox
+from easy_notifyer.clients.smtp import AsyncSMTP, AsyncSMTPPool
+from easy_notifyer.handlers import mailer as mailer_handlers
+
+
+pytestmark = [
+    pytest.mark.unit,
+]
+
+
+@pytest.fixture
+def smtp_pool(smtp_server):
+    pool = SMTPPool(
+        host="127.0.0.1",
+        port=smtp_server.server_address[1],
+        login="user",
+        password="secret",
+    )
+    yield pool
+    pool.close()
+
+
+def send(pool: SMTPPool, text: str = "crash"):
+    with Mailer(host="", port=0, login="", password="", pool=pool) as mailer:
+        mailer.send_message(message=text, from_addr="app@test", to_addrs="ops@test, dev@test")
+
+
+class TestSMTPPool:
+    def test_reuse_session(self, smtp_pool: SMTPPool, smtp_server):
+        send(smtp_pool, "first")
+        send(smtp_pool, "second")
+
+        assert smtp_server.sessions == 1
+        assert smtp_server.logins == [("user", "secret")]
+        assert "noop" in [command.lower() for command in smtp_server.commands]
+        assert [rcpts for _, rcpts, _ in smtp_server.messages] == [["ops@test", "dev@test"]] * 2
+        assert b"second" in smtp_server.messages[1][2]
+
+    def test_reconnect(self, smtp_pool: SMTPPool, smtp_server, mocker):
+        send(smtp_pool)
+        conn, _ = smtp_pool._idle[0]
+        mocker.patch.object(conn, "noop", return_value=(250, b"OK"))
+        mocker.patch.object(conn, "sendmail", side_effect=SMTPServerDisconnected)
+
+        send(smtp_pool, "again")
+
+        assert smtp_server.sessions == 2
+        assert b"again" in smtp_server.messages[-1][2]
+
+    def test_idle_timeout(self, smtp_pool: SMTPPool, smtp_server):
+        smtp_pool._idle_timeout = 0
+        send(smtp_pool)
+        send(smtp_pool)
+        assert smtp_server.sessions == 2
+
+
+class TestAsyncSMTP:
+    @pytest.mark.asyncio
+    async def test_send_with_pool(self, smtp_server):
+        pool = AsyncSMTPPool(
+            host="127.0.0.1", port=smtp_server.server_address[1], login="user", password="secret"
+        )
+        for text in ("first", "second"):
+            async with MailerAsync(host="", port=0, login="", password="", pool=pool) as mailer:
+                await mailer.send_message(
+                    message=text, from_addr="app@test", to_addrs=["ops@test", "dev@test"]
+                )
+        await pool.close()
+
+        assert smtp_server.sessions == 1
+        assert smtp_server.logins == [("user", "secret")]
+        assert [rcpts for _, rcpts, _ in smtp_server.messages] == [["ops@test", "dev@test"]] * 2
+        assert b"second" in smtp_server.messages[1][2]
+
+    @pytest.mark.asyncio
+    async def test_close_failed_connect(self, smtp_server, mocker):
+        smtp = AsyncSMTP(host="127.0.0.1", port=smtp_server.server_address[1], starttls=True)
+        close = mocker.spy(asyncio.StreamWriter, "close")
+
+        with pytest.raises(SMTPNotSupportedError):
+            await smtp.connect()
+
+        assert close.call_count == 1
+        assert smtp._writer is None
+
+    @pytest.mark.asyncio
+    async def test_fqdn_resolved_off_loop(self, smtp_server, mocker):
+        loop_thread = threading.current_thread()
+        threads = []
+
+        def getfqdn():
+            threads.append(threading.current_thread())
+            return "client.local"
+
+        mocker.patch.object(smtp_module, "_local_fqdn", None)
+        mocker.patch.object(smtp_module.socket, "getfqdn", side_effect=getfqdn)
+        for _ in range(2):
+            async with AsyncSMTP(host="127.0.0.1", port=smtp_server.server_address[1]):
+                pass
+
+        assert len(threads) == 1
+        assert threads[0] is not loop_thread
+        assert smtp_server.commands.count("EHLO client.local") == 2
+
+    @pytest.mark.asyncio
+    async def test_auth_login_and_dot_stuffing(self, smtp_server):
+        smtp_server.extensions = ["250-PIPELINING", "250 AUTH=LOGIN"]
+        async with AsyncSMTP(host="127.0.0.1", port=smtp_server.server_address[1]) as smtp:
+            assert smtp.extensions["auth"] == "LOGIN"
+            await smtp.login("user", "secret")
+            refused = await smtp.sendmail("app@test", ["ops@test"], b"Subject: x\n\n.hidden\n")
+
+        assert refused == {}
+        assert smtp_server.logins == [("user", "secret")]
+        assert smtp_server.messages[0][2] == b"Subject: x\r\n\r\n.hidden\r\n"
+        assert smtp_server.commands[-1] == "QUIT"
+
+    @pytest.mark.asyncio
+    async def test_async_reporter(self, smtp_server, mocker):
+        run_in_executor = mocker.spy(mailer_handlers, "run_in_executor")
+        reporter = mailer_reporter(
+            host="127.0.0.1",
+            port=smtp_server.server_address[1],
+            login="user",
+            password="secret",
+            from_addr="app@test",
+            to_addrs="ops@test",
+        )
+
+        @reporter(subject="crash")
+        async def crash():
+            raise ValueError("async crash")
+
+        with pytest.raises(ValueError):
+            await crash()
+
+        message = message_from_bytes(smtp_server.messages[0][2])
+        assert message["Subject"] == "crash"
+        assert b"ValueError: async crash" in message.get_payload()[0].get_payload(decode=True)
+        assert [call.args[1] for call in run_in_executor.call_args_list] == [
+            mailer_handlers._report_payload
+        ]
+
+
+class TestPrewarm:
+    def test_reporter(self, smtp_server):
+        reporter = mailer_reporter(
+            host="127.0.0.1",
+            port=smtp_server.server_address[1],
+            login="prewarm",
+            password="secret",
+            from_addr="app@test",
+            to_addrs="ops@test",
+            prewarm=True,
+        )
+        assert get_default_outbox().flush(timeout=5) is True
+        assert smtp_server.sessions == 1
+        assert smtp_server.logins == [("prewarm", "secret")]
+
+        @reporter()
+        def crash():
+            raise ValueError("crash")
+
+        with pytest.raises(ValueError):
+            crash()
+
+        assert smtp_server.sessions == 1
+        assert len(smtp_server.messages) == 1
+
+
+class TestPipelining:
+    addrs = [f"user{number}@test" for number in range(50)]
+
+    def test_sync(self, smtp_server, mocker):
+        smtp_server.extensions = ["250-PIPELINING", "250 AUTH PLAIN"]
+        send = mocker.spy(SMTP, "send")
+        port = smtp_server.server_address[1]
+        with Mailer(host="127.0.0.1", port=port, login="u", password="p") as mailer:
+            mailer.send_message(message="crash", from_addr="app@test", to_addrs=self.addrs)
+
+        assert smtp_server.messages[0][1] == self.addrs
+        assert len([call for call in send.call_args_list if "RCPT" in str(call)]) == 1
+
+    @pytest.mark.asyncio
+    async def test_async(self, smtp_server, mocker):
+        smtp_server.extensions = ["250 PIPELINING"]
+        async with AsyncSMTP(host="127.0.0.1", port=smtp_server.server_address[1]) as smtp:
+            send_commands = mocker.spy(smtp, "_send_commands")
+            await smtp.sendmail("app@test", self.addrs, b"Subject: x\r\n\r\ncrash\r\n")
+
+        assert smtp_server.messages[0][1] == self.addrs
+        assert len(send_commands.call_args_list[0].args[0]) == 51
+
+    @pytest.mark.asyncio
+    async def test_sender_accepted(self, smtp_server):
+        smtp_server.extensions = ["250-PIPELINING", "250 AUTH PLAIN"]
+        smtp_server.mail_reply = "252 Cannot verify sender"
+        port = smtp_server.server_address[1]
+        with Mailer(host="127.0.0.1", port=port, login="u", password="p") as mailer:
+            mailer.send_message(message="crash", from_addr="app@test", to_addrs=self.addrs)
+        async with AsyncSMTP(host="127.0.0.1", port=port) as smtp:
+            await smtp.sendmail("app@test", self.addrs, b"Subject: x\r\n\r\ncrash\r\n")
+
+        assert len(smtp_server.messages) == 2
+
+    def test_headers_encoded_once(self):
+        _encode_headers.cache_clear()
+        for _ in range(3):
+            message = Mailer._format_message(
+                from_addr="app@test",
+                to_addrs=self.addrs,
+                text="crash ☠️",
+                subject="Crash ☠️",
+                attach=None,
+                filename=None,
+            )
+        assert _encode_headers.cache_info().hits == 2
+        parsed = message_from_bytes(message, policy=policy.default)
+        assert parsed["Subject"] == "Crash ☠️"
+
+
+class TestCompression:
+    @pytest.mark.asyncio
+    async def test_gzip_attach(self, smtp_server):
+        tback = "Traceback (most recent call last):\n" * 1000
+        async with MailerAsync(
+            host="127.0.0.1",
+            port=smtp_server.server_address[1],
+            login="user",
+            password="secret",
+            compression="gzip",
+            compress_threshold=1024,
+        ) as mailer:
+            await mailer.send_message(
+                message="crash",
+                from_addr="app@test",
+                to_addrs="ops@test",
+                attach=tback,
+                filename="tback.txt",
+            )
+
+        attach = message_from_bytes(smtp_server.messages[0][2]).get_payload()[1]
+        assert attach.get_filename() == "tback.txt.gz"
+        assert gzip.decompress(attach.get_payload(decode=True)).decode() == tback
+        assert len(smtp_server.messages[0][2]) < len(tback)
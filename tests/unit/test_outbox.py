@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import pytest
+
+from easy_notifyer.clients.outbox import AsyncOutbox, Outbox
+
+
+pytestmark = [
+    pytest.mark.unit,
+]
+
+
+@pytest.fixture
+def blocked_outbox():
+    """Outbox with a single worker held by the first send until event is set"""
+    release = threading.Event()
+    outbox = Outbox(maxsize=2, overflow="drop_oldest", block_timeout=0.05)
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    outbox.submit(hold)
+    started.wait(5)
+    yield outbox, release
+    release.set()
+    outbox.close(timeout=5)
+
+
+class TestOutbox:
+    @pytest.mark.parametrize(
+        "overflow, done",
+        [("drop_oldest", [2, 3]), ("drop_newest", [1, 2]), ("block", [1, 2])],
+    )
+    def test_overflow(self, blocked_outbox, overflow, done):
+        outbox, release = blocked_outbox
+        outbox._overflow = overflow
+        sent = []
+        futures = [outbox.submit(sent.append, number) for number in (1, 2, 3)]
+
+        release.set()
+        assert outbox.flush(timeout=5) is True
+
+        assert sent == done
+        assert outbox.dropped == 1
+        assert [future.cancelled() for future in futures].count(True) == 1
+
+    def test_flush_timeout(self, blocked_outbox):
+        outbox, release = blocked_outbox
+        assert outbox.flush(timeout=0.01) is False
+        release.set()
+        assert outbox.flush(timeout=5) is True
+
+    def test_error_in_future(self):
+        outbox = Outbox()
+        future = outbox.submit(int, "not a number")
+        assert isinstance(future.exception(timeout=5), ValueError)
+        outbox.close(timeout=5)
+        with pytest.raises(RuntimeError):
+            outbox.submit(int, "1")
+
+
+class TestAsyncOutbox:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "overflow, done",
+        [("drop_oldest", [2, 3]), ("drop_newest", [1, 2]), ("block", [1, 2, 3])],
+    )
+    async def test_overflow(self, overflow, done):
+        outbox = AsyncOutbox(maxsize=2, overflow=overflow)
+        sent = []
+
+        async def send(number: int):
+            await asyncio.sleep(0.01)
+            sent.append(number)
+
+        tasks = [await outbox.submit(send, number) for number in (1, 2, 3)]
+
+        assert await outbox.drain(timeout=5) is True
+        assert sorted(sent) == done
+        assert outbox.dropped == (0 if overflow == "block" else 1)
+        assert tasks.count(None) == (1 if overflow == "drop_newest" else 0)
+        outbox.close()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_task_fallback(self):
+        thread_outbox = Outbox()
+        outbox = AsyncOutbox(outbox=thread_outbox)
+        sent = []
+
+        task = await outbox.submit(asyncio.sleep, 5, fallback=lambda: sent.append("fallback"))
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert thread_outbox.close(timeout=5) is True
+        assert sent == ["fallback"]
+        outbox.close()
+
+    def test_fallback_at_close(self):
+        loop = asyncio.new_event_loop()
+        outbox = AsyncOutbox()
+        sent = []
+
+        task = loop.run_until_complete(
+            outbox.submit(asyncio.sleep, 5, fallback=lambda: sent.append("fallback"))
+        )
+        outbox.close()
+
+        assert sent == ["fallback"]
+        with pytest.raises(RuntimeError):
+            loop.run_until_complete(outbox.submit(asyncio.sleep, 0))
+        task.cancel()
+        loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+        loop.close()
+        assert sent == ["fallback"]
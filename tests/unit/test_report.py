@@ -0,0 +1,72 @@
+import sys
+import traceback
+
+import pytest
+
+from easy_notifyer.report import Report, capture_traceback
+
+
+pytestmark = [
+    pytest.mark.unit,
+]
+
+
+def ping(depth: int):
+    return pong(depth)
+
+
+def pong(depth: int):
+    if depth == 0:
+        raise ValueError("bottom")
+    return ping(depth - 1)
+
+
+def crash(depth: int):
+    try:
+        ping(depth)
+    except ValueError as exc:
+        return exc, traceback.format_exc()
+
+
+class TestCapturedTraceback:
+    def test_fingerprint_as_formatted(self):
+        exc, tback = crash(3)
+        captured = Report(capture_traceback(exc), None, None, False, None, "%Y")
+        formatted = Report(tback, None, None, False, None, "%Y")
+        assert captured.exception == formatted.exception == "ValueError: bottom"
+        assert captured.fingerprint == formatted.fingerprint
+        assert captured.tback == formatted.tback
+
+    def test_lazy(self, mocker):
+        exc, _ = crash(1)
+        report = Report(capture_traceback(exc), None, None, True, None, "%Y")
+        getline = mocker.spy(sys.modules["linecache"], "getline")
+        assert getline.call_count == 0
+        assert "ValueError: bottom" in report.attach
+        assert getline.call_count > 0
+
+    def test_limit(self):
+        exc, _ = crash(3)
+        frames = {
+            limit: "".join(capture_traceback(exc, limit=limit).format()).count('  File "')
+            for limit in (None, 2, 0, -2)
+        }
+        assert frames[None] > frames[2] == 2
+        assert frames[0] == frames[-2] == 0
+
+    def test_recursion_collapsed(self):
+        exc, _ = crash(200)
+        report = Report(capture_traceback(exc, limit=50), None, None, False, None, "%Y")
+        assert "[Previous 2 frames repeated" in report.tback
+        assert report.tback.count("in ping") <= 4
+        assert report.tback.endswith("ValueError: bottom\n")
+
+    def test_max_size(self):
+        exc, _ = crash(200)
+        report = Report(
+            capture_traceback(exc, limit=None), None, None, False, None, "%Y", max_size=1000
+        )
+        assert "characters of traceback are cut" in report.tback
+        assert report.tback.startswith("Traceback (most recent call last):")
+        assert report.tback.endswith("ValueError: bottom\n")
+        assert len(report.tback) < 1100
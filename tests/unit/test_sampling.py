@@ -0,0 +1,72 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from easy_notifyer.report import Report
+from easy_notifyer.sampling import CircuitBreaker, Sampler
+
+
+pytestmark = [
+    pytest.mark.unit,
+]
+
+
+def make_report() -> Report:
+    return Report("ValueError: crash", None, None, False, None, "%Y")
+
+
+class TestSampler:
+    def test_first_then_every(self):
+        sampler = Sampler(window=60, threshold=3, first=2, every=3)
+        reports = [make_report() for _ in range(12)]
+
+        sent = [number for number, report in enumerate(reports) if sampler.sample(report)]
+
+        assert sent == [0, 1, 2, 3, 4, 7, 10]
+        assert sampler.dropped == 5
+        assert reports[7].report.endswith("Reports dropped by sampling: 2")
+        assert "dropped" not in reports[4].report
+
+    def test_window_slides(self, mocker: MockerFixture):
+        now = mocker.patch("easy_notifyer.sampling.time.monotonic", return_value=100.0)
+        sampler = Sampler(window=10, threshold=2, first=0, every=100)
+        assert [sampler.sample(make_report()) for _ in range(3)] == [True, True, False]
+
+        now.return_value = 111.0
+        assert sampler.sample(make_report()) is True
+        assert len(sampler._buckets) == 1
+
+
+class TestCircuitBreaker:
+    def test_open_and_trial(self, mocker: MockerFixture):
+        now = mocker.patch("easy_notifyer.sampling.time.monotonic", return_value=0.0)
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        breaker.record(False)
+        assert breaker.allow() is True
+        breaker.record(False)
+        assert breaker.state == "open"
+        assert breaker.allow() is False
+
+        now.return_value = 30.0
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+        breaker.record(False)
+        assert breaker.state == "open"
+
+        now.return_value = 60.0
+        assert breaker.allow() is True
+        breaker.record(True)
+        assert breaker.state == "closed"
+        assert breaker.allow() is True
+
+    def test_lost_trial_expires(self, mocker: MockerFixture):
+        now = mocker.patch("easy_notifyer.sampling.time.monotonic", return_value=0.0)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record(False)
+
+        now.return_value = 30.0
+        assert breaker.allow() is True
+        now.return_value = 59.0
+        assert breaker.allow() is False
+        now.return_value = 60.0
+        assert breaker.allow() is True
+        assert breaker.allow() is False
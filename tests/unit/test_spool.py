@@ -0,0 +1,95 @@
+import os
+
+import pytest
+from pytest_mock import MockerFixture
+
+from easy_notifyer.spool import DEAD_FILENAME, LOG_FILENAME, Spool
+
+
+pytestmark = [
+    pytest.mark.unit,
+]
+
+
+@pytest.fixture(scope="function")
+def spool(tmp_path):
+    spool = Spool(str(tmp_path), compact_bytes=1)
+    yield spool
+    spool.close()
+
+
+class TestSpool:
+    def test_replay_until_failure(self, spool: Spool):
+        sent = []
+        healthy = False
+        spool._senders["telegram"] = lambda payload: healthy and sent.append(payload) is None
+
+        for number in range(3):
+            assert spool.append("telegram", {"number": number}) is True
+        assert spool.replay() == 0
+        assert sent == []
+
+        healthy = True
+        assert spool.replay() == 3
+        assert sent == [{"number": 0}, {"number": 1}, {"number": 2}]
+        assert spool.replay() == 0
+        assert os.path.getsize(os.path.join(spool.directory, LOG_FILENAME)) == 0
+
+    def test_failed_record_not_blocks(self, tmp_path):
+        spool = Spool(str(tmp_path), max_attempts=2)
+        sent = []
+
+        def send(payload):
+            sent.append(payload)
+            return payload["number"] > 0
+
+        spool._senders["telegram"] = send
+
+        for number in range(3):
+            spool.append("telegram", {"number": number})
+        assert spool.replay() == 2
+        assert sent == [{"number": 0}, {"number": 1}, {"number": 2}]
+        records = [record for _, record in spool._read_records(spool._read_offset())]
+        assert [record["attempts"] for record in records] == [1]
+
+        assert spool.replay() == 0
+        assert list(spool._read_records(spool._read_offset())) == []
+        with open(os.path.join(spool.directory, DEAD_FILENAME)) as file:
+            assert '"number": 0' in file.read()
+        spool.close()
+
+    def test_channel_without_sender(self, spool: Spool):
+        sent = []
+        spool._senders["telegram"] = lambda payload: sent.append(payload) is None
+        spool.append("mailer", {"number": 0})
+        spool.append("telegram", {"number": 1})
+
+        assert spool.replay() == 1
+        assert list(record["channel"] for _, record in spool._read_records(0)) == ["mailer"]
+
+    def test_crash_during_compact(self, tmp_path, mocker: MockerFixture):
+        spool = Spool(str(tmp_path))
+        sent = []
+        spool._senders["telegram"] = lambda payload: sent.append(payload) is None
+        spool.append("telegram", {"number": 0})
+        assert spool.replay() == 1
+        spool.append("telegram", {"number": 1})
+
+        mocker.patch.object(spool, "_write_offset", side_effect=OSError("crash"))
+        with pytest.raises(OSError):
+            spool.compact()
+        mocker.stopall()
+        spool.close()
+
+        spool = Spool(str(tmp_path))
+        spool._senders["telegram"] = lambda payload: sent.append(payload) is None
+        assert spool.replay() == 1
+        assert sent == [{"number": 0}, {"number": 1}]
+        spool.close()
+
+    def test_max_bytes(self, tmp_path):
+        spool = Spool(str(tmp_path), max_bytes=200)
+
+        assert spool.append("telegram", {"text": "x" * 50}) is True
+        assert spool.append("telegram", {"text": "x" * 100}) is False
+        spool.close()
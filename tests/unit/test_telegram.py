@@ -0,0 +1,473 @@
+import asyncio
+import gzip
+import threading
+import time
+import zipfile
+from io import BytesIO
+from typing import Dict, List, Optional
+from urllib.error import HTTPError
+
+import pytest
+from pytest_mock import MockerFixture
+
+from easy_notifyer.clients.coalesce import Coalescer
+from easy_notifyer.clients.outbox import Outbox
+from easy_notifyer.clients.ratelimit import AsyncRateLimiter, RateLimiter, RateLimitPolicy
+from easy_notifyer.clients.retry import DeadlineExceeded, RetryPolicy
+from easy_notifyer.clients.telegram import Telegram, TelegramAsync, split_text
+from easy_notifyer.clients.tokens import TokenPool
+from easy_notifyer.utils import LRUCache
+
+
+pytestmark = [
+    pytest.mark.unit,
+]
+
+
+class TestFanOut:
+    def test_send_message(self, telegram: Telegram, mocker: MockerFixture):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def send_post(*, method_api: str, body: Optional[Dict] = None, **kwargs):
+            barrier.wait()
+            if body["chat_id"] == 2:
+                raise ConnectionError
+            return {"message_id": body["chat_id"]}
+
+        mocker.patch.object(telegram, "_send_post", side_effect=send_post)
+        telegram._retry_policy = RetryPolicy(max_attempts=1)
+
+        results = telegram.send_message("hello")
+
+        assert [result.chat_id for result in results] == [1, 2, 3]
+        assert [result.ok for result in results] == [True, False, True]
+        assert isinstance(results[1].error, ConnectionError)
+        assert results[2].result == {"message_id": 3}
+
+    @pytest.mark.asyncio
+    async def test_send_message_async(self, telegram_async: TelegramAsync, mocker: MockerFixture):
+        in_flight = []
+
+        async def send_post(*, method_api: str, body: Optional[Dict] = None, **kwargs):
+            in_flight.append(body["chat_id"])
+            await asyncio.sleep(0.01)
+            if body["chat_id"] == 2:
+                raise ConnectionError
+            return {"message_id": body["chat_id"]}
+
+        mocker.patch.object(telegram_async, "_send_post", side_effect=send_post)
+        telegram_async._max_concurrency = 2
+
+        task = asyncio.ensure_future(telegram_async.send_message("hello"))
+        await asyncio.sleep(0.005)
+        assert in_flight == [1, 2]
+        results = await task
+
+        assert [result.ok for result in results] == [True, False, True]
+
+
+class TestFileIdReuse:
+    @staticmethod
+    def send_post(uploads: List):
+        def send_post(*, method_api: str, params: Dict, files: Optional[Dict] = None, **kwargs):
+            if files is not None:
+                uploads.append(params["chat_id"])
+                return {"document": {"file_id": "file-%s" % len(uploads)}}
+            if params["document"] == "expired":
+                raise HTTPError(
+                    "url", 400, "Bad Request", {}, BytesIO(b'{"description": "wrong file id"}')
+                )
+            return {"document": {"file_id": params["document"]}}
+
+        return send_post
+
+    def test_upload_once(self, mocker: MockerFixture, no_rate_limit: RateLimitPolicy):
+        uploads = []
+        telegram = Telegram(
+            token="123:token",
+            chat_id=[1, 2, 3],
+            file_id_cache=LRUCache(),
+            rate_limiter=RateLimiter(no_rate_limit),
+        )
+        mocker.patch.object(telegram, "_send_post", side_effect=self.send_post(uploads))
+
+        results = telegram.send_attach(b"crash dump", filename="dump.txt")
+        assert uploads == [1]
+        assert [result.result["document"]["file_id"] for result in results] == ["file-1"] * 3
+
+        telegram.send_attach(b"crash dump", filename="2021-01-01 00_00_00.txt")
+        assert uploads == [1]
+
+        telegram.send_attach(b"another crash dump", filename="dump.txt")
+        assert uploads == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_upload_again_rejected_file_id(
+        self, mocker: MockerFixture, no_rate_limit: RateLimitPolicy
+    ):
+        uploads = []
+        cache = LRUCache()
+        telegram = TelegramAsync(
+            token="123:token",
+            chat_id=[1, 2],
+            file_id_cache=cache,
+            rate_limiter=AsyncRateLimiter(no_rate_limit),
+        )
+        mocker.patch.object(telegram, "_send_post", side_effect=self.send_post(uploads))
+        _, key = telegram._prepare_document(attach=b"crash dump", filename="dump.txt")
+        cache.set(key, "expired")
+
+        results = await telegram.send_attach(b"crash dump", filename="dump.txt")
+
+        assert uploads == [1]
+        assert all(result.ok for result in results)
+        assert cache.get(key) == "file-1"
+
+
+class TestRateLimit:
+    def test_chat_limits(self):
+        limiter = RateLimiter(RateLimitPolicy(global_rate=10, global_burst=3))
+
+        assert limiter._reserve(1) == pytest.approx(0, abs=0.01)
+        assert limiter._reserve(1) == pytest.approx(1, abs=0.01)
+        assert limiter._reserve(2) == pytest.approx(0, abs=0.01)
+        assert limiter._reserve(3) == pytest.approx(0.1, abs=0.01)
+
+    def test_group_limits(self):
+        limiter = RateLimiter(RateLimitPolicy(chat_rate=100, chat_burst=1, group_burst=2))
+
+        assert limiter._reserve(-100) == pytest.approx(0, abs=0.01)
+        assert limiter._reserve(-100) == pytest.approx(0.01, abs=0.01)
+        assert limiter._reserve(-100) == pytest.approx(3, abs=0.01)
+
+    def test_deadline_not_reserved(self):
+        limiter = RateLimiter(RateLimitPolicy(chat_rate=1, chat_burst=1))
+
+        assert limiter._reserve(1) == pytest.approx(0, abs=0.01)
+        with pytest.raises(DeadlineExceeded):
+            limiter.acquire(1, deadline=time.monotonic() + 0.1)
+        assert limiter._reserve(1) == pytest.approx(1, abs=0.01)
+        assert limiter._reserve(2) == pytest.approx(0, abs=0.01)
+
+    @pytest.mark.asyncio
+    async def test_retry_after_flood(self, telegram_async: TelegramAsync, mocker: MockerFixture):
+        flood = HTTPError(
+            "url",
+            429,
+            "Too Many Requests",
+            {},
+            BytesIO(b'{"ok": false, "parameters": {"retry_after": 0.05}}'),
+        )
+        send_post = mocker.patch.object(
+            telegram_async, "_send_post", side_effect=[flood, {"message_id": 1}]
+        )
+        telegram_async._chat_ids = [1]
+        started_at = time.monotonic()
+
+        results = await telegram_async.send_message("hello")
+
+        assert results[0].ok is True
+        assert send_post.call_count == 2
+        assert time.monotonic() - started_at >= 0.05
+
+
+class TestRetry:
+    def test_retry_server_error(self, telegram: Telegram, mocker: MockerFixture):
+        error = HTTPError("url", 502, "Bad Gateway", {}, BytesIO(b""))
+        send_post = mocker.patch.object(
+            telegram, "_send_post", side_effect=[error, ConnectionResetError(), {"message_id": 1}]
+        )
+        telegram._chat_ids = [1]
+        telegram._retry_policy = RetryPolicy(backoff=0.01)
+
+        results = telegram.send_message("hello")
+
+        assert results[0].ok is True
+        assert send_post.call_count == 3
+        assert telegram.stats == {
+            "attempts": 3,
+            "retries": 2,
+            "successes": 1,
+            "failures": 0,
+            "deadline_exceeded": 0,
+        }
+
+    def test_not_retry_client_error(self, telegram: Telegram, mocker: MockerFixture):
+        error = HTTPError("url", 400, "Bad Request", {}, BytesIO(b""))
+        send_post = mocker.patch.object(telegram, "_send_post", side_effect=error)
+        telegram._chat_ids = [1]
+
+        results = telegram.send_message("hello")
+
+        assert results[0].error is error
+        assert send_post.call_count == 1
+        assert telegram.stats["failures"] == 1
+
+    @pytest.mark.asyncio
+    async def test_deadline(self, telegram_async: TelegramAsync, mocker: MockerFixture):
+        send_post = mocker.patch.object(telegram_async, "_send_post", side_effect=ConnectionError)
+        telegram_async._chat_ids = [1]
+        telegram_async._retry_policy = RetryPolicy(
+            max_attempts=10, backoff=1, jitter=0, deadline=0.5
+        )
+        started_at = time.monotonic()
+
+        results = await telegram_async.send_message("hello")
+
+        assert results[0].ok is False
+        assert time.monotonic() - started_at < 0.5
+        assert telegram_async.stats["deadline_exceeded"] == 1
+        assert send_post.call_args.kwargs["timeout"] <= 0.5
+
+
+class TestBackground:
+    def test_send_message(self, telegram: Telegram, mocker: MockerFixture):
+        release = threading.Event()
+
+        def send_post(*, method_api: str, body: Optional[Dict] = None, **kwargs):
+            release.wait(5)
+            return {"message_id": body["chat_id"]}
+
+        mocker.patch.object(telegram, "_send_post", side_effect=send_post)
+        telegram._outbox = Outbox()
+
+        future = telegram.send_message("hello")
+        assert future.done() is False
+        release.set()
+
+        assert telegram.flush(timeout=5) is True
+        assert [result.result for result in future.result()] == [
+            {"message_id": 1},
+            {"message_id": 2},
+            {"message_id": 3},
+        ]
+        telegram._outbox.close()
+
+
+class TestCompression:
+    @pytest.mark.asyncio
+    async def test_gzip_off_loop(self, mocker: MockerFixture, no_rate_limit: RateLimitPolicy):
+        telegram = TelegramAsync(
+            token="123:token",
+            chat_id=1,
+            file_id_cache=LRUCache(),
+            rate_limiter=AsyncRateLimiter(no_rate_limit),
+            compression="gzip",
+            compress_threshold=1024,
+        )
+        send_post = mocker.patch.object(
+            telegram, "_send_post", return_value={"document": {"file_id": "file"}}
+        )
+        loop_thread = threading.get_ident()
+        compress_threads = []
+        prepare = telegram._prepare_document
+
+        def prepare_document(**kwargs):
+            compress_threads.append(threading.get_ident())
+            return prepare(**kwargs)
+
+        mocker.patch.object(telegram, "_prepare_document", side_effect=prepare_document)
+        tback = b"Traceback (most recent call last):\n" * 1000
+
+        await telegram.send_attach(tback, filename="tback.txt")
+
+        name, data = send_post.call_args.kwargs["files"]["document"]
+        assert name == "tback.txt.gz"
+        assert gzip.decompress(data) == tback
+        assert compress_threads and compress_threads[0] != loop_thread
+
+    def test_below_threshold(self, no_rate_limit: RateLimitPolicy):
+        telegram = Telegram(
+            token="123:token",
+            chat_id=1,
+            rate_limiter=RateLimiter(no_rate_limit),
+            compression="zip",
+            compress_threshold=1024,
+        )
+        files, _ = telegram._prepare_document(attach=b"small", filename="tback.txt")
+        assert files["document"][0] == "tback.txt"
+
+        files, _ = telegram._prepare_document(attach=b"x" * 1024, filename="tback.txt")
+        name, data = files["document"]
+        assert name == "tback.txt.zip"
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            assert archive.read("tback.txt") == b"x" * 1024
+
+    def test_unknown_compression(self):
+        with pytest.raises(ValueError):
+            Telegram(token="123:token", chat_id=1, compression="bz2")
+
+
+class TestLongText:
+    def test_split_text(self):
+        text = "line\n" * 10 + "x" * 25 + "\n😀😀"
+
+        parts = split_text(text, limit=12)
+
+        assert "".join(parts) == text
+        assert parts[0] == "line\nline\n"
+        assert all(len(part.encode("utf-16-le")) // 2 <= 12 for part in parts)
+        assert parts[-3:] == ["x" * 12, "x" * 12, "x\n😀😀"]
+
+    def test_split_long_line(self):
+        text = "a" + "😀" * 200000
+
+        parts = split_text(text)
+
+        assert "".join(parts) == text
+        assert [len(part.encode("utf-16-le")) // 2 for part in parts[:2]] == [4095, 4096]
+
+    def test_split_message(self, telegram: Telegram, mocker: MockerFixture):
+        sent = []
+
+        def send_post(*, method_api: str, body: Optional[Dict] = None, **kwargs):
+            sent.append((body["chat_id"], body["text"]))
+            if body["chat_id"] == 2:
+                raise ConnectionError
+            return {"message_id": 1}
+
+        mocker.patch.object(telegram, "_send_post", side_effect=send_post)
+        telegram._retry_policy = RetryPolicy(max_attempts=1)
+        text = "a" * 4000 + "\n" + "b" * 100
+
+        results = telegram.send_message(text)
+
+        assert [result.ok for result in results] == [True, False, True]
+        assert [text for chat_id, text in sent if chat_id == 1] == ["a" * 4000 + "\n", "b" * 100]
+        assert len([chat_id for chat_id, _ in sent if chat_id == 2]) == 1
+
+    @pytest.mark.asyncio
+    async def test_too_long_as_document(
+        self, telegram_async: TelegramAsync, mocker: MockerFixture
+    ):
+        send_post = mocker.patch.object(
+            telegram_async, "_send_post", return_value={"document": {"file_id": "file"}}
+        )
+        text = "traceback line\n" * 2000
+
+        results = await telegram_async.send_message(text)
+
+        assert all(result.ok for result in results)
+        methods = [call.kwargs["method_api"] for call in send_post.call_args_list]
+        assert methods == ["sendDocument"] * 3
+        first = send_post.call_args_list[0].kwargs
+        assert first["files"]["document"][0] == "message.txt"
+        assert len(first["params"]["caption"]) <= 1024
+
+    @pytest.mark.asyncio
+    async def test_long_caption(self, telegram_async: TelegramAsync, mocker: MockerFixture):
+        send_post = mocker.patch.object(
+            telegram_async, "_send_post", return_value={"document": {"file_id": "file"}}
+        )
+        msg = "header\n" + "c" * 1500
+
+        await telegram_async.send_attach(b"dump", filename="dump.txt", msg=msg)
+
+        calls = [call.kwargs for call in send_post.call_args_list]
+        assert [call["method_api"] for call in calls] == ["sendDocument"] * 3 + ["sendMessage"] * 3
+        assert calls[0]["params"]["caption"] == "header\n"
+        assert calls[-1]["body"]["text"] == "c" * 1500
+
+
+class TestCoalesce:
+    def test_merge_burst(self, no_rate_limit: RateLimitPolicy, mocker: MockerFixture):
+        telegram = Telegram(
+            token="123:token",
+            chat_id=1,
+            rate_limiter=RateLimiter(no_rate_limit),
+            coalesce_window=0.05,
+        )
+        send_post = mocker.patch.object(telegram, "_send_post", return_value={"message_id": 1})
+
+        futures = [telegram.send_message(f"error {number}") for number in range(3)]
+        futures.append(telegram.send_message("quiet", disable_notification=True))
+
+        assert futures[0].result(timeout=5)[0].ok is True
+        assert telegram.flush(timeout=5) is True
+        bodies = [call.kwargs["body"] for call in send_post.call_args_list]
+        assert bodies[0]["text"] == "error 0\n\nerror 1\n\nerror 2"
+        assert bodies[1] == {"text": "quiet", "disable_notification": True, "chat_id": 1}
+
+    def test_max_latency(self):
+        sent = []
+        coalescer = Coalescer(
+            window=0.05, max_latency=0.1, max_size=100, on_flush=lambda text, key: sent.append(text)
+        )
+        started = time.monotonic()
+        while time.monotonic() - started < 0.3:
+            coalescer.add("x")
+            time.sleep(0.01)
+
+        assert coalescer.flush(timeout=5) is True
+        assert len(sent) >= 3
+        assert all(len(text) <= 100 for text in sent)
+
+    @pytest.mark.asyncio
+    async def test_merge_burst_async(self, no_rate_limit: RateLimitPolicy, mocker: MockerFixture):
+        telegram = TelegramAsync(
+            token="123:token",
+            chat_id=[1, 2],
+            rate_limiter=AsyncRateLimiter(no_rate_limit),
+            coalesce_window=0.05,
+        )
+        send_post = mocker.patch.object(telegram, "_send_post", return_value={"message_id": 1})
+
+        results = await asyncio.gather(*(telegram.send_message(f"error {n}") for n in range(3)))
+
+        assert results[0] is results[2]
+        assert [result.chat_id for result in results[0]] == [1, 2]
+        texts = [call.kwargs["body"]["text"] for call in send_post.call_args_list]
+        assert texts == ["error 0\n\nerror 1\n\nerror 2"] * 2
+        await telegram.aclose()
+
+
+class TestWarmup:
+    def test_get_me(self, http_server, no_rate_limit: RateLimitPolicy):
+        telegram = Telegram(
+            token="123:token",
+            chat_id=1,
+            api_url="http://127.0.0.1:%s" % http_server.server_port,
+            rate_limiter=RateLimiter(no_rate_limit),
+        )
+        assert telegram.warmup() == {"message_id": 1}
+        telegram.send_message("hello")
+
+        assert [path for path, _, _ in http_server.requests] == [
+            "/bot123:token/getMe",
+            "/bot123:token/sendMessage",
+        ]
+
+
+class TestTokenPool:
+    def test_round_robin(self):
+        pool = TokenPool(["a", "b", "a", "c"], cooldown=60)
+
+        assert pool.tokens == ["a", "b", "c"]
+        assert [pool.next() for _ in range(4)] == ["a", "b", "c", "a"]
+        pool.cool_down("b")
+        assert [pool.next() for _ in range(3)] == ["c", "a", "c"]
+        pool.cool_down("a", 0.5)
+        pool.cool_down("c")
+        assert pool.available() is False
+        assert pool.next() == "a"
+
+    def test_rotate_rejected_token(self, no_rate_limit: RateLimitPolicy, mocker: MockerFixture):
+        telegram = Telegram(
+            token=["1:a", "2:b"], chat_id=1, rate_limit_policy=no_rate_limit, token_cooldown=60
+        )
+        error = HTTPError("url", 401, "Unauthorized", {}, BytesIO(b""))
+        send_post = mocker.patch.object(
+            telegram, "_send_post", side_effect=[error, {"message_id": 1}, {"message_id": 2}, True]
+        )
+
+        first = telegram.send_message("hello")
+        second = telegram.send_message("hello")
+
+        tokens = [call.kwargs["token"] for call in send_post.call_args_list]
+        assert tokens == ["1:a", "2:b", "2:b"]
+        assert first[0].ok is True and first[0].token == "2:b"
+        assert second[0].token == "2:b"
+        assert "2:b" not in repr(first[0])
+        assert telegram.stats["retries"] == 0
+        telegram.edit_message_text(1, 1, "hello", token=first[0].token)
+        assert send_post.call_args.kwargs["token"] == "2:b"